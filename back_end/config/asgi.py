@@ -13,6 +13,9 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
 
+# Sous ASGI, les lectures du catalogue public sont servies par des vues asynchrones
+os.environ.setdefault('ROOT_URLCONF', 'config.urls_async')
+
 application = get_asgi_application()
 
 
@@ -0,0 +1,149 @@
+"""
+Endpoint /api/batch/ : plusieurs lectures GET de l'API en un seul aller-retour.
+
+Les sous-requêtes sont exécutées dans le processus, les unes après les autres, par les
+vues qui servent normalement ces URLs. Elles partagent la connexion à la base (et un
+même instantané : transaction REPEATABLE READ en lecture seule), l'utilisateur et les
+en-têtes de la requête englobante.
+"""
+import io
+import json
+import logging
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+
+from django.core.handlers.wsgi import WSGIRequest
+from django.db import connections, router, transaction
+from django.urls import Resolver404, resolve
+from rest_framework import status
+from rest_framework.permissions import AllowAny
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from partenaire.models import Partenaire
+
+from . import limitation
+
+
+logger = logging.getLogger(__name__)
+
+URLCONF = 'config.urls'
+TAILLE_MAX = 20
+LONGUEUR_CHEMIN_MAX = 2000
+
+
+@contextmanager
+def instantane_lecture():
+    """
+    Transaction en lecture seule sur un instantané unique, sauf si une transaction est
+    déjà ouverte, sur la base des lectures du catalogue (réplique ou `default`)
+    """
+    alias = router.db_for_read(Partenaire)
+    connection = connections[alias]
+    if connection.in_atomic_block:
+        yield
+        return
+    with transaction.atomic(using=alias):
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('SET TRANSACTION ISOLATION LEVEL REPEATABLE READ READ ONLY')
+        yield
+
+
+def sous_requete(request, chemin, parametres):
+    """Requête GET interne héritant des en-têtes, de l'hôte et de l'utilisateur de `request`"""
+    environ = {
+        cle: valeur for cle, valeur in request.META.items()
+        if cle.startswith('HTTP_') or cle in ('SERVER_NAME', 'SERVER_PORT', 'REMOTE_ADDR', 'SCRIPT_NAME')
+    }
+    environ.update({
+        'REQUEST_METHOD': 'GET',
+        'PATH_INFO': chemin,
+        'QUERY_STRING': parametres,
+        'CONTENT_LENGTH': '0',
+        'wsgi.input': io.BytesIO(),
+        'wsgi.url_scheme': request.scheme,
+        # Les résultats sont inclus dans une réponse JSON
+        'HTTP_ACCEPT': 'application/json',
+    })
+    interne = WSGIRequest(environ)
+    if hasattr(request, 'user'):
+        interne.user = request.user
+    return interne
+
+
+class BatchView(APIView):
+    """
+    POST /api/batch/
+    {"requests": [{"id": "partenaire", "path": "/api/partenaires/3/"},
+                  {"id": "produits", "path": "/api/produits/actifs/?page=2"}]}
+
+    Réponse : {"results": [{"id": ..., "path": ..., "status": 200, "body": {...}}, ...]},
+    dans l'ordre des sous-requêtes (une chaîne seule est acceptée à la place d'un objet).
+    Chaque élément a son propre statut ; le lot entier n'est refusé (400) que si sa
+    forme est invalide ou s'il dépasse TAILLE_MAX sous-requêtes. Les URLs servies en
+    flux (archives des catalogues...) sont refusées élément par élément (400).
+    """
+    permission_classes = [AllowAny]
+
+    def post(self, request):
+        elements = request.data.get('requests') if isinstance(request.data, dict) else None
+        if not isinstance(elements, list) or not elements:
+            return Response(
+                {'detail': "Le corps doit contenir une liste non vide `requests`."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if len(elements) > TAILLE_MAX:
+            return Response(
+                {'detail': f"Au plus {TAILLE_MAX} sous-requêtes par lot."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        client = limitation.client_limite(request._request, request.user)
+        with instantane_lecture():
+            resultats = [self.executer(request, index, element, client) for index, element in enumerate(elements)]
+        return Response({'results': resultats})
+
+    def executer(self, request, index, element, client=None):
+        """
+        Exécute une sous-requête et retourne son résultat, erreurs comprises.
+        Chaque sous-requête est facturée au `client` comme une requête isolée.
+        """
+        if isinstance(element, str):
+            element = {'path': element}
+        identifiant = element.get('id', index) if isinstance(element, dict) else index
+        chemin = element.get('path') if isinstance(element, dict) else None
+        resultat = {'id': identifiant, 'path': chemin}
+
+        if not isinstance(chemin, str) or not chemin.startswith('/api/') or len(chemin) > LONGUEUR_CHEMIN_MAX:
+            return {**resultat, 'status': 400, 'body': {'detail': "`path` doit être un chemin de l'API (/api/...)."}}
+        url = urlsplit(chemin)
+        if url.path.rstrip('/') == '/api/batch':
+            return {**resultat, 'status': 400, 'body': {'detail': "Les lots imbriqués ne sont pas pris en charge."}}
+        try:
+            correspondance = resolve(url.path, urlconf=URLCONF)
+        except Resolver404:
+            return {**resultat, 'status': 404, 'body': {'detail': "Page non trouvée."}}
+
+        if client is not None and limitation.epuise(client):
+            attente = limitation.fenetre()[1]
+            return {**resultat, 'status': 429, 'body': {'detail': f"Trop de requêtes. Réessayez dans {attente} secondes."}}
+        interne = sous_requete(request._request, url.path, url.query)
+        try:
+            response = correspondance.func(interne, *correspondance.args, **correspondance.kwargs)
+            if hasattr(response, 'render'):
+                response.render()
+        except Exception:
+            logger.exception("Sous-requête %s en échec", chemin)
+            return {**resultat, 'status': 500, 'body': {'detail': "Erreur interne."}}
+        if client is not None:
+            limitation.facturer(client, limitation.cout_reponse(interne, response))
+        if response.streaming:
+            # Archives des catalogues : le flux n'est pas lu (et pas de close(), qui enverrait
+            # request_finished et fermerait la connexion partagée par le lot)
+            return {**resultat, 'status': 400, 'body': {'detail': "Les réponses en flux ne peuvent pas être incluses dans un lot."}}
+
+        corps = response.content.decode(response.charset or 'utf-8')
+        if response.get('Content-Type', '').startswith('application/json') and corps:
+            corps = json.loads(corps)
+        return {**resultat, 'status': response.status_code, 'body': corps}
@@ -0,0 +1,441 @@
+"""
+Endpoint /api/graphql/ : lecture du catalogue en GraphQL.
+
+Schéma en lecture seule (aucune mutation) sur les partenaires, familles, sous-familles,
+produits fournisseur, catalogues et produits, avec leurs relations dans les deux sens.
+Chaque relation est résolue par un Chargeur propre à la requête : le premier objet qui
+la demande la charge, en une seule requête SQL, pour tous les objets du même modèle
+déjà lus. Quelle que soit la forme de la requête, chaque niveau coûte une requête par
+relation demandée, et non une par objet.
+
+Avant toute exécution, la profondeur et la complexité de l'opération (nombre estimé de
+champs résolus : les listes racines comptent `limite` éléments, les listes imbriquées
+FACTEUR_LISTE) sont bornées par GRAPHQL_PROFONDEUR_MAX et GRAPHQL_COMPLEXITE_MAX ; la
+complexité est facturée au limiteur de débit (voir config/limitation.py).
+"""
+import json
+import logging
+from collections import defaultdict, namedtuple
+from operator import attrgetter
+
+from django.conf import settings
+from graphql import (
+    FieldNode, FragmentDefinitionNode, FragmentSpreadNode, InlineFragmentNode,
+    GraphQLArgument, GraphQLBoolean, GraphQLEnumType, GraphQLError, GraphQLField, GraphQLID, GraphQLInt,
+    GraphQLList, GraphQLNonNull, GraphQLObjectType, GraphQLSchema, GraphQLString, OperationType,
+    execute, get_named_type, get_nullable_type, get_operation_ast, is_list_type, parse, validate, value_from_ast,
+)
+from rest_framework import serializers, status
+from rest_framework.permissions import AllowAny
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from partenaire.langues import LANGUES, LANGUE_PAR_DEFAUT
+from partenaire.models import Partenaire, Famille, SousFamille, ProduitFournisseur, Catalogue
+from produit.models import Produit
+
+from . import limitation
+from .batch import instantane_lecture
+
+
+logger = logging.getLogger(__name__)
+
+# Taille maximale du document (jetons lus par l'analyseur)
+JETONS_MAX = 2000
+# Éléments par liste racine : par défaut (PAGE_SIZE de DRF) et au plus
+LIMITE_MAX = 100
+# Taille supposée d'une liste imbriquée, pour l'estimation de la complexité
+FACTEUR_LISTE = 3
+
+_date = serializers.DateTimeField()
+
+
+# Relations et chargeurs
+
+# modele : modèle des objets qui portent la relation ; cle(objet) : clé de chargement ;
+# charger(cles, filtres) -> {cle: objet, ou liste d'objets si multiple}
+Relation = namedtuple('Relation', ['nom', 'modele', 'cle', 'charger', 'multiple'])
+
+
+def enfants(modele, cle_parent):
+    """Relation inverse d'une clé étrangère : enfants de chaque parent, dans l'ordre du modèle"""
+    def charger(cles, filtres):
+        resultat = defaultdict(list)
+        for objet in modele.objects.filter(**{f'{cle_parent}__in': cles}, **filtres):
+            resultat[getattr(objet, cle_parent)].append(objet)
+        return resultat
+    return charger
+
+
+def parent(modele):
+    """Clé étrangère : objet parent de chaque identifiant"""
+    def charger(cles, filtres):
+        return modele.objects.in_bulk(cles)
+    return charger
+
+
+def liens(modele_lien, source, cible, modele_cible):
+    """Relation plusieurs-à-plusieurs, lue dans la table de liaison jointe à la cible"""
+    ordre = [f'{cible}__{champ}' for champ in modele_cible._meta.ordering] + [f'{cible}_id']
+
+    def charger(cles, filtres):
+        resultat = defaultdict(list)
+        for lien in modele_lien.objects.filter(
+            **{f'{source}_id__in': cles}, **{f'{cible}__{nom}': valeur for nom, valeur in filtres.items()}
+        ).select_related(cible).order_by(*ordre):
+            resultat[getattr(lien, f'{source}_id')].append(getattr(lien, cible))
+        return resultat
+    return charger
+
+
+def definir(nom, modele, charger, cle='pk', multiple=True):
+    return Relation(nom, modele, attrgetter(cle), charger, multiple)
+
+
+RELATIONS = {relation.nom: relation for relation in (
+    definir('partenaire.familles', Partenaire, liens(Famille.partenaires.through, 'partenaire', 'famille', Famille)),
+    definir('partenaire.produits', Partenaire, liens(Produit.partenaires.through, 'partenaire', 'produit', Produit)),
+    definir('famille.partenaires', Famille, liens(Famille.partenaires.through, 'famille', 'partenaire', Partenaire)),
+    definir('famille.sous_familles', Famille, enfants(SousFamille, 'famille_id')),
+    definir('sous_famille.famille', SousFamille, parent(Famille), 'famille_id', False),
+    definir('sous_famille.produits_fournisseur', SousFamille, enfants(ProduitFournisseur, 'sous_famille_id')),
+    definir('produit_fournisseur.sous_famille', ProduitFournisseur, parent(SousFamille), 'sous_famille_id', False),
+    definir('produit_fournisseur.catalogues', ProduitFournisseur, enfants(Catalogue, 'produit_fournisseur_id')),
+    definir('catalogue.produit_fournisseur', Catalogue, parent(ProduitFournisseur), 'produit_fournisseur_id', False),
+    definir('produit.partenaires', Produit, liens(Produit.partenaires.through, 'produit', 'partenaire', Partenaire)),
+)}
+
+
+class Contexte:
+    """État d'une requête GraphQL : objets déjà lus, par modèle, et chargeurs des relations"""
+
+    def __init__(self, request):
+        self.request = request
+        self.connus = defaultdict(dict)
+        self.chargeurs = {}
+
+    def connaitre(self, objets):
+        objets = list(objets)
+        for objet in objets:
+            self.connus[objet._meta.model][objet.pk] = objet
+        return objets
+
+    def chargeur(self, relation, filtres):
+        cle = (relation.nom, tuple(sorted(filtres.items())))
+        if cle not in self.chargeurs:
+            self.chargeurs[cle] = Chargeur(self, relation, filtres)
+        return self.chargeurs[cle]
+
+
+class Chargeur:
+    """
+    Valeurs d'une relation (avec des filtres donnés) : le premier accès à une clé
+    inconnue charge en une requête celles de tous les objets connus du même modèle
+    """
+
+    def __init__(self, contexte, relation, filtres):
+        self.contexte = contexte
+        self.relation = relation
+        self.filtres = filtres
+        self.valeurs = {}
+
+    def charger(self, objet):
+        cle = self.relation.cle(objet)
+        if cle not in self.valeurs:
+            cles = {self.relation.cle(connu) for connu in self.contexte.connus[self.relation.modele].values()}
+            cles = [valeur for valeur in cles | {cle} if valeur not in self.valeurs]
+            resultats = self.relation.charger(cles, self.filtres)
+            for valeur in cles:
+                self.valeurs[valeur] = resultats.get(valeur, [] if self.relation.multiple else None)
+            for valeur in resultats.values():
+                self.contexte.connaitre(valeur if self.relation.multiple else [valeur])
+        return self.valeurs[cle]
+
+
+# Schéma
+
+Langue = GraphQLEnumType('Langue', {code: code for code in LANGUES})
+
+FILTRES_ACTIF = {'actif': GraphQLArgument(GraphQLBoolean)}
+FILTRES_VISIBLE = {**FILTRES_ACTIF, 'visible': GraphQLArgument(GraphQLBoolean)}
+
+
+def non_nul(type_):
+    return GraphQLNonNull(type_)
+
+
+def liste_de(type_):
+    return GraphQLNonNull(GraphQLList(GraphQLNonNull(type_)))
+
+
+def filtres_donnes(arguments):
+    """Filtres actif/visible explicitement renseignés (null : pas de filtre)"""
+    return {nom: valeur for nom, valeur in arguments.items() if valeur is not None}
+
+
+def champ_date(nom):
+    return GraphQLField(GraphQLString, resolve=lambda objet, info: _date.to_representation(getattr(objet, nom)))
+
+
+def champ_fichier(nom):
+    """URL absolue du fichier, comme les serializers"""
+    def resoudre(objet, info):
+        fichier = getattr(objet, nom)
+        return info.context.request.build_absolute_uri(fichier.url) if fichier else None
+    return GraphQLField(GraphQLString, resolve=resoudre)
+
+
+def champs_multilingues(champ):
+    """<champ>_fr, _en, _ar, et <champ>(langue) qui retombe sur le français si la traduction est vide"""
+    def resoudre(objet, info, langue):
+        return getattr(objet, f'{champ}_{langue}') or getattr(objet, f'{champ}_{LANGUE_PAR_DEFAUT}')
+
+    return {
+        **{f'{champ}_{code}': GraphQLField(GraphQLString) for code in LANGUES},
+        champ: GraphQLField(
+            GraphQLString, args={'langue': GraphQLArgument(Langue, default_value=LANGUE_PAR_DEFAUT)}, resolve=resoudre
+        ),
+    }
+
+
+def champ_relation(nom, type_, filtres=None):
+    relation = RELATIONS[nom]
+
+    def resoudre(objet, info, **arguments):
+        return info.context.chargeur(relation, filtres_donnes(arguments)).charger(objet)
+
+    if relation.multiple:
+        return GraphQLField(liste_de(type_), args=filtres or {}, resolve=resoudre)
+    return GraphQLField(non_nul(type_), resolve=resoudre)
+
+
+def champs_communs():
+    return {
+        'id': GraphQLField(non_nul(GraphQLID)),
+        'actif': GraphQLField(non_nul(GraphQLBoolean)),
+        'date_creation': champ_date('date_creation'),
+        'date_modification': champ_date('date_modification'),
+    }
+
+
+PartenaireType = GraphQLObjectType('Partenaire', lambda: {
+    **champs_communs(),
+    'nom': GraphQLField(non_nul(GraphQLString)),
+    'url_site_web': GraphQLField(GraphQLString),
+    'logo': champ_fichier('logo'),
+    'visible': GraphQLField(non_nul(GraphQLBoolean)),
+    'familles': champ_relation('partenaire.familles', FamilleType, FILTRES_VISIBLE),
+    'produits': champ_relation('partenaire.produits', ProduitType, FILTRES_ACTIF),
+})
+
+FamilleType = GraphQLObjectType('Famille', lambda: {
+    **champs_communs(),
+    **champs_multilingues('titre'),
+    'ordre': GraphQLField(non_nul(GraphQLInt)),
+    'visible': GraphQLField(non_nul(GraphQLBoolean)),
+    'partenaires': champ_relation('famille.partenaires', PartenaireType, FILTRES_VISIBLE),
+    'sous_familles': champ_relation('famille.sous_familles', SousFamilleType, FILTRES_VISIBLE),
+})
+
+SousFamilleType = GraphQLObjectType('SousFamille', lambda: {
+    **champs_communs(),
+    **champs_multilingues('titre'),
+    'ordre': GraphQLField(non_nul(GraphQLInt)),
+    'visible': GraphQLField(non_nul(GraphQLBoolean)),
+    'famille': champ_relation('sous_famille.famille', FamilleType),
+    'produits_fournisseur': champ_relation('sous_famille.produits_fournisseur', ProduitFournisseurType, FILTRES_VISIBLE),
+})
+
+ProduitFournisseurType = GraphQLObjectType('ProduitFournisseur', lambda: {
+    **champs_communs(),
+    'nom': GraphQLField(non_nul(GraphQLString)),
+    'image': champ_fichier('image'),
+    'ordre': GraphQLField(non_nul(GraphQLInt)),
+    'visible': GraphQLField(non_nul(GraphQLBoolean)),
+    'sous_famille': champ_relation('produit_fournisseur.sous_famille', SousFamilleType),
+    'catalogues': champ_relation('produit_fournisseur.catalogues', CatalogueType, FILTRES_VISIBLE),
+})
+
+CatalogueType = GraphQLObjectType('Catalogue', lambda: {
+    **champs_communs(),
+    'nom': GraphQLField(non_nul(GraphQLString)),
+    'fichier_pdf': champ_fichier('fichier_pdf'),
+    'ordre': GraphQLField(non_nul(GraphQLInt)),
+    'visible': GraphQLField(non_nul(GraphQLBoolean)),
+    'produit_fournisseur': champ_relation('catalogue.produit_fournisseur', ProduitFournisseurType),
+})
+
+ProduitType = GraphQLObjectType('Produit', lambda: {
+    **champs_communs(),
+    **champs_multilingues('titre'),
+    **champs_multilingues('description'),
+    'image_couverture': champ_fichier('image_couverture'),
+    'ordre': GraphQLField(non_nul(GraphQLInt)),
+    'partenaires': champ_relation('produit.partenaires', PartenaireType, FILTRES_VISIBLE),
+})
+
+
+def racine_liste(modele, type_, filtres):
+    """Liste racine, dans l'ordre du modèle, par tranches de `limite` à partir de `decalage`"""
+    def resoudre(racine, info, limite, decalage, **arguments):
+        if not 0 < limite <= LIMITE_MAX:
+            raise GraphQLError(f"`limite` doit être comprise entre 1 et {LIMITE_MAX}.")
+        if decalage < 0:
+            raise GraphQLError("`decalage` doit être positif.")
+        return info.context.connaitre(modele.objects.filter(**filtres_donnes(arguments))[decalage:decalage + limite])
+
+    return GraphQLField(liste_de(type_), args={
+        **filtres,
+        'limite': GraphQLArgument(GraphQLInt, default_value=settings.REST_FRAMEWORK['PAGE_SIZE']),
+        'decalage': GraphQLArgument(GraphQLInt, default_value=0),
+    }, resolve=resoudre)
+
+
+def racine_objet(modele, type_):
+    def resoudre(racine, info, **arguments):
+        pk = str(arguments['id'])
+        if not pk.isdigit():
+            return None
+        return next(iter(info.context.connaitre(modele.objects.filter(pk=pk))), None)
+
+    return GraphQLField(type_, args={'id': GraphQLArgument(non_nul(GraphQLID))}, resolve=resoudre)
+
+
+Query = GraphQLObjectType('Query', lambda: {
+    'partenaires': racine_liste(Partenaire, PartenaireType, FILTRES_VISIBLE),
+    'partenaire': racine_objet(Partenaire, PartenaireType),
+    'familles': racine_liste(Famille, FamilleType, FILTRES_VISIBLE),
+    'famille': racine_objet(Famille, FamilleType),
+    'sous_familles': racine_liste(SousFamille, SousFamilleType, FILTRES_VISIBLE),
+    'sous_famille': racine_objet(SousFamille, SousFamilleType),
+    'produits_fournisseur': racine_liste(ProduitFournisseur, ProduitFournisseurType, FILTRES_VISIBLE),
+    'produit_fournisseur': racine_objet(ProduitFournisseur, ProduitFournisseurType),
+    'catalogues': racine_liste(Catalogue, CatalogueType, FILTRES_VISIBLE),
+    'catalogue': racine_objet(Catalogue, CatalogueType),
+    'produits': racine_liste(Produit, ProduitType, FILTRES_ACTIF),
+    'produit': racine_objet(Produit, ProduitType),
+})
+
+SCHEMA = GraphQLSchema(query=Query)
+
+
+# Limites
+
+def taille_liste(champ, noeud, variables):
+    """Nombre d'éléments supposé d'un champ liste : `limite` pour les listes racines"""
+    if 'limite' not in champ.args:
+        return FACTEUR_LISTE
+    for argument in noeud.arguments:
+        if argument.name.value == 'limite':
+            valeur = value_from_ast(argument.value, GraphQLInt, variables)
+            return min(valeur, LIMITE_MAX) if isinstance(valeur, int) and valeur > 0 else LIMITE_MAX
+    return champ.args['limite'].default_value
+
+
+def mesurer(type_, selections, fragments, variables, niveau=1):
+    """
+    (profondeur, complexité) d'un ensemble de sélections sur `type_` : chaque champ
+    compte 1, multiplié par la taille supposée de chaque liste qui l'englobe
+    """
+    profondeur, complexite = niveau, 0
+    for selection in selections:
+        if isinstance(selection, FieldNode):
+            champ = type_.fields.get(selection.name.value)
+            if champ is None:
+                # __typename et introspection : schéma statique
+                continue
+            facteur = taille_liste(champ, selection, variables) if is_list_type(get_nullable_type(champ.type)) else 1
+            sous_profondeur, sous_complexite = niveau, 0
+            if selection.selection_set:
+                sous_profondeur, sous_complexite = mesurer(
+                    get_named_type(champ.type), selection.selection_set.selections, fragments, variables, niveau + 1
+                )
+            profondeur = max(profondeur, sous_profondeur)
+            complexite += facteur * (1 + sous_complexite)
+            continue
+        # Fragments : seuls des types objet, la condition de type est le type courant
+        if isinstance(selection, InlineFragmentNode):
+            sous_selections = selection.selection_set.selections
+        elif isinstance(selection, FragmentSpreadNode):
+            sous_selections = fragments[selection.name.value].selection_set.selections
+        else:
+            continue
+        sous_profondeur, sous_complexite = mesurer(type_, sous_selections, fragments, variables, niveau)
+        profondeur = max(profondeur, sous_profondeur)
+        complexite += sous_complexite
+    return profondeur, complexite
+
+
+def erreurs(messages, statut=status.HTTP_400_BAD_REQUEST):
+    return Response({'errors': [{'message': message} for message in messages]}, status=statut)
+
+
+class GraphQLView(APIView):
+    """
+    GET /api/graphql/?query=...&variables=...&operationName=...
+    POST /api/graphql/ {"query": "...", "variables": {...}, "operationName": "..."}
+
+    Réponse : {"data": {...}} (et "errors" pour les erreurs d'exécution). Un document
+    invalide, trop profond ou trop complexe est refusé (400) sans être exécuté.
+    """
+    permission_classes = [AllowAny]
+
+    def get(self, request):
+        return self.executer(request, request.query_params)
+
+    def post(self, request):
+        return self.executer(request, request.data if isinstance(request.data, dict) else {})
+
+    def executer(self, request, donnees):
+        requete = donnees.get('query')
+        if not isinstance(requete, str) or not requete.strip():
+            return erreurs(["`query` doit contenir un document GraphQL."])
+        variables = donnees.get('variables') or {}
+        if isinstance(variables, str):
+            try:
+                variables = json.loads(variables)
+            except ValueError:
+                variables = None
+        if not isinstance(variables, dict):
+            return erreurs(["`variables` doit être un objet JSON."])
+        nom_operation = donnees.get('operationName') or None
+
+        try:
+            document = parse(requete, max_tokens=JETONS_MAX)
+        except GraphQLError as erreur:
+            return erreurs([erreur.message])
+        validation = validate(SCHEMA, document)
+        if validation:
+            return erreurs([erreur.message for erreur in validation])
+        operation = get_operation_ast(document, nom_operation)
+        if operation is None:
+            return erreurs(["Opération introuvable : préciser `operationName`."])
+        if operation.operation != OperationType.QUERY:
+            return erreurs(["Seules les lectures (`query`) sont prises en charge."])
+
+        fragments = {definition.name.value: definition for definition in document.definitions
+                     if isinstance(definition, FragmentDefinitionNode)}
+        profondeur, complexite = mesurer(Query, operation.selection_set.selections, fragments, variables)
+        if profondeur > settings.GRAPHQL_PROFONDEUR_MAX:
+            return erreurs([f"Requête trop profonde ({profondeur} niveaux, {settings.GRAPHQL_PROFONDEUR_MAX} au plus)."])
+        if complexite > settings.GRAPHQL_COMPLEXITE_MAX:
+            return erreurs([f"Requête trop complexe ({complexite}, {settings.GRAPHQL_COMPLEXITE_MAX} au plus)."])
+
+        client = limitation.client_limite(request._request, request.user)
+        if client is not None:
+            limitation.facturer(client, limitation.cout_graphql(complexite))
+        with instantane_lecture():
+            resultat = execute(
+                SCHEMA, document, context_value=Contexte(request),
+                variable_values=variables, operation_name=nom_operation,
+            )
+
+        corps = {'data': resultat.data}
+        if resultat.errors:
+            corps['errors'] = []
+            for erreur in resultat.errors:
+                if erreur.original_error is not None and not isinstance(erreur.original_error, GraphQLError):
+                    logger.error("Erreur GraphQL sur %s", erreur.path, exc_info=erreur.original_error)
+                    erreur.message = "Erreur interne."
+                corps['errors'].append(erreur.formatted)
+        return Response(corps)
@@ -0,0 +1,218 @@
+"""
+Limitation du débit de l'API selon le coût estimé de chaque requête.
+
+Chaque client (utilisateur connecté, sinon adresse IP) dispose de LIMITATION_COUT_MAX
+unités par fenêtre de LIMITATION_FENETRE secondes. Une requête coûte selon ce qu'elle
+fait lire : nombre d'objets (page de PAGE_SIZE ou objet seul), profondeur de l'arbre
+imbriqué sérialisé pour chacun (un produit embarque ses partenaires, qui embarquent
+familles, sous-familles, produits fournisseur et catalogues), recherche ou tri. Une
+réponse servie depuis le cache (X-Cache: HIT ou STALE) ne coûte qu'une unité.
+
+Le compteur est dans le cache Django (Redis en production), donc partagé par tous les
+workers. Un client anonyme est identifié par son adresse selon NUM_PROXIES de DRF
+(REMOTE_ADDR sans proxy de confiance) : un X-Forwarded-For forgé ne change pas de
+compteur. Une fois le budget épuisé, les requêtes reçoivent 429 avec Retry-After jusqu'à
+la fenêtre suivante. Les membres du staff et LIMITATION_EXEMPTIONS (serveur du
+frontend...) ne sont pas limités. Les sous-requêtes de /api/batch/ sont facturées une
+à une (voir config/batch.py), les opérations de /api/graphql/ selon leur complexité
+(voir config/graphql_lecture.py).
+"""
+import math
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache import cache
+from django.http import JsonResponse
+from rest_framework.throttling import BaseThrottle
+
+
+PREFIXE = '/api/'
+
+# Niveaux imbriqués sous chaque objet retourné par la ressource
+PROFONDEURS = {
+    'catalogues': 0,
+    'produits-fournisseur': 1,
+    'sous-familles': 2,
+    'familles': 3,
+    'partenaires': 4,
+    'produits': 5,
+}
+
+# Actions de liste des ViewSets (en plus de la racine de la ressource)
+ACTIONS_LISTE = ('actifs', 'inactifs', 'vitrine')
+# Listes imbriquées /api/<ressource>/{id}/<enfants>/ : profondeur de chaque enfant
+SOUS_COLLECTIONS = {'familles': 0, 'sous-familles': 0, 'produits-fournisseur': 1}
+# Archives ZIP des catalogues : coût fixe, le volume transféré n'est pas connu d'avance
+ACTIONS_ARCHIVES = ('catalogues-zip',)
+COUT_ARCHIVE = 100
+# Actions qui agrègent toute la liste filtrée sans sérialiser d'objet imbriqué
+ACTIONS_AGREGATS = ('facettes',)
+
+# Paramètres qui imposent un filtrage ou un tri sans index
+PARAMETRES_COUTEUX = ('search', 'ordering')
+FACTEUR_RECHERCHE = 3
+
+# Un objet de profondeur p coûte 2**p / UNITE unités (une page de partenaires : ~40)
+UNITE = 8
+# Une opération GraphQL coûte une unité par UNITE_GRAPHQL champs résolus (estimés)
+UNITE_GRAPHQL = 100
+
+
+def cout(chemin, parametres, depuis_cache=False):
+    """Coût estimé (en unités) d'une lecture de `chemin` avec les paramètres `parametres`"""
+    if depuis_cache:
+        return 1
+    segments = [segment for segment in chemin[len(PREFIXE):].split('/') if segment]
+    if not segments:
+        return 1
+    ressource, reste = segments[0], segments[1:]
+    if ressource == 'changes':
+        limite = parametres.get('limit', '')
+        return 1 + math.ceil(min(int(limite) if limite.isdigit() else 500, 1000) / 100)
+    if ressource not in PROFONDEURS:
+        return 1
+
+    if len(reste) > 1 and reste[1] in ACTIONS_ARCHIVES:
+        return COUT_ARCHIVE
+    if reste and reste[0] in ACTIONS_AGREGATS:
+        valeur = 1 + math.ceil(settings.REST_FRAMEWORK['PAGE_SIZE'] / UNITE)
+    elif len(reste) > 1 and reste[1] in SOUS_COLLECTIONS:
+        valeur = 1 + math.ceil(settings.REST_FRAMEWORK['PAGE_SIZE'] * 2 ** SOUS_COLLECTIONS[reste[1]] / UNITE)
+    else:
+        objets = settings.REST_FRAMEWORK['PAGE_SIZE'] if not reste or reste[0] in ACTIONS_LISTE else 1
+        valeur = 1 + math.ceil(objets * 2 ** PROFONDEURS[ressource] / UNITE)
+    if any(parametres.get(nom) for nom in PARAMETRES_COUTEUX):
+        valeur *= FACTEUR_RECHERCHE
+    return valeur
+
+
+def cout_graphql(complexite):
+    """Coût d'une opération GraphQL, en plus de l'unité facturée à la requête POST/GET"""
+    return math.ceil(complexite / UNITE_GRAPHQL)
+
+
+def adresse(request):
+    """Adresse IP du client, selon NUM_PROXIES de DRF"""
+    return BaseThrottle().get_ident(request)
+
+
+def identifiant(request, utilisateur):
+    """Clé du client : utilisateur connecté, sinon adresse IP"""
+    if utilisateur is not None and utilisateur.is_authenticated:
+        return f'utilisateur:{utilisateur.pk}'
+    return f'ip:{adresse(request)}'
+
+
+def client_limite(request, utilisateur):
+    """Clé du compteur de `request`, None si la requête n'est pas limitée"""
+    if settings.LIMITATION_COUT_MAX <= 0 or not request.path_info.startswith(PREFIXE):
+        return None
+    if utilisateur is not None and utilisateur.is_staff:
+        return None
+    if adresse(request) in settings.LIMITATION_EXEMPTIONS:
+        return None
+    return identifiant(request, utilisateur)
+
+
+def fenetre():
+    """(numéro de la fenêtre courante, secondes avant la suivante)"""
+    maintenant = time.time()
+    numero = int(maintenant // settings.LIMITATION_FENETRE)
+    return numero, math.ceil((numero + 1) * settings.LIMITATION_FENETRE - maintenant)
+
+
+def cle_compteur(client):
+    return f'limitation:{client}:{fenetre()[0]}'
+
+
+def reponse_limitee(consomme):
+    attente = fenetre()[1]
+    response = JsonResponse(
+        {'detail': f"Trop de requêtes. Réessayez dans {attente} secondes."},
+        status=429, json_dumps_params={'ensure_ascii': False},
+    )
+    response['Retry-After'] = str(attente)
+    return entetes(response, consomme)
+
+
+def entetes(response, consomme):
+    response['X-RateLimit-Limit'] = str(settings.LIMITATION_COUT_MAX)
+    response['X-RateLimit-Remaining'] = str(max(settings.LIMITATION_COUT_MAX - consomme, 0))
+    return response
+
+
+def epuise(client):
+    return cache.get(cle_compteur(client), 0) >= settings.LIMITATION_COUT_MAX
+
+
+def facturer(client, unites):
+    """Ajoute `unites` au compteur du client et retourne le total de la fenêtre"""
+    cle = cle_compteur(client)
+    # La clé survit un peu à sa fenêtre ; add + incr est atomique avec Redis
+    cache.add(cle, 0, settings.LIMITATION_FENETRE * 2)
+    try:
+        return cache.incr(cle, unites)
+    except ValueError:
+        # Clé expirée entre add et incr
+        cache.set(cle, unites, settings.LIMITATION_FENETRE * 2)
+        return unites
+
+
+async def aepuise(client):
+    return await cache.aget(cle_compteur(client), 0) >= settings.LIMITATION_COUT_MAX
+
+
+async def afacturer(client, unites):
+    cle = cle_compteur(client)
+    await cache.aadd(cle, 0, settings.LIMITATION_FENETRE * 2)
+    try:
+        return await cache.aincr(cle, unites)
+    except ValueError:
+        await cache.aset(cle, unites, settings.LIMITATION_FENETRE * 2)
+        return unites
+
+
+def cout_reponse(request, response):
+    """Coût d'une requête servie : les écritures et les erreurs comptent une unité"""
+    if request.method not in ('GET', 'HEAD') or response.status_code >= 400:
+        return 1
+    return cout(request.path_info, request.GET, response.get('X-Cache') in ('HIT', 'STALE'))
+
+
+class LimitationCoutMiddleware:
+    """
+    Refuse (429) les requêtes de l'API d'un client dont le budget est épuisé, puis
+    facture le coût de chaque requête servie. Compatible WSGI et ASGI.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        client = client_limite(request, getattr(request, 'user', None))
+        if client is None:
+            return self.get_response(request)
+        if epuise(client):
+            return reponse_limitee(settings.LIMITATION_COUT_MAX)
+        response = self.get_response(request)
+        return entetes(response, facturer(client, cout_reponse(request, response)))
+
+    async def __acall__(self, request):
+        if not request.path_info.startswith(PREFIXE):
+            return await self.get_response(request)
+        utilisateur = await request.auser() if hasattr(request, 'auser') else None
+        client = client_limite(request, utilisateur)
+        if client is None:
+            return await self.get_response(request)
+        if await aepuise(client):
+            return reponse_limitee(settings.LIMITATION_COUT_MAX)
+        response = await self.get_response(request)
+        return entetes(response, await afacturer(client, cout_reponse(request, response)))
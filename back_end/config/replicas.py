@@ -0,0 +1,194 @@
+"""
+Lectures du catalogue sur les répliques PostgreSQL (DB_REPLICAS, voir settings.py).
+
+Les requêtes GET/HEAD/OPTIONS (et CHEMINS_LECTURE) lisent les modèles de `partenaire`
+et `produit` sur une réplique choisie une fois par requête (toutes ses lectures voient
+donc le même état) ; tout le reste, et toutes les écritures, vont sur `default`.
+
+- Lire ses propres écritures : après une requête d'écriture (admin, API), le cookie
+  COOKIE_COLLANT renvoie les lectures du même navigateur sur `default` pendant
+  REPLICA_COLLANT_SECONDES, sans passer par les caches (voir lecture_collante). Une
+  écriture pendant une requête renvoie aussi la suite de cette requête sur `default`.
+- Caches : une entrée mise en cache est servie à tous sous la génération courante du
+  catalogue ; elle est donc toujours calculée sur `default` (lecture(None)), jamais
+  sur une réplique qui peut être antérieure à la dernière modification.
+- Retard : le retard de chaque réplique est mesuré au plus toutes les
+  REPLICA_VERIFICATION_SECONDES par processus. Une réplique injoignable ou en retard
+  de plus de REPLICA_RETARD_MAX secondes est écartée ; sans réplique utilisable, les
+  lectures restent sur `default`.
+"""
+import logging
+import random
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+
+logger = logging.getLogger(__name__)
+
+APPLICATIONS = ('partenaire', 'produit')
+METHODES_LECTURE = ('GET', 'HEAD', 'OPTIONS')
+COOKIE_COLLANT = 'lecture_principale'
+# Requêtes POST qui ne font que lire : lots de GET (config/batch.py), GraphQL sans
+# mutation (config/graphql_lecture.py)
+CHEMINS_LECTURE = ('/api/batch/', '/api/graphql/')
+
+# 0 si la réplique a rejoué tout le WAL reçu (ou n'est pas en réplication), sinon
+# l'âge de la dernière transaction rejouée
+REQUETE_RETARD = """
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp())
+    END
+"""
+
+# Alias de la réplique des lectures de la requête en cours (None : `default`)
+_alias_lecture = ContextVar('alias_lecture', default=None)
+
+_verrou = threading.Lock()
+_etat = {'verifie': None, 'disponibles': []}
+
+
+def repliques():
+    return settings.REPLICAS
+
+
+def retard(alias):
+    """Retard de réplication en secondes, None si la réplique est injoignable"""
+    connexion = connections[alias]
+    try:
+        with connexion.cursor() as cursor:
+            cursor.execute(REQUETE_RETARD)
+            valeur = cursor.fetchone()[0]
+    except DatabaseError as exc:
+        logger.warning("Réplique %s injoignable (%s)", alias, exc)
+        connexion.close()
+        return None
+    return None if valeur is None else float(valeur)
+
+
+def repliques_disponibles():
+    """Répliques assez à jour, mesurées au plus toutes les REPLICA_VERIFICATION_SECONDES"""
+    maintenant = time.monotonic()
+    verifie = _etat['verifie']
+    if verifie is not None and maintenant - verifie < settings.REPLICA_VERIFICATION_SECONDES:
+        return _etat['disponibles']
+    # Un seul thread mesure ; les autres gardent la dernière mesure en attendant
+    if not _verrou.acquire(blocking=False):
+        return _etat['disponibles']
+    try:
+        disponibles = []
+        for alias in repliques():
+            secondes = retard(alias)
+            if secondes is not None and secondes <= settings.REPLICA_RETARD_MAX:
+                disponibles.append(alias)
+            elif secondes is not None:
+                logger.warning("Réplique %s écartée : %.1f s de retard", alias, secondes)
+        _etat.update(verifie=time.monotonic(), disponibles=disponibles)
+        return disponibles
+    finally:
+        _verrou.release()
+
+
+def choisir_replique():
+    """Alias d'une réplique utilisable, None pour lire sur `default`"""
+    if not repliques():
+        return None
+    disponibles = repliques_disponibles()
+    return random.choice(disponibles) if disponibles else None
+
+
+@contextmanager
+def lecture(alias):
+    """Lit les modèles du catalogue sur `alias` (None : `default`) dans ce bloc"""
+    jeton = _alias_lecture.set(alias)
+    try:
+        yield
+    finally:
+        _alias_lecture.reset(jeton)
+
+
+def est_lecture(request):
+    return request.method in METHODES_LECTURE or request.path_info in CHEMINS_LECTURE
+
+
+def lecture_collante(request):
+    """Le client vient d'écrire : ses lectures doivent voir ses écritures (cookie collant)"""
+    return COOKIE_COLLANT in request.COOKIES
+
+
+def alias_lecture(request):
+    """Alias des lectures de `request` : réplique pour une lecture sans cookie collant"""
+    if not est_lecture(request) or lecture_collante(request):
+        return None
+    return choisir_replique()
+
+
+def marquer_ecriture(response):
+    """Renvoie les lectures suivantes du client sur `default` le temps que les répliques rattrapent"""
+    response.set_cookie(
+        COOKIE_COLLANT, '1', max_age=settings.REPLICA_COLLANT_SECONDES,
+        httponly=True, samesite='Lax', secure=settings.SESSION_COOKIE_SECURE,
+    )
+    return response
+
+
+class RoutageRepliques:
+    """Routeur de base de données (DATABASE_ROUTERS)"""
+
+    def db_for_read(self, model, **hints):
+        if model._meta.app_label in APPLICATIONS:
+            return _alias_lecture.get()
+        return None
+
+    def db_for_write(self, model, **hints):
+        # Les lectures suivantes de la même requête voient l'écriture
+        _alias_lecture.set(None)
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Les répliques sont des copies de `default`
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Le schéma des répliques vient de la réplication
+        if db in repliques():
+            return False
+        return None
+
+
+class RepliquesMiddleware:
+    """
+    Choisit la base des lectures de chaque requête et pose le cookie collant après
+    une écriture. Compatible WSGI et ASGI.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        with lecture(alias_lecture(request)):
+            response = self.get_response(request)
+        if not est_lecture(request):
+            marquer_ecriture(response)
+        return response
+
+    async def __acall__(self, request):
+        # La mesure du retard interroge les répliques
+        alias = await sync_to_async(alias_lecture)(request)
+        with lecture(alias):
+            response = await self.get_response(request)
+        if not est_lecture(request):
+            marquer_ecriture(response)
+        return response
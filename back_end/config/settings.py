@@ -2,6 +2,7 @@
 Django settings for config project.
 """
 import os
+from importlib.util import find_spec
 from pathlib import Path
 from decouple import config
 
@@ -25,6 +26,8 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    # OpClass des index trigrammes (partenaire/models.py : index_recherche)
+    'django.contrib.postgres',
     # Third party apps
     'rest_framework',
     'django_filters',
@@ -44,9 +47,14 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'config.limitation.LimitationCoutMiddleware',
+    'config.replicas.RepliquesMiddleware',
+    # En dernier : les réponses servies depuis le cache traversent tous les autres middlewares
+    'partenaire.cache.CacheReponsesMiddleware',
 ]
 
-ROOT_URLCONF = 'config.urls'
+# config/asgi.py sélectionne config.urls_async (vues de lecture asynchrones)
+ROOT_URLCONF = config('ROOT_URLCONF', default='config.urls')
 
 TEMPLATES = [
     {
@@ -78,6 +86,51 @@ DATABASES = {
     }
 }
 
+# Répliques en lecture seule du catalogue, "hote:port,hote:port" (voir config/replicas.py)
+REPLICAS = []
+for numero, adresse in enumerate(config('DB_REPLICAS', default='', cast=lambda v: [s.strip() for s in v.split(',') if s.strip()]), 1):
+    hote, _, port = adresse.partition(':')
+    REPLICAS.append(f'replica_{numero}')
+    DATABASES[f'replica_{numero}'] = {
+        **DATABASES['default'],
+        'HOST': hote,
+        'PORT': port or DATABASES['default']['PORT'],
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_ROUTERS = ['config.replicas.RoutageRepliques']
+# Retard maximal (secondes) d'une réplique utilisée, et intervalle entre deux mesures
+REPLICA_RETARD_MAX = config('REPLICA_RETARD_MAX', default=5, cast=float)
+REPLICA_VERIFICATION_SECONDES = config('REPLICA_VERIFICATION_SECONDES', default=2, cast=float)
+# Durée pendant laquelle un client lit sur `default` après une écriture
+REPLICA_COLLANT_SECONDES = config('REPLICA_COLLANT_SECONDES', default=15, cast=int)
+
+# Cache partagé entre les workers (Redis) ; cache mémoire propre à chaque processus sinon
+REDIS_URL = config('REDIS_URL', default='')
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+# Durée de vie (secondes) des réponses du catalogue en cache, 0 pour désactiver (voir partenaire/cache.py)
+CACHE_REPONSES_DUREE = config('CACHE_REPONSES_DUREE', default=300, cast=int)
+# Lectures asynchrones servies depuis un graphe du catalogue en mémoire (voir partenaire/graphe.py) ;
+# nécessite un cache partagé entre les workers pour voir les modifications des autres
+GRAPHE_CATALOGUE = config('GRAPHE_CATALOGUE', default=bool(REDIS_URL), cast=bool)
+# Durée pendant laquelle une réponse expirée peut encore être servie pendant son recalcul
+CACHE_REPONSES_GRACE = config('CACHE_REPONSES_GRACE', default=60, cast=int)
+# Une réponse servie moins de N secondes avant son expiration est recalculée en arrière-plan
+CACHE_REPONSES_RAFRAICHISSEMENT = config('CACHE_REPONSES_RAFRAICHISSEMENT', default=30, cast=int)
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -111,6 +164,22 @@ STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Snapshots JSON statiques de l'API publique (voir partenaire/snapshot.py)
+SNAPSHOT_ROOT = config('SNAPSHOT_ROOT', default=os.path.join(BASE_DIR, 'snapshots'))
+# URL publique de l'API, utilisée pour les URLs absolues des fichiers publiés (hôte dans ALLOWED_HOSTS)
+SNAPSHOT_URL_BASE = config('SNAPSHOT_URL_BASE', default='http://localhost:8001')
+SNAPSHOT_PUBLICATION_AUTO = config('SNAPSHOT_PUBLICATION_AUTO', default=True, cast=bool)
+SNAPSHOT_VERSIONS_CONSERVEES = config('SNAPSHOT_VERSIONS_CONSERVEES', default=5, cast=int)
+
+# Notifications de revalidation du frontend (voir partenaire/revalidation.py), désactivées sans URL
+REVALIDATION_URL = config('REVALIDATION_URL', default='')
+REVALIDATION_SECRET = config('REVALIDATION_SECRET', default='')
+REVALIDATION_DELAI = config('REVALIDATION_DELAI', default=1.0, cast=float)
+REVALIDATION_TENTATIVES = config('REVALIDATION_TENTATIVES', default=5, cast=int)
+
+# Rétention du journal des changements (/api/changes/, purgé par `manage.py purge_changes`)
+CHANGEMENTS_RETENTION_JOURS = config('CHANGEMENTS_RETENTION_JOURS', default=30, cast=int)
+
 # Default primary key field type
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
@@ -129,9 +198,24 @@ REST_FRAMEWORK = {
     'DEFAULT_RENDERER_CLASSES': [
         'rest_framework.renderers.JSONRenderer',
         'rest_framework.renderers.BrowsableAPIRenderer',
-    ],
+        # Formats compacts pour les clients d'intégration (voir partenaire/formats.py)
+        'partenaire.formats.ColonnesRenderer',
+    ] + (['partenaire.formats.MessagePackRenderer'] if find_spec('msgpack') else []),
+    # Proxys inverses de confiance devant l'API : 0 (par défaut), l'adresse du client est
+    # REMOTE_ADDR et X-Forwarded-For, que le client peut forger, est ignoré
+    'NUM_PROXIES': config('NUM_PROXIES', default=0, cast=int),
 }
 
+# Limitation du débit de l'API par coût estimé (voir config/limitation.py), 0 pour désactiver
+LIMITATION_COUT_MAX = config('LIMITATION_COUT_MAX', default=1200, cast=int)
+LIMITATION_FENETRE = config('LIMITATION_FENETRE', default=60, cast=int)
+# Adresses jamais limitées (serveur Next.js du frontend...)
+LIMITATION_EXEMPTIONS = config('LIMITATION_EXEMPTIONS', default='', cast=lambda v: [s.strip() for s in v.split(',') if s.strip()])
+
+# Endpoint GraphQL (voir config/graphql_lecture.py) : niveaux imbriqués et nombre estimé de champs résolus au plus
+GRAPHQL_PROFONDEUR_MAX = config('GRAPHQL_PROFONDEUR_MAX', default=8, cast=int)
+GRAPHQL_COMPLEXITE_MAX = config('GRAPHQL_COMPLEXITE_MAX', default=10000, cast=int)
+
 # CORS configuration
 CORS_ALLOWED_ORIGINS = config(
     'CORS_ALLOWED_ORIGINS',
@@ -0,0 +1,99 @@
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from graphql import parse
+
+from config.graphql_lecture import Query, mesurer
+from partenaire.tests.donnees import creer_arbre, creer_partenaire
+
+
+ARBRE = """{
+    partenaires {
+        nom
+        familles { titre sous_familles { titre produits_fournisseur { nom catalogues { nom } } } }
+    }
+}"""
+
+
+def complexite(requete):
+    """(profondeur, complexité) de la première opération du document"""
+    operation, *fragments = parse(requete).definitions
+    fragments = {fragment.name.value: fragment for fragment in fragments}
+    return mesurer(Query, operation.selection_set.selections, fragments, {})
+
+
+@override_settings(CACHE_REPONSES_DUREE=0, LIMITATION_COUT_MAX=0)
+class GraphQLTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+
+    def executer(self, requete, variables=None):
+        return self.client.post('/api/graphql/', {'query': requete, 'variables': variables or {}}, content_type='application/json')
+
+    def test_une_requete_par_niveau(self):
+        for nom in 'AB':
+            creer_arbre([creer_partenaire(nom)], titre=f'Famille {nom}')
+        # Liste racine, puis une requête par relation, quel que soit le nombre d'objets
+        with self.assertNumQueries(5):
+            data = self.executer(ARBRE).json()['data']
+        self.assertEqual([p['nom'] for p in data['partenaires']], ['A', 'B'])
+
+        for nom in 'CDE':
+            creer_arbre([creer_partenaire(nom)], titre=f'Famille {nom}')
+        with self.assertNumQueries(5):
+            data = self.executer(ARBRE).json()['data']
+        self.assertEqual(len(data['partenaires']), 5)
+        self.assertEqual(
+            data['partenaires'][0]['familles'][0]['sous_familles'][0]['produits_fournisseur'][0]['catalogues'],
+            [{'nom': 'Catalogue'}],
+        )
+
+    def test_relations_inverses(self):
+        famille, *_ = creer_arbre(titre='Famille A')
+        creer_arbre(titre='Famille B')
+        with self.assertNumQueries(4):
+            data = self.executer('{ catalogues { produit_fournisseur { sous_famille { famille { titre } } } } }').json()['data']
+        self.assertEqual(
+            sorted(c['produit_fournisseur']['sous_famille']['famille']['titre'] for c in data['catalogues']),
+            ['Famille A', 'Famille B'],
+        )
+
+    def test_filtres(self):
+        actif, inactif = creer_partenaire('A'), creer_partenaire('B', actif=False)
+        creer_arbre([actif, inactif])
+        data = self.executer('{ partenaires(visible: true) { nom } familles { partenaires(actif: false) { nom } } }').json()['data']
+        self.assertEqual(data['partenaires'], [{'nom': 'A'}])
+        self.assertEqual(data['familles'], [{'partenaires': [{'nom': 'B'}]}])
+
+    def test_complexite(self):
+        self.assertEqual(complexite('{ partenaires { nom } }'), (2, 20 * (1 + 1)))
+        self.assertEqual(complexite('{ partenaires(limite: 5) { nom familles { titre } } }'), (3, 5 * (1 + 1 + 3 * 2)))
+        self.assertEqual(
+            complexite('{ partenaire(id: 1) { ...champs } } fragment champs on Partenaire { nom familles { titre } }'),
+            (3, 1 + 1 + 3 * 2),
+        )
+
+    @override_settings(GRAPHQL_PROFONDEUR_MAX=4)
+    def test_profondeur_maximale(self):
+        self.assertEqual(self.executer('{ partenaires { familles { sous_familles { titre } } } }').status_code, 200)
+        response = self.executer(ARBRE)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('trop profonde', response.json()['errors'][0]['message'])
+
+    @override_settings(GRAPHQL_COMPLEXITE_MAX=1000)
+    def test_complexite_maximale(self):
+        requete = 'query($n: Int) { partenaires(limite: $n) { nom familles { titre } } }'
+        self.assertEqual(self.executer(requete, {'n': 100}).status_code, 200)
+        with self.assertNumQueries(0):
+            response = self.executer(requete.replace('titre', 'titre sous_familles { titre }'), {'n': 100})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('trop complexe', response.json()['errors'][0]['message'])
+
+    def test_lecture_seule(self):
+        response = self.executer('mutation { partenaires { nom } }')
+        self.assertEqual(response.status_code, 400)
+
+    def test_limite_invalide(self):
+        response = self.executer('{ partenaires(limite: 500) { nom } }')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('limite', response.json()['errors'][0]['message'])
@@ -0,0 +1,89 @@
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.http import QueryDict
+from django.test import RequestFactory, TestCase, override_settings
+
+from config.limitation import COUT_ARCHIVE, client_limite, cout
+
+
+class CoutTests(TestCase):
+
+    def test_listes_et_objets(self):
+        self.assertEqual(cout('/api/partenaires/', QueryDict()), 41)
+        self.assertEqual(cout('/api/partenaires/actifs/', QueryDict()), 41)
+        self.assertEqual(cout('/api/partenaires/3/', QueryDict()), 3)
+        self.assertEqual(cout('/api/produits/', QueryDict()), 81)
+        self.assertEqual(cout('/api/catalogues/', QueryDict()), 4)
+        self.assertEqual(cout('/api/familles/2/sous-familles/', QueryDict()), 4)
+
+    def test_recherche_et_tri(self):
+        self.assertEqual(cout('/api/partenaires/', QueryDict('search=abc')), 123)
+        self.assertEqual(cout('/api/partenaires/', QueryDict('ordering=nom')), 123)
+        self.assertEqual(cout('/api/partenaires/', QueryDict('search=')), 41)
+
+    def test_couts_fixes(self):
+        self.assertEqual(cout('/api/partenaires/', QueryDict(), depuis_cache=True), 1)
+        self.assertEqual(cout('/api/partenaires/3/catalogues-zip/', QueryDict()), COUT_ARCHIVE)
+        self.assertEqual(cout('/api/produits/facettes/', QueryDict()), 4)
+        self.assertEqual(cout('/api/changes/', QueryDict()), 6)
+        self.assertEqual(cout('/api/changes/', QueryDict('limit=5000')), 11)
+        self.assertEqual(cout('/api/inconnu/', QueryDict()), 1)
+
+
+@override_settings(LIMITATION_COUT_MAX=100, CACHE_REPONSES_DUREE=0)
+class LimitationCoutMiddlewareTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+
+    def restant(self, response):
+        return int(response['X-RateLimit-Remaining'])
+
+    def test_facturation(self):
+        response = self.client.get('/api/partenaires/')
+        self.assertEqual(response['X-RateLimit-Limit'], '100')
+        self.assertEqual(self.restant(response), 59)
+        self.assertEqual(self.restant(self.client.get('/api/partenaires/1/')), 58)  # 404 : une unité
+
+    def test_budget_epuise(self):
+        for restant in (59, 18, 0):
+            self.assertEqual(self.restant(self.client.get('/api/partenaires/')), restant)
+        response = self.client.get('/api/catalogues/')
+        self.assertEqual(response.status_code, 429)
+        self.assertGreater(int(response['Retry-After']), 0)
+        self.assertEqual(self.restant(response), 0)
+
+    def test_clients_distincts(self):
+        self.client.get('/api/partenaires/')
+        response = self.client.get('/api/partenaires/', REMOTE_ADDR='10.0.0.2')
+        self.assertEqual(self.restant(response), 59)
+
+    def test_x_forwarded_for_ignore(self):
+        self.client.get('/api/partenaires/')
+        # Un X-Forwarded-For différent à chaque requête ne donne pas un nouveau budget
+        response = self.client.get('/api/partenaires/', HTTP_X_FORWARDED_FOR='203.0.113.7')
+        self.assertEqual(self.restant(response), 18)
+
+    def test_proxy_de_confiance(self):
+        with override_settings(REST_FRAMEWORK={**settings.REST_FRAMEWORK, 'NUM_PROXIES': 1}):
+            premier = self.client.get('/api/partenaires/', HTTP_X_FORWARDED_FOR='1.1.1.1, 203.0.113.7')
+            # Seule l'entrée ajoutée par le proxy compte
+            second = self.client.get('/api/partenaires/', HTTP_X_FORWARDED_FOR='2.2.2.2, 203.0.113.7')
+            autre = self.client.get('/api/partenaires/', HTTP_X_FORWARDED_FOR='203.0.113.8')
+        self.assertEqual((self.restant(premier), self.restant(second), self.restant(autre)), (59, 18, 59))
+
+    @override_settings(CACHE_REPONSES_DUREE=300)
+    def test_reponse_en_cache(self):
+        self.client.get('/api/partenaires/')
+        response = self.client.get('/api/partenaires/')
+        self.assertEqual(response['X-Cache'], 'HIT')
+        self.assertEqual(self.restant(response), 58)
+
+    def test_exemptions(self):
+        self.client.force_login(User.objects.create_user('admin', is_staff=True))
+        self.assertNotIn('X-RateLimit-Remaining', self.client.get('/api/partenaires/'))
+        self.client.logout()
+        with override_settings(LIMITATION_EXEMPTIONS=['127.0.0.1']):
+            self.assertNotIn('X-RateLimit-Remaining', self.client.get('/api/partenaires/'))
+        self.assertIsNone(client_limite(RequestFactory().get('/admin/'), None))
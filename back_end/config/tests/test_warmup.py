@@ -0,0 +1,27 @@
+from django.core.cache import cache
+from django.test import RequestFactory, TestCase, override_settings
+
+from config.warmup import remplir_caches
+from partenaire.cache import cle_reponse, generation, invalider
+from partenaire.tests.donnees import creer_arbre, creer_partenaire
+
+
+@override_settings(LIMITATION_COUT_MAX=0)
+class RemplirCachesTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        creer_arbre([creer_partenaire('A')])
+
+    def test_navigation(self):
+        remplir_caches()
+        for langue in ('toutes', 'fr', 'en', 'ar'):
+            self.assertEqual(cache.get(f'navigation:{langue}')['generation'], generation())
+
+    def test_reponses_chaudes(self):
+        self.client.get('/api/partenaires/actifs/')
+        invalider()
+        remplir_caches()
+        cle = cle_reponse(RequestFactory().get('/api/partenaires/actifs/'))
+        self.assertEqual(cache.get(cle)['generation'], generation())
+        self.assertEqual(self.client.get('/api/partenaires/actifs/')['X-Cache'], 'HIT')
@@ -8,9 +8,13 @@ from django.conf.urls.static import static
 
 # Import de la personnalisation de l'admin
 from . import admin as admin_config
+from .batch import BatchView
+from .graphql_lecture import GraphQLView
 
 urlpatterns = [
     path('admin/', admin.site.urls),
+    path('api/batch/', BatchView.as_view(), name='batch'),
+    path('api/graphql/', GraphQLView.as_view(), name='graphql'),
     path('api/', include('partenaire.urls')),
     path('api/', include('produit.urls')),
 ]
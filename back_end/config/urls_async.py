@@ -0,0 +1,21 @@
+"""
+URL configuration utilisée sous ASGI.
+
+Les lectures du catalogue public sont servies par des vues asynchrones ;
+toutes les autres URLs (écritures, admin, médias) restent celles de config/urls.py.
+"""
+from django.urls import path, include
+
+from partenaire import async_views as partenaire_async
+from produit import async_views as produit_async
+
+urlpatterns = [
+    path('api/partenaires/', partenaire_async.liste_partenaires),
+    path('api/partenaires/actifs/', partenaire_async.partenaires_actifs),
+    path('api/partenaires/<int:pk>/', partenaire_async.detail_partenaire),
+    path('api/sous-familles/<int:pk>/', partenaire_async.detail_sous_famille),
+    path('api/produits/', produit_async.liste_produits),
+    path('api/produits/actifs/', produit_async.produits_actifs),
+    path('api/produits/<int:pk>/', produit_async.detail_produit),
+    path('', include('config.urls')),
+]
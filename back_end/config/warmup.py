@@ -0,0 +1,150 @@
+"""
+Préchauffage de l'application avant le fork des workers gunicorn.
+
+Appelé une seule fois dans le processus maître (voir gunicorn.conf.py, preload_app) :
+tout ce qui est construit ici (modules, résolveurs d'URL, champs des serializers,
+templates compilés, caches) est hérité par les workers et partagé en copie sur écriture.
+"""
+import importlib
+import importlib.util
+import logging
+import time
+
+from django.apps import apps
+from django.conf import settings
+from django.db import connections
+from django.urls import get_resolver
+from django.utils import translation
+
+logger = logging.getLogger(__name__)
+
+# Sous-modules importés pour chaque application locale ou tierce
+MODULES_APPLICATION = (
+    'models', 'admin', 'urls', 'views', 'async_views', 'serializers', 'filters', 'requetes', 'permissions',
+)
+
+# Chemins résolus pour construire les tables des résolveurs d'URL
+CHEMINS_RESOLUS = (
+    '/api/partenaires/', '/api/partenaires/actifs/', '/api/partenaires/1/',
+    '/api/sous-familles/1/', '/api/produits/', '/api/produits/actifs/', '/api/produits/1/',
+    '/admin/',
+)
+
+# Templates de l'admin (jazzmin) et de l'API navigable
+TEMPLATES = (
+    'admin/base_site.html', 'admin/index.html', 'admin/login.html',
+    'admin/change_list.html', 'admin/change_form.html', 'admin/delete_confirmation.html',
+    'rest_framework/api.html',
+)
+
+
+def importer_modules():
+    """Importe les sous-modules de chaque application installée"""
+    for app_config in apps.get_app_configs():
+        for nom in MODULES_APPLICATION:
+            module = f'{app_config.name}.{nom}'
+            if importlib.util.find_spec(module) is not None:
+                importlib.import_module(module)
+
+
+def resoudre_urls():
+    """Construit les résolveurs d'URL (URLconf principale et celle des ViewSets)"""
+    for urlconf in {settings.ROOT_URLCONF, 'config.urls'}:
+        resolver = get_resolver(urlconf)
+        resolver.reverse_dict  # noqa: B018 - déclenche _populate()
+        for chemin in CHEMINS_RESOLUS:
+            resolver.resolve(chemin)
+
+
+def construire_serializers():
+    """Construit les champs de tous les serializers DRF, y compris imbriqués"""
+    from rest_framework import serializers
+
+    def parcourir(serializer):
+        for champ in serializer.fields.values():
+            if isinstance(champ, serializers.ListSerializer):
+                champ = champ.child
+            if isinstance(champ, serializers.Serializer):
+                parcourir(champ)
+
+    for module in ('partenaire.serializers', 'produit.serializers'):
+        for objet in vars(importlib.import_module(module)).values():
+            if isinstance(objet, type) and issubclass(objet, serializers.Serializer) and objet.__module__ == module:
+                parcourir(objet())
+
+
+def charger_templates():
+    """Compile les templates de l'admin et de l'API navigable, et charge les traductions"""
+    from django.template.loader import get_template
+
+    with translation.override(settings.LANGUAGE_CODE):
+        translation.gettext('Save')
+        for nom in TEMPLATES:
+            get_template(nom)
+
+
+def preparer_base_de_donnees():
+    """Ouvre la connexion et remplit le cache des ContentTypes (admin, permissions)"""
+    from django.contrib.contenttypes.models import ContentType
+
+    ContentType.objects.get_for_models(*apps.get_models())
+
+
+def charger_graphe():
+    """Charge le graphe du catalogue en mémoire, partagé par les workers jusqu'à la première modification"""
+    from partenaire.cache import generation
+    from partenaire.graphe import recharger
+
+    if settings.GRAPHE_CATALOGUE:
+        recharger(generation())
+
+
+def remplir_caches():
+    """
+    Remplit les caches du catalogue pour la génération courante : arbre de navigation
+    (chaque langue) et réponses de CHEMINS_CHAUDS déjà demandées (voir partenaire/cache.py).
+    Sans Redis, le cache mémoire ainsi rempli est hérité par les workers.
+    """
+    from django.test import RequestFactory
+    from partenaire.cache import rechauffer
+    from partenaire.langues import LANGUES
+    from partenaire.navigation import arbre_navigation
+
+    request = RequestFactory().get('/api/navigation/')
+    for langue in (None, *LANGUES):
+        arbre_navigation(request, langue)
+    if settings.CACHE_REPONSES_DUREE > 0:
+        rechauffer()
+
+
+ETAPES = [
+    ('modules', importer_modules),
+    ('urls', resoudre_urls),
+    ('serializers', construire_serializers),
+    ('templates', charger_templates),
+    ('base', preparer_base_de_donnees),
+    ('graphe', charger_graphe),
+    ('caches', remplir_caches),
+]
+
+
+def prechauffer():
+    """
+    Exécute chaque étape de préchauffage et retourne [(nom, durée en secondes, erreur)].
+    Une étape en échec (base indisponible...) est signalée sans empêcher le démarrage.
+    """
+    rapport = []
+    try:
+        for nom, etape in ETAPES:
+            debut = time.perf_counter()
+            erreur = None
+            try:
+                etape()
+            except Exception as exc:
+                erreur = exc
+                logger.warning("Préchauffage : échec de l'étape %s (%s)", nom, exc)
+            rapport.append((nom, time.perf_counter() - debut, erreur))
+    finally:
+        # Les connexions ne doivent pas être partagées entre les workers après le fork
+        connections.close_all()
+    return rapport
@@ -0,0 +1,28 @@
+"""
+Configuration gunicorn, chargée automatiquement depuis le répertoire de lancement.
+
+L'application est chargée et préchauffée une seule fois dans le processus maître
+(preload_app) : les workers forkés démarrent « chauds » et partagent cette mémoire
+en copie sur écriture. Les options de la ligne de commande (bind, workers,
+worker-class) restent prioritaires.
+"""
+import gc
+
+preload_app = True
+
+
+def when_ready(server):
+    """Préchauffe l'application dans le maître, juste avant le fork des workers"""
+    from config.warmup import prechauffer
+
+    total = 0.0
+    for nom, duree, erreur in prechauffer():
+        total += duree
+        statut = f"échec : {erreur}" if erreur else "ok"
+        server.log.info("Préchauffage %-12s %8.1f ms  %s", nom, duree * 1000, statut)
+    server.log.info("Préchauffage terminé en %.1f ms", total * 1000)
+
+    # Les objets créés jusqu'ici ne seront plus parcourus par le GC des workers,
+    # ce qui évite de toucher (et donc de copier) leurs pages mémoire
+    gc.collect()
+    gc.freeze()
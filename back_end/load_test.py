@@ -0,0 +1,261 @@
+#!/usr/bin/env python3
+"""
+Banc de charge reproductible pour l'API publique.
+
+Rejoue le mélange de trafic du frontend (ou un journal d'accès réel) contre un
+serveur local et affiche, par endpoint : débit, latences p50/p95/p99 et taux d'erreur.
+
+N'utilise que la bibliothèque standard, pour pouvoir tourner hors du conteneur.
+
+Exemples :
+    python manage.py seed_catalog --scale 5 --seed 42
+    gunicorn --bind 127.0.0.1:8000 --workers 3 config.wsgi:application
+    python load_test.py --url http://127.0.0.1:8000 --duration 60 --concurrency 16
+    python load_test.py --replay /var/log/gunicorn/access.log --json rapport.json
+"""
+import argparse
+import gzip
+import http.client
+import json
+import math
+import random
+import re
+import sys
+import threading
+import time
+from collections import defaultdict
+from urllib.parse import urlsplit
+
+try:
+    import brotli
+except ImportError:  # dépendance optionnelle : gzip uniquement
+    brotli = None
+
+
+# Mélange observé côté frontend : (gabarit d'URL, poids)
+MELANGE_PAR_DEFAUT = [
+    ('/api/partenaires/actifs/', 25),
+    ('/api/partenaires/{partenaire}/', 25),
+    ('/api/sous-familles/{sous_famille}/', 20),
+    ('/api/produits/actifs/', 15),
+    ('/api/produits/{produit}/', 10),
+    ('/api/produits/?search={terme}', 5),
+]
+
+TERMES_RECHERCHE = ['analyseur', 'kit', 'reactif', 'controle', 'hematologie', 'biochimie']
+
+# Codages annoncés comme le ferait un navigateur (le cache des réponses sert les variantes précompressées)
+ACCEPT_ENCODING = 'gzip, br' if brotli is not None else 'gzip'
+
+LIGNE_JOURNAL = re.compile(r'"(?:GET|HEAD) (?P<chemin>/api/\S*) HTTP/[\d.]+"')
+SEGMENT_NUMERIQUE = re.compile(r'/\d+(?=/|$)')
+PARAMETRE_GABARIT = re.compile(r'\{(?:partenaire|sous_famille|produit)\}')
+
+
+def gabarit(chemin):
+    """Regroupe les URLs par endpoint : /api/partenaires/12/?x=1 -> /api/partenaires/{id}/"""
+    return SEGMENT_NUMERIQUE.sub('/{id}', chemin.split('?', 1)[0])
+
+
+def percentile(valeurs_triees, rang):
+    """Percentile au rang le plus proche sur une liste déjà triée"""
+    if not valeurs_triees:
+        return 0.0
+    index = max(0, math.ceil(rang / 100 * len(valeurs_triees)) - 1)
+    return valeurs_triees[index]
+
+
+def decompresser(corps, codage):
+    """Corps décodé selon Content-Encoding (http.client ne décode pas)"""
+    codage = codage.strip().lower()
+    if codage == 'gzip':
+        return gzip.decompress(corps)
+    if codage == 'br':
+        return brotli.decompress(corps)
+    return corps
+
+
+class Cible:
+    """Connexion HTTP persistante (keep-alive) vers le serveur testé"""
+
+    def __init__(self, url, timeout):
+        morceaux = urlsplit(url)
+        self.classe = http.client.HTTPSConnection if morceaux.scheme == 'https' else http.client.HTTPConnection
+        self.hote = morceaux.netloc
+        self.timeout = timeout
+        self.connexion = None
+
+    def get(self, chemin, decoder=False):
+        """(statut, corps) ; le corps n'est décompressé que si `decoder` (hors mesures)"""
+        if self.connexion is None:
+            self.connexion = self.classe(self.hote, timeout=self.timeout)
+        try:
+            self.connexion.request('GET', chemin, headers={'Accept': 'application/json', 'Accept-Encoding': ACCEPT_ENCODING})
+            reponse = self.connexion.getresponse()
+            corps = reponse.read()
+            if decoder:
+                corps = decompresser(corps, reponse.getheader('Content-Encoding', ''))
+            return reponse.status, corps
+        except Exception:
+            self.connexion.close()
+            self.connexion = None
+            raise
+
+
+def decouvrir_identifiants(url, timeout):
+    """Récupère des identifiants réels à injecter dans les gabarits du mélange"""
+    cible = Cible(url, timeout)
+    identifiants = {'partenaire': [], 'sous_famille': [], 'produit': []}
+
+    statut, corps = cible.get('/api/partenaires/actifs/', decoder=True)
+    if statut == 200:
+        for partenaire in json.loads(corps).get('results', []):
+            identifiants['partenaire'].append(partenaire['id'])
+            for famille in partenaire.get('familles') or []:
+                identifiants['sous_famille'].extend(sf['id'] for sf in famille.get('sous_familles') or [])
+
+    statut, corps = cible.get('/api/produits/actifs/', decoder=True)
+    if statut == 200:
+        identifiants['produit'] = [produit['id'] for produit in json.loads(corps).get('results', [])]
+
+    manquants = [nom for nom, valeurs in identifiants.items() if not valeurs]
+    if manquants:
+        sys.exit(f"Aucun identifiant trouvé pour {', '.join(manquants)} : lancez d'abord `manage.py seed_catalog`.")
+    return identifiants
+
+
+def generateur_melange(identifiants, alea):
+    """Tire des requêtes selon le mélange pondéré par défaut"""
+    gabarits, poids = zip(*MELANGE_PAR_DEFAUT)
+
+    def suivante():
+        modele = alea.choices(gabarits, weights=poids)[0]
+        chemin = modele.format(
+            partenaire=alea.choice(identifiants['partenaire']),
+            sous_famille=alea.choice(identifiants['sous_famille']),
+            produit=alea.choice(identifiants['produit']),
+            terme=alea.choice(TERMES_RECHERCHE),
+        )
+        return PARAMETRE_GABARIT.sub('{id}', modele), chemin
+
+    return suivante
+
+
+def generateur_rejeu(fichier):
+    """Rejoue, dans l'ordre et en boucle, les GET /api/ d'un journal d'accès"""
+    with open(fichier, encoding='utf-8', errors='replace') as journal:
+        chemins = [m.group('chemin') for m in map(LIGNE_JOURNAL.search, journal) if m]
+    if not chemins:
+        sys.exit(f"Aucune requête GET /api/ trouvée dans {fichier}.")
+    verrou = threading.Lock()
+    position = [0]
+
+    def suivante():
+        with verrou:
+            chemin = chemins[position[0] % len(chemins)]
+            position[0] += 1
+        return gabarit(chemin), chemin
+
+    return suivante
+
+
+def travailleur(url, timeout, suivante, fin_echauffement, fin, resultats):
+    cible = Cible(url, timeout)
+    while True:
+        maintenant = time.perf_counter()
+        if maintenant >= fin:
+            return
+        libelle, chemin = suivante()
+        debut = time.perf_counter()
+        try:
+            statut, _ = cible.get(chemin)
+            erreur = statut >= 400
+        except Exception:
+            statut, erreur = 0, True
+        if debut >= fin_echauffement:
+            resultats.append((libelle, time.perf_counter() - debut, statut, erreur))
+
+
+def rapport(resultats, duree):
+    par_endpoint = defaultdict(list)
+    for ligne in resultats:
+        par_endpoint[ligne[0]].append(ligne)
+    par_endpoint['TOTAL'] = list(resultats)
+
+    lignes = []
+    for libelle, mesures in sorted(par_endpoint.items(), key=lambda item: (item[0] == 'TOTAL', item[0])):
+        latences = sorted(m[1] for m in mesures)
+        erreurs = sum(1 for m in mesures if m[3])
+        lignes.append({
+            'endpoint': libelle,
+            'requetes': len(mesures),
+            'debit_rps': round(len(mesures) / duree, 2),
+            'p50_ms': round(percentile(latences, 50) * 1000, 1),
+            'p95_ms': round(percentile(latences, 95) * 1000, 1),
+            'p99_ms': round(percentile(latences, 99) * 1000, 1),
+            'erreurs': erreurs,
+            'taux_erreur': round(erreurs / len(mesures) * 100, 2) if mesures else 0.0,
+        })
+    return lignes
+
+
+def afficher(lignes):
+    entete = f"{'endpoint':<40} {'req':>7} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'err %':>7}"
+    print(entete)
+    print('-' * len(entete))
+    for ligne in lignes:
+        print(
+            f"{ligne['endpoint']:<40} {ligne['requetes']:>7} {ligne['debit_rps']:>8} {ligne['p50_ms']:>8} "
+            f"{ligne['p95_ms']:>8} {ligne['p99_ms']:>8} {ligne['taux_erreur']:>7}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Banc de charge de l'API Pharma Ethique")
+    parser.add_argument('--url', default='http://127.0.0.1:8000', help="URL du serveur testé")
+    parser.add_argument('--duration', type=float, default=30, help="Durée mesurée en secondes")
+    parser.add_argument('--warmup', type=float, default=5, help="Durée d'échauffement non mesurée en secondes")
+    parser.add_argument('--concurrency', type=int, default=8, help="Nombre de clients simultanés")
+    parser.add_argument('--timeout', type=float, default=30, help="Délai maximal d'une requête en secondes")
+    parser.add_argument('--seed', type=int, default=None, help="Graine du tirage du mélange")
+    parser.add_argument('--replay', metavar='JOURNAL', help="Journal d'accès (gunicorn/nginx) à rejouer")
+    parser.add_argument('--json', metavar='FICHIER', help="Écrit aussi le rapport au format JSON")
+    arguments = parser.parse_args()
+
+    if arguments.replay:
+        suivante = generateur_rejeu(arguments.replay)
+    else:
+        identifiants = decouvrir_identifiants(arguments.url, arguments.timeout)
+        suivante = generateur_melange(identifiants, random.Random(arguments.seed))
+
+    debut = time.perf_counter()
+    fin_echauffement = debut + arguments.warmup
+    fin = fin_echauffement + arguments.duration
+    resultats = []
+    threads = [
+        threading.Thread(
+            target=travailleur,
+            args=(arguments.url, arguments.timeout, suivante, fin_echauffement, fin, resultats),
+            daemon=True,
+        )
+        for _ in range(arguments.concurrency)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    lignes = rapport(resultats, arguments.duration)
+    afficher(lignes)
+    if arguments.json:
+        with open(arguments.json, 'w', encoding='utf-8') as sortie:
+            json.dump({
+                'url': arguments.url,
+                'duree': arguments.duration,
+                'concurrence': arguments.concurrency,
+                'resultats': lignes,
+            }, sortie, indent=2, ensure_ascii=False)
+
+
+if __name__ == '__main__':
+    main()
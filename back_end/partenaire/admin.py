@@ -1,7 +1,9 @@
 from django.contrib import admin
 from django.utils.html import format_html
 from django.urls import reverse
+from .filtres_admin import FiltreAutocomplete, FiltresAutocompleteMixin
 from .models import Partenaire, Famille, SousFamille, ProduitFournisseur, Catalogue
+from .signals import modifier_en_masse
 
 
 @admin.register(Partenaire)
@@ -75,25 +77,26 @@ class PartenaireAdmin(admin.ModelAdmin):
     
     @admin.action(description='Activer les partenaires sélectionnés')
     def activer_partenaires(self, request, queryset):
-        updated = queryset.update(actif=True)
+        updated = modifier_en_masse(queryset, actif=True)
         self.message_user(request, f'{updated} partenaire(s) activé(s) avec succès.')
     
     @admin.action(description='Désactiver les partenaires sélectionnés')
     def desactiver_partenaires(self, request, queryset):
-        updated = queryset.update(actif=False)
+        updated = modifier_en_masse(queryset, actif=False)
         self.message_user(request, f'{updated} partenaire(s) désactivé(s) avec succès.')
 
 
 @admin.register(Famille)
-class FamilleAdmin(admin.ModelAdmin):
-    list_display = ('titre_fr', 'nombre_sous_familles', 'nombre_partenaires', 'ordre', 'actif', 'langues_disponibles', 'date_creation')
+class FamilleAdmin(FiltresAutocompleteMixin, admin.ModelAdmin):
+    list_display = ('titre_fr', 'nombre_sous_familles', 'nombre_partenaires', 'ordre', 'actif', 'visible', 'langues_disponibles', 'date_creation')
     list_display_links = ('titre_fr',)
-    list_filter = ('actif', 'date_creation', 'partenaires')
+    list_filter = ('actif', 'visible', 'date_creation', ('partenaires', FiltreAutocomplete))
     search_fields = ('titre_fr', 'titre_en', 'titre_ar')
     readonly_fields = ('date_creation', 'date_modification', 'nombre_sous_familles', 'nombre_partenaires', 'langues_disponibles')
     list_per_page = 25
     list_editable = ('ordre', 'actif')
-    filter_horizontal = ('partenaires',)
+    # Recherche à la demande au lieu de la liste de tous les partenaires
+    autocomplete_fields = ('partenaires',)
     
     fieldsets = (
         ('Informations multilingues', {
@@ -147,24 +150,25 @@ class FamilleAdmin(admin.ModelAdmin):
     
     @admin.action(description='Activer les familles sélectionnées')
     def activer_familles(self, request, queryset):
-        updated = queryset.update(actif=True)
+        updated = modifier_en_masse(queryset, actif=True)
         self.message_user(request, f'{updated} famille(s) activée(s) avec succès.')
     
     @admin.action(description='Désactiver les familles sélectionnées')
     def desactiver_familles(self, request, queryset):
-        updated = queryset.update(actif=False)
+        updated = modifier_en_masse(queryset, actif=False)
         self.message_user(request, f'{updated} famille(s) désactivée(s) avec succès.')
 
 
 @admin.register(SousFamille)
-class SousFamilleAdmin(admin.ModelAdmin):
-    list_display = ('titre_fr', 'famille', 'nombre_produits', 'ordre', 'actif', 'langues_disponibles', 'date_creation')
+class SousFamilleAdmin(FiltresAutocompleteMixin, admin.ModelAdmin):
+    list_display = ('titre_fr', 'famille', 'nombre_produits', 'ordre', 'actif', 'visible', 'langues_disponibles', 'date_creation')
     list_display_links = ('titre_fr',)
-    list_filter = ('actif', 'date_creation', 'famille')
+    list_filter = ('actif', 'visible', 'date_creation', ('famille', FiltreAutocomplete))
     search_fields = ('titre_fr', 'titre_en', 'titre_ar')
     readonly_fields = ('date_creation', 'date_modification', 'langues_disponibles', 'nombre_produits')
     list_per_page = 25
     list_editable = ('ordre', 'actif')
+    autocomplete_fields = ('famille',)
     
     fieldsets = (
         ('Informations multilingues', {
@@ -189,6 +193,10 @@ class SousFamilleAdmin(admin.ModelAdmin):
     
     actions = ['activer_sous_familles', 'desactiver_sous_familles']
     
+    def get_queryset(self, request):
+        """Famille jointe : __str__ l'affiche (liste, autocomplétion des produits fournisseur)"""
+        return super().get_queryset(request).select_related('famille')
+    
     def nombre_produits(self, obj):
         """Affiche le nombre de produits fournisseur associés"""
         count = obj.produits_fournisseur.count()
@@ -212,12 +220,12 @@ class SousFamilleAdmin(admin.ModelAdmin):
     
     @admin.action(description='Activer les sous-familles sélectionnées')
     def activer_sous_familles(self, request, queryset):
-        updated = queryset.update(actif=True)
+        updated = modifier_en_masse(queryset, actif=True)
         self.message_user(request, f'{updated} sous-famille(s) activée(s) avec succès.')
     
     @admin.action(description='Désactiver les sous-familles sélectionnées')
     def desactiver_sous_familles(self, request, queryset):
-        updated = queryset.update(actif=False)
+        updated = modifier_en_masse(queryset, actif=False)
         self.message_user(request, f'{updated} sous-famille(s) désactivée(s) avec succès.')
 
 
@@ -231,14 +239,16 @@ class CatalogueInline(admin.TabularInline):
 
 
 @admin.register(ProduitFournisseur)
-class ProduitFournisseurAdmin(admin.ModelAdmin):
-    list_display = ('image_preview', 'nom', 'sous_famille', 'ordre', 'actif', 'date_creation')
+class ProduitFournisseurAdmin(FiltresAutocompleteMixin, admin.ModelAdmin):
+    list_display = ('image_preview', 'nom', 'sous_famille', 'ordre', 'actif', 'visible', 'date_creation')
     list_display_links = ('image_preview', 'nom')
-    list_filter = ('actif', 'date_creation', 'sous_famille')
+    list_filter = ('actif', 'visible', 'date_creation', ('sous_famille', FiltreAutocomplete))
     search_fields = ('nom',)
     readonly_fields = ('date_creation', 'date_modification', 'image_preview')
     list_per_page = 25
     list_editable = ('ordre', 'actif')
+    list_select_related = ('sous_famille__famille',)
+    autocomplete_fields = ('sous_famille',)
     inlines = [CatalogueInline]
     
     fieldsets = (
@@ -269,24 +279,30 @@ class ProduitFournisseurAdmin(admin.ModelAdmin):
     
     @admin.action(description='Activer les produits sélectionnés')
     def activer_produits(self, request, queryset):
-        updated = queryset.update(actif=True)
+        updated = modifier_en_masse(queryset, actif=True)
         self.message_user(request, f'{updated} produit(s) activé(s) avec succès.')
     
     @admin.action(description='Désactiver les produits sélectionnés')
     def desactiver_produits(self, request, queryset):
-        updated = queryset.update(actif=False)
+        updated = modifier_en_masse(queryset, actif=False)
         self.message_user(request, f'{updated} produit(s) désactivé(s) avec succès.')
 
 
 @admin.register(Catalogue)
-class CatalogueAdmin(admin.ModelAdmin):
-    list_display = ('nom_affichage', 'produit_fournisseur', 'sous_famille', 'lien_pdf', 'ordre', 'actif', 'date_creation')
+class CatalogueAdmin(FiltresAutocompleteMixin, admin.ModelAdmin):
+    list_display = ('nom_affichage', 'produit_fournisseur', 'sous_famille', 'lien_pdf', 'ordre', 'actif', 'visible', 'date_creation')
     list_display_links = ('nom_affichage',)
-    list_filter = ('actif', 'date_creation', 'produit_fournisseur__sous_famille__famille', 'produit_fournisseur__sous_famille')
+    list_filter = (
+        'actif', 'visible', 'date_creation',
+        ('produit_fournisseur__sous_famille__famille', FiltreAutocomplete),
+        ('produit_fournisseur__sous_famille', FiltreAutocomplete),
+    )
     search_fields = ('nom', 'produit_fournisseur__nom')
     readonly_fields = ('date_creation', 'date_modification', 'lien_pdf', 'nom_affichage')
     list_per_page = 25
     list_editable = ('ordre', 'actif')
+    list_select_related = ('produit_fournisseur__sous_famille__famille',)
+    autocomplete_fields = ('produit_fournisseur',)
     
     fieldsets = (
         ('Informations du catalogue', {
@@ -353,10 +369,10 @@ class CatalogueAdmin(admin.ModelAdmin):
     
     @admin.action(description='Activer les catalogues sélectionnés')
     def activer_catalogues(self, request, queryset):
-        updated = queryset.update(actif=True)
+        updated = modifier_en_masse(queryset, actif=True)
         self.message_user(request, f'{updated} catalogue(s) activé(s) avec succès.')
     
     @admin.action(description='Désactiver les catalogues sélectionnés')
     def desactiver_catalogues(self, request, queryset):
-        updated = queryset.update(actif=False)
+        updated = modifier_en_masse(queryset, actif=False)
         self.message_user(request, f'{updated} catalogue(s) désactivé(s) avec succès.')
@@ -5,4 +5,8 @@ class PartenaireConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'partenaire'
 
-
+    def ready(self):
+        from . import cache, revalidation, snapshot  # noqa: F401 (abonnements à catalogue_modifie)
+        from .models import Partenaire, Famille, SousFamille, ProduitFournisseur, Catalogue
+        from .signals import connecter
+        connecter(Partenaire, Famille, SousFamille, ProduitFournisseur, Catalogue)
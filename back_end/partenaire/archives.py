@@ -0,0 +1,173 @@
+"""
+Archives ZIP des catalogues PDF d'un partenaire, d'une famille ou d'une sous-famille.
+
+L'archive est produite à la volée pendant l'envoi de la réponse : chaque PDF est lu
+depuis le stockage par morceaux de TAILLE_MORCEAU octets et écrit tel quel (entrées
+« stored », sans compression : les PDF le sont déjà), sans fichier temporaire ni
+fichier entier en mémoire. Le flux n'étant pas « seekable », zipfile écrit la taille
+et le CRC de chaque entrée après ses données (descripteur de données) ; le répertoire
+central final les reprend.
+
+Sous ASGI, Django lirait un générateur synchrone en entier avant d'envoyer le premier
+octet : le même générateur y est parcouru par un itérateur asynchrone, un morceau à la
+fois dans un thread (flux_zip_asynchrone).
+
+L'ETag est calculé à partir des fichiers inclus (identifiant, chemin, taille, date de
+modification du catalogue), sans lire les PDF : un client qui a déjà l'archive reçoit
+304 tant que rien n'a changé.
+"""
+import hashlib
+import logging
+import re
+import zipfile
+
+from asgiref.sync import sync_to_async
+from django.core.files.storage import default_storage
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpResponseNotModified, StreamingHttpResponse
+from django.utils.cache import patch_cache_control
+from django.utils.text import slugify
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+
+from .cache import etag_correspond
+from .models import Catalogue
+
+logger = logging.getLogger(__name__)
+
+TAILLE_MORCEAU = 64 * 1024
+
+# Caractères interdits dans les noms d'entrée (séparateurs, caractères de contrôle...)
+CARACTERES_INTERDITS = re.compile(r'[\x00-\x1f\\/:*?"<>|]+')
+
+
+class Tampon:
+    """Fichier en écriture seule, sans seek : zipfile y écrit, le générateur le vide"""
+
+    def __init__(self):
+        self.morceaux = []
+        self.position = 0
+
+    def write(self, donnees):
+        self.morceaux.append(bytes(donnees))
+        self.position += len(donnees)
+        return len(donnees)
+
+    def tell(self):
+        return self.position
+
+    def flush(self):
+        pass
+
+    def vider(self):
+        donnees = b''.join(self.morceaux)
+        self.morceaux.clear()
+        return donnees
+
+
+class ZipRenderer(BaseRenderer):
+    """
+    Accepte `Accept: application/zip` dans la négociation de DRF ; l'archive elle-même
+    est une StreamingHttpResponse, seules les erreurs passent par ce renderer (en JSON)
+    """
+    media_type = 'application/zip'
+    format = 'zip'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return JSONRenderer().render(data)
+
+
+def catalogues_visibles(**filtres):
+    """Catalogues visibles sous l'ancêtre indiqué, dans l'ordre d'affichage de l'arbre"""
+    return Catalogue.objects.filter(visible=True, **filtres).exclude(fichier_pdf='').order_by(
+        'produit_fournisseur__sous_famille__famille__ordre', 'produit_fournisseur__sous_famille__famille__titre_fr',
+        'produit_fournisseur__sous_famille__ordre', 'produit_fournisseur__sous_famille__titre_fr',
+        'produit_fournisseur__ordre', 'produit_fournisseur__nom', 'ordre', 'nom', 'id',
+    ).values_list(
+        'id', 'nom', 'fichier_pdf', 'date_modification',
+        'produit_fournisseur__nom', 'produit_fournisseur__sous_famille__titre_fr',
+        'produit_fournisseur__sous_famille__famille__titre_fr',
+    )
+
+
+def nettoyer(segment):
+    return CARACTERES_INTERDITS.sub('_', segment).strip(' .') or '_'
+
+
+def entrees(catalogues):
+    """
+    [(nom dans l'archive, chemin dans le stockage, taille, date de modification, id)] ;
+    les fichiers absents du stockage sont ignorés
+    """
+    resultat = []
+    noms = set()
+    for pk, nom, fichier, modification, produit, sous_famille, famille in catalogues:
+        try:
+            taille = default_storage.size(fichier)
+        except OSError:
+            logger.warning("Catalogue %s : fichier %s introuvable, ignoré", pk, fichier)
+            continue
+        base = nettoyer(nom or fichier.rsplit('/', 1)[-1])
+        if not base.lower().endswith('.pdf'):
+            base += '.pdf'
+        chemin = '/'.join((nettoyer(famille), nettoyer(sous_famille), nettoyer(produit), base))
+        # Deux catalogues du même nom dans le même produit : suffixe avec l'identifiant
+        if chemin in noms:
+            chemin = f'{chemin[:-4]}-{pk}.pdf'
+        noms.add(chemin)
+        resultat.append((chemin, fichier, taille, modification, pk))
+    return resultat
+
+
+def etag(entrees_archive):
+    empreinte = hashlib.sha256()
+    for chemin, fichier, taille, modification, pk in entrees_archive:
+        empreinte.update(f'{pk}\0{chemin}\0{fichier}\0{taille}\0{modification.isoformat()}\n'.encode())
+    return f'"{empreinte.hexdigest()[:32]}"'
+
+
+def flux_zip(entrees_archive):
+    """Produit l'archive morceau par morceau"""
+    tampon = Tampon()
+    with zipfile.ZipFile(tampon, 'w', compression=zipfile.ZIP_STORED, allowZip64=True) as archive:
+        for chemin, fichier, taille, modification, pk in entrees_archive:
+            info = zipfile.ZipInfo(chemin, date_time=modification.timetuple()[:6])
+            info.compress_type = zipfile.ZIP_STORED
+            # Taille annoncée : zipfile en déduit s'il faut une entrée ZIP64
+            info.file_size = taille
+            with default_storage.open(fichier, 'rb') as source, archive.open(info, 'w') as destination:
+                while morceau := source.read(TAILLE_MORCEAU):
+                    destination.write(morceau)
+                    yield tampon.vider()
+            yield tampon.vider()
+    # Répertoire central
+    yield tampon.vider()
+
+
+async def flux_zip_asynchrone(entrees_archive):
+    """flux_zip pour ASGI : chaque morceau est produit dans un thread, hors de la boucle d'événements"""
+    generateur = flux_zip(entrees_archive)
+    suivant = sync_to_async(next, thread_sensitive=False)
+    try:
+        while (morceau := await suivant(generateur, None)) is not None:
+            if morceau:
+                yield morceau
+    finally:
+        # Client déconnecté : fichier source et archive refermés
+        await sync_to_async(generateur.close, thread_sensitive=False)()
+
+
+def reponse_archive(request, catalogues, nom):
+    """Réponse ZIP en flux des `catalogues` (catalogues_visibles), ou 304 si l'ETag correspond"""
+    entrees_archive = entrees(catalogues)
+    valeur_etag = etag(entrees_archive)
+    if etag_correspond(request, valeur_etag):
+        response = HttpResponseNotModified()
+    else:
+        asynchrone = isinstance(getattr(request, '_request', request), ASGIRequest)
+        flux = flux_zip_asynchrone(entrees_archive) if asynchrone else flux_zip(entrees_archive)
+        response = StreamingHttpResponse(flux, content_type='application/zip')
+        response['Content-Disposition'] = f'attachment; filename="catalogues-{slugify(nom) or "archive"}.zip"'
+    response['ETag'] = valeur_etag
+    # Réutilisable, mais à revalider : le contenu suit le catalogue
+    patch_cache_control(response, public=True, no_cache=True)
+    return response
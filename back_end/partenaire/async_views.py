@@ -0,0 +1,248 @@
+"""
+Vues asynchrones en lecture seule pour le catalogue public.
+
+Elles sont montées par config/urls_async.py, l'URLconf utilisée lorsque l'application
+tourne sous ASGI (voir config/asgi.py). Les réponses ont la même forme que celles des
+ViewSets DRF ; toute requête qui n'est pas une lecture simple (écriture, recherche, tri,
+API navigable...) est déléguée au ViewSet qui sert la même URL.
+
+Lorsque le graphe du catalogue en mémoire est à jour (graphe.py), les lectures sont
+servies depuis celui-ci, sans SQL.
+"""
+import functools
+import math
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import connections
+from django.http import HttpResponse
+from django.urls import resolve
+from django.utils.cache import patch_vary_headers
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from .cache import generation
+from .formats import demande_compacte
+from .graphe import graphe_charge, recharger, rendre_partenaire, rendre_sous_famille
+from .langues import langue_demandee, varier_selon_langue
+from .models import Partenaire, SousFamille
+from .requetes import partenaires_avec_arbre, sous_familles_avec_produits
+from .serializers import PartenaireSerializer, SousFamilleSerializer
+
+
+# URLconf des ViewSets DRF, vers laquelle les requêtes non gérées ici sont déléguées
+URLCONF_SYNC = 'config.urls'
+
+# Paramètres de requête pris en charge par les vues asynchrones
+PARAMETRES_GERES = {'page', 'actif', 'lang'}
+
+
+def lecture_simple(request):
+    """Indique si la requête peut être servie par une vue asynchrone"""
+    if request.method not in ('GET', 'HEAD'):
+        return False
+    if 'text/html' in request.headers.get('Accept', ''):
+        return False  # API navigable de DRF
+    if demande_compacte(request):
+        return False  # formats compacts, négociés par DRF
+    if not set(request.GET).issubset(PARAMETRES_GERES):
+        return False
+    # ?actif=false : aperçu des arbres des objets non visibles (voir requetes.py), servi par DRF
+    return request.GET.get('actif') in (None, 'true')
+
+
+async def deleguer(request):
+    """Transmet la requête au ViewSet DRF qui sert la même URL"""
+    correspondance = resolve(request.path_info, urlconf=URLCONF_SYNC)
+    return await sync_to_async(correspondance.func)(request, *correspondance.args, **correspondance.kwargs)
+
+
+def vue_lecture(lecture):
+    """
+    Transforme une coroutine de lecture en vue : les requêtes qu'elle ne gère pas,
+    ou pour lesquelles elle retourne None (page invalide, objet introuvable...),
+    sont déléguées au ViewSet DRF afin de conserver ses réponses d'erreur.
+    """
+    @functools.wraps(lecture)
+    async def vue(request, *args, **kwargs):
+        if lecture_simple(request):
+            response = await lecture(request, *args, **kwargs)
+            if response is not None:
+                return varier_selon_langue(request, response)
+        return await deleguer(request)
+
+    # Comme les vues DRF, qui appliquent elles-mêmes la protection CSRF
+    vue.csrf_exempt = True
+    return vue
+
+
+def reponse_json(data):
+    """Rend les données comme le JSONRenderer de DRF"""
+    response = HttpResponse(JSONRenderer().render(data), content_type='application/json')
+    patch_vary_headers(response, ('Accept',))
+    return response
+
+
+def contexte(request):
+    """Contexte des serializers : requête (URLs absolues) et langue de projection"""
+    return {'request': request, 'langue': langue_demandee(request)}
+
+
+async def serialiser(request, serializer_class, instance, many=False):
+    """
+    Sérialise hors de la boucle d'événements : les serializers DRF imbriqués parcourent
+    tout l'arbre préchargé, en Python, et bloqueraient les autres requêtes
+    """
+    return await sync_to_async(lambda: serializer_class(instance, many=many, context=contexte(request)).data)()
+
+
+def filtrer_actif(request, queryset):
+    """Applique le filtre ?actif=true/false, comme les ViewSets"""
+    actif = request.GET.get('actif')
+    if actif is not None:
+        queryset = queryset.filter(actif=actif == 'true')
+    return queryset
+
+
+def numero_page(request, count):
+    """Retourne (numero, nombre_pages) pour la page demandée, ou None si la page est invalide"""
+    nombre_pages = max(1, math.ceil(count / PageNumberPagination.page_size))
+    numero = request.GET.get('page', '1')
+    if numero == 'last':
+        numero = nombre_pages
+    try:
+        numero = int(numero)
+    except ValueError:
+        return None
+    if not 1 <= numero <= nombre_pages:
+        return None
+    return numero, nombre_pages
+
+
+async def paginer(request, queryset):
+    """
+    Retourne (objets, count, numero, nombre_pages) pour la page demandée,
+    ou None si la page est invalide.
+    """
+    taille = PageNumberPagination.page_size
+    count = await queryset.acount()
+    page = numero_page(request, count)
+    if page is None:
+        return None
+    numero, nombre_pages = page
+    objets = [objet async for objet in queryset[(numero - 1) * taille:numero * taille]]
+    return objets, count, numero, nombre_pages
+
+
+def reponse_paginee(request, data, count, numero, nombre_pages):
+    """Construit l'enveloppe de PageNumberPagination (count, next, previous, results)"""
+    url = request.build_absolute_uri()
+    suivante = replace_query_param(url, 'page', numero + 1) if numero < nombre_pages else None
+    if numero == 1:
+        precedente = None
+    elif numero == 2:
+        precedente = remove_query_param(url, 'page')
+    else:
+        precedente = replace_query_param(url, 'page', numero - 1)
+    return reponse_json({'count': count, 'next': suivante, 'previous': precedente, 'results': data})
+
+
+async def liste_paginee(request, queryset, serializer_class):
+    """Sérialise la page demandée d'un queryset entièrement préchargé"""
+    page = await paginer(request, queryset)
+    if page is None:
+        return None
+    objets, count, numero, nombre_pages = page
+    data = await serialiser(request, serializer_class, objets, many=True)
+    return reponse_paginee(request, data, count, numero, nombre_pages)
+
+
+def _recharger(generation_courante):
+    try:
+        return recharger(generation_courante)
+    finally:
+        # Thread hors du thread principal : sa connexion ne resservira pas
+        connections.close_all()
+
+
+async def graphe_courant():
+    """Graphe du catalogue à jour (voir graphe.py), ou None pour passer par les querysets"""
+    if not settings.GRAPHE_CATALOGUE:
+        return None
+    generation_courante = await sync_to_async(generation)()
+    graphe = graphe_charge(generation_courante)
+    if graphe is None:
+        graphe = await sync_to_async(_recharger, thread_sensitive=False)(generation_courante)
+    return graphe
+
+
+def filtrer_actif_graphe(request, noeuds):
+    actif = request.GET.get('actif')
+    if actif is None:
+        return noeuds
+    return [noeud for noeud in noeuds if noeud.actif == (actif == 'true')]
+
+
+def liste_graphe(request, noeuds, rendre):
+    """Page demandée d'une liste du graphe, rendue comme liste_paginee"""
+    page = numero_page(request, len(noeuds))
+    if page is None:
+        return None
+    numero, nombre_pages = page
+    taille = PageNumberPagination.page_size
+    langue = langue_demandee(request)
+    data = [rendre(noeud, request, langue) for noeud in noeuds[(numero - 1) * taille:numero * taille]]
+    return reponse_paginee(request, data, len(noeuds), numero, nombre_pages)
+
+
+def detail_graphe(request, noeud, rendre):
+    if noeud is None or not filtrer_actif_graphe(request, [noeud]):
+        return None
+    return reponse_json(rendre(noeud, request, langue_demandee(request)))
+
+
+@vue_lecture
+async def liste_partenaires(request):
+    """GET /api/partenaires/"""
+    graphe = await graphe_courant()
+    if graphe is not None:
+        return liste_graphe(request, filtrer_actif_graphe(request, graphe.partenaires), rendre_partenaire)
+    queryset = filtrer_actif(request, partenaires_avec_arbre(langue_demandee(request))).order_by('nom')
+    return await liste_paginee(request, queryset, PartenaireSerializer)
+
+
+@vue_lecture
+async def partenaires_actifs(request):
+    """GET /api/partenaires/actifs/"""
+    graphe = await graphe_courant()
+    if graphe is not None:
+        return liste_graphe(request, [p for p in graphe.partenaires if p.actif], rendre_partenaire)
+    queryset = partenaires_avec_arbre(langue_demandee(request)).filter(visible=True).order_by('nom')
+    return await liste_paginee(request, queryset, PartenaireSerializer)
+
+
+@vue_lecture
+async def detail_partenaire(request, pk):
+    """GET /api/partenaires/{id}/"""
+    graphe = await graphe_courant()
+    if graphe is not None:
+        return detail_graphe(request, graphe.partenaires_par_id.get(pk), rendre_partenaire)
+    try:
+        partenaire = await filtrer_actif(request, partenaires_avec_arbre(langue_demandee(request))).aget(pk=pk)
+    except Partenaire.DoesNotExist:
+        return None
+    return reponse_json(await serialiser(request, PartenaireSerializer, partenaire))
+
+
+@vue_lecture
+async def detail_sous_famille(request, pk):
+    """GET /api/sous-familles/{id}/"""
+    graphe = await graphe_courant()
+    if graphe is not None:
+        return detail_graphe(request, graphe.sous_familles_par_id.get(pk), rendre_sous_famille)
+    try:
+        sous_famille = await filtrer_actif(request, sous_familles_avec_produits(langue_demandee(request))).aget(pk=pk)
+    except SousFamille.DoesNotExist:
+        return None
+    return reponse_json(await serialiser(request, SousFamilleSerializer, sous_famille))
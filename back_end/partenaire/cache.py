@@ -0,0 +1,422 @@
+"""
+Cache des réponses JSON du catalogue public, avec variantes précompressées.
+
+Les arbres imbriqués de /api/partenaires/ et /api/produits/ sont très répétitifs. À chaque
+remplissage du cache, le corps est compressé une seule fois en gzip et en Brotli (si le
+module `brotli` est installé) ; les hits servent ensuite la variante annoncée par
+Accept-Encoding sans recompresser.
+
+Chaque entrée porte la génération du catalogue au moment du remplissage. Toute
+modification du catalogue (voir signals.py) incrémente la génération, ce qui périme
+l'ensemble des entrées. Avec plusieurs workers, le cache doit être partagé (REDIS_URL).
+
+Remplissage en vol unique : une entrée absente ou périmée n'est recalculée que par la
+requête qui obtient le verrou de sa clé (cache.add). Pendant ce temps, les autres
+requêtes servent l'entrée périmée (X-Cache: STALE), conservée CACHE_REPONSES_GRACE
+secondes au-delà de sa durée de vie, ou attendent brièvement le résultat si la clé n'a
+jamais été remplie (ATTENTE_MAX_SYNCHRONE sous WSGI, ATTENTE_MAX sous ASGI). Une entrée
+servie moins de CACHE_REPONSES_RAFRAICHISSEMENT secondes avant son expiration est
+recalculée en arrière-plan, et les listes de CHEMINS_CHAUDS déjà en cache sont
+recalculées dès qu'une modification du catalogue est validée.
+
+Les entrées sont toujours calculées sur `default` : une réplique peut être antérieure à
+la génération sous laquelle l'entrée est enregistrée. Les clients qui viennent d'écrire
+(cookie collant, voir config/replicas.py) ne passent pas par le cache.
+"""
+import asyncio
+import gzip
+import hashlib
+import logging
+import threading
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.dispatch import receiver
+from django.db import connections
+from django.http import HttpResponse, HttpResponseNotModified
+from django.test import RequestFactory
+from django.urls import resolve
+from django.utils.cache import patch_vary_headers
+from django.utils.http import parse_etags
+
+from config.replicas import lecture, lecture_collante
+
+from .formats import MEDIA_COLONNES, MEDIA_MSGPACK
+from .langues import langue_demandee
+from .modifications import Regroupeur
+from .signals import catalogue_modifie
+
+try:
+    import brotli
+except ImportError:  # dépendance optionnelle : gzip uniquement
+    brotli = None
+
+
+logger = logging.getLogger(__name__)
+
+PREFIXES = ('/api/partenaires/', '/api/produits/')
+# Réponses en flux, jamais en cache (voir archives.py)
+SUFFIXES_EXCLUS = ('/catalogues-zip/',)
+CLE_GENERATION = 'reponses:generation'
+
+# Listes les plus demandées, recalculées dès qu'une modification est validée. Chaque
+# entrée chaude occupe sa propre clé, parmi NOMBRE_CHAUDES_MAX emplacements (voir retenir_chaude)
+CHEMINS_CHAUDS = ('/api/partenaires/actifs/', '/api/produits/actifs/')
+CLE_CHAUDES = 'reponses:chaudes'
+NOMBRE_CHAUDES_MAX = 50
+
+# Durée de vie du verrou de remplissage, et attente maximale d'une requête sans entrée
+# périmée à servir (au-delà, elle calcule la réponse elle-même). Sous WSGI, l'attente
+# bloque le worker : elle est plus courte que celle d'une coroutine sous ASGI.
+DUREE_VERROU = 30
+ATTENTE_MAX = 5
+ATTENTE_MAX_SYNCHRONE = 0.5
+INTERVALLE_ATTENTE = 0.05
+
+# URLconf des ViewSets DRF, utilisée pour les remplissages en arrière-plan
+URLCONF = 'config.urls'
+
+# En dessous de cette taille, la compression ne fait rien gagner
+TAILLE_MINIMALE = 200
+QUALITE_BROTLI = 9
+NIVEAU_GZIP = 9
+
+# Types de contenu mis en cache : JSON et formats compacts (voir formats.py)
+TYPES_CACHEABLES = ('application/json', MEDIA_COLONNES, MEDIA_MSGPACK)
+
+# En-têtes de la vue conservés dans l'entrée (les autres sont ajoutés par les middlewares)
+ENTETES_CONSERVES = ('Content-Type', 'Vary', 'Allow', 'Content-Language')
+
+
+def generation():
+    """Génération courante du catalogue, initialisée si absente du cache"""
+    valeur = cache.get(CLE_GENERATION)
+    if valeur is None:
+        # Horodatage plutôt que 0 : une clé évincée ne doit pas ressusciter d'anciennes entrées
+        cache.add(CLE_GENERATION, time.time_ns(), None)
+        valeur = cache.get(CLE_GENERATION)
+    return valeur
+
+
+@receiver(catalogue_modifie, dispatch_uid='cache.reponses')
+def invalider(**kwargs):
+    """Périme toutes les réponses en cache"""
+    try:
+        cache.incr(CLE_GENERATION)
+    except ValueError:
+        cache.add(CLE_GENERATION, time.time_ns(), None)
+
+
+def cle_reponse(request):
+    """Clé d'une réponse : URL complète, Accept et langue de projection"""
+    elements = (
+        request.scheme, request.get_host(), request.get_full_path(),
+        request.headers.get('Accept', ''), langue_demandee(request) or '',
+    )
+    return 'reponses:' + hashlib.sha256('|'.join(elements).encode()).hexdigest()
+
+
+def encodages_acceptes(request):
+    """Codages de contenu acceptés par le client (q > 0)"""
+    acceptes = set()
+    for element in request.headers.get('Accept-Encoding', '').split(','):
+        nom, *parametres = [partie.strip() for partie in element.split(';')]
+        qualite = 1.0
+        for parametre in parametres:
+            cle, _, valeur = parametre.partition('=')
+            if cle.strip() == 'q':
+                try:
+                    qualite = float(valeur)
+                except ValueError:
+                    qualite = 0.0
+        if qualite > 0:
+            acceptes.add(nom.lower())
+    return acceptes
+
+
+def cacheable(request):
+    return (
+        request.method == 'GET'
+        and request.path_info.startswith(PREFIXES)
+        and not request.path_info.endswith(SUFFIXES_EXCLUS)
+        and 'text/html' not in request.headers.get('Accept', '')  # API navigable
+        and not lecture_collante(request)  # lire ses propres écritures
+    )
+
+
+def reponse_cacheable(response):
+    return (
+        response.status_code == 200
+        and not response.streaming
+        and response.get('Content-Type', '').startswith(TYPES_CACHEABLES)
+        and not response.cookies
+        and 'no-store' not in response.get('Cache-Control', '')
+    )
+
+
+def description(request):
+    """Ce qu'il faut pour rejouer la requête en arrière-plan (voir requete_interne)"""
+    return {
+        'chemin': request.path_info,
+        'parametres': request.META.get('QUERY_STRING', ''),
+        'hote': request.get_host(),
+        'securise': request.is_secure(),
+        'accept': request.headers.get('Accept', ''),
+        'accept_language': request.headers.get('Accept-Language', ''),
+    }
+
+
+def requete_interne(description):
+    # En-têtes absents de la requête d'origine : absents aussi ici (DRF refuse un Accept vide, 406)
+    entetes = {
+        cle: description[nom] for cle, nom in (('HTTP_ACCEPT', 'accept'), ('HTTP_ACCEPT_LANGUAGE', 'accept_language'))
+        if description[nom]
+    }
+    return RequestFactory().get(
+        description['chemin'],
+        secure=description['securise'],
+        QUERY_STRING=description['parametres'],
+        HTTP_HOST=description['hote'],
+        **entetes,
+    )
+
+
+def duree_conservation():
+    return settings.CACHE_REPONSES_DUREE + settings.CACHE_REPONSES_GRACE
+
+
+def fraiche(entree, generation_courante):
+    return entree['generation'] == generation_courante and time.time() < entree.get('expire', 0)
+
+
+def a_rafraichir(entree):
+    return time.time() >= entree['expire'] - settings.CACHE_REPONSES_RAFRAICHISSEMENT
+
+
+def cle_verrou(cle):
+    return f'{cle}:verrou'
+
+
+def construire_entree(response, generation_courante, description_requete):
+    """Entrée de cache : corps brut, variantes compressées et ETag, calculés une seule fois"""
+    corps = response.content
+    entree = {
+        'generation': generation_courante,
+        'expire': time.time() + settings.CACHE_REPONSES_DUREE,
+        'description': description_requete,
+        'entetes': [(nom, response[nom]) for nom in ENTETES_CONSERVES if response.has_header(nom)],
+        'etag': f'W/"{hashlib.sha256(corps).hexdigest()[:32]}"',
+        'identity': corps,
+    }
+    if len(corps) >= TAILLE_MINIMALE:
+        entree['gzip'] = gzip.compress(corps, compresslevel=NIVEAU_GZIP, mtime=0)
+        if brotli is not None:
+            entree['br'] = brotli.compress(corps, quality=QUALITE_BROTLI)
+    return entree
+
+
+def etag_correspond(request, etag):
+    """If-None-Match désigne `etag` (comparaison faible, comme Django) ou *"""
+    etags = parse_etags(request.headers.get('If-None-Match', ''))
+    return etags == ['*'] or etag.removeprefix('W/') in {valeur.removeprefix('W/') for valeur in etags}
+
+
+def servir(request, entree, statut_cache):
+    """Construit la réponse pour la variante acceptée par le client"""
+    if etag_correspond(request, entree['etag']):
+        response = HttpResponseNotModified()
+    else:
+        acceptes = encodages_acceptes(request)
+        codage = next((c for c in ('br', 'gzip') if c in entree and c in acceptes), None)
+        response = HttpResponse(entree[codage or 'identity'])
+        for nom, valeur in entree['entetes']:
+            response[nom] = valeur
+        if codage:
+            response['Content-Encoding'] = codage
+        response['Content-Length'] = str(len(response.content))
+    response['ETag'] = entree['etag']
+    response['X-Cache'] = statut_cache
+    patch_vary_headers(response, ('Accept-Encoding',))
+    return response
+
+
+def emplacements_chauds():
+    return [f'{CLE_CHAUDES}:{numero}' for numero in range(NOMBRE_CHAUDES_MAX)]
+
+
+def retenir_chaude(cle, description_requete):
+    """
+    Note une entrée de CHEMINS_CHAUDS à recalculer après chaque modification. L'entrée est
+    écrite seule dans l'emplacement tiré de sa clé : des workers concurrents ne
+    s'écrasent pas entre eux, sauf deux entrées du même emplacement (la dernière reste).
+    """
+    if description_requete['chemin'] not in CHEMINS_CHAUDS:
+        return
+    emplacement = emplacements_chauds()[int(cle[-8:], 16) % NOMBRE_CHAUDES_MAX]
+    chaude = cache.get(emplacement)
+    if chaude is None or chaude['cle'] != cle:
+        cache.set(emplacement, {'cle': cle, 'description': description_requete}, None)
+
+
+def remplir(cle, description_requete):
+    """
+    Recalcule l'entrée `cle` en rejouant la requête décrite (verrou déjà obtenu par
+    l'appelant, libéré ici). Exécuté hors du cycle requête/réponse.
+    """
+    try:
+        generation_courante = generation()
+        entree = cache.get(cle)
+        if entree is not None and fraiche(entree, generation_courante) and not a_rafraichir(entree):
+            return
+        request = requete_interne(description_requete)
+        correspondance = resolve(request.path_info, urlconf=URLCONF)
+        response = correspondance.func(request, *correspondance.args, **correspondance.kwargs)
+        if hasattr(response, 'render'):
+            response.render()
+        if reponse_cacheable(response):
+            cache.set(cle, construire_entree(response, generation_courante, description_requete), duree_conservation())
+    except Exception:
+        logger.exception("Échec du remplissage en arrière-plan de %s", description_requete['chemin'])
+    finally:
+        cache.delete(cle_verrou(cle))
+
+
+def rafraichir_en_arriere_plan(cle, entree):
+    """Recalcule une entrée proche de son expiration dans un thread, si aucun autre ne le fait"""
+    if not cache.add(cle_verrou(cle), 1, DUREE_VERROU):
+        return
+
+    def executer():
+        try:
+            remplir(cle, entree['description'])
+        finally:
+            connections.close_all()
+
+    threading.Thread(target=executer, name='cache-rafraichissement', daemon=True).start()
+
+
+def rechauffer(modifications=None):
+    """Recalcule les entrées de CHEMINS_CHAUDS pour la nouvelle génération du catalogue"""
+    for chaude in cache.get_many(emplacements_chauds()).values():
+        if cache.add(cle_verrou(chaude['cle']), 1, DUREE_VERROU):
+            remplir(chaude['cle'], chaude['description'])
+
+
+_regroupeur = Regroupeur('cache-rechauffage', 0.5, rechauffer)
+
+
+@receiver(catalogue_modifie, dispatch_uid='cache.rechauffage')
+def planifier_rechauffage(sender, pks, operation, **kwargs):
+    # Connecté après `invalider` : la génération est déjà incrémentée
+    if settings.CACHE_REPONSES_DUREE > 0:
+        _regroupeur.ajouter(sender, pks, operation)
+
+
+def attendre(cle, generation_courante):
+    """Attend l'entrée remplie par la requête qui détient le verrou, None au-delà d'ATTENTE_MAX_SYNCHRONE"""
+    limite = time.monotonic() + ATTENTE_MAX_SYNCHRONE
+    while time.monotonic() < limite:
+        time.sleep(INTERVALLE_ATTENTE)
+        entree = cache.get(cle)
+        if entree is not None and entree['generation'] == generation_courante:
+            return entree
+        if not cache.get(cle_verrou(cle)):
+            return None
+    return None
+
+
+async def aattendre(cle, generation_courante):
+    limite = time.monotonic() + ATTENTE_MAX
+    while time.monotonic() < limite:
+        await asyncio.sleep(INTERVALLE_ATTENTE)
+        entree = await cache.aget(cle)
+        if entree is not None and entree['generation'] == generation_courante:
+            return entree
+        if not await cache.aget(cle_verrou(cle)):
+            return None
+    return None
+
+
+class CacheReponsesMiddleware:
+    """
+    Sert les lectures GET de PREFIXES depuis le cache, dans la variante compressée
+    acceptée par le client, en ne laissant qu'une requête à la fois recalculer une
+    entrée. Compatible WSGI et ASGI.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        if not cacheable(request) or settings.CACHE_REPONSES_DUREE <= 0:
+            return self.get_response(request)
+        cle = cle_reponse(request)
+        generation_courante = generation()
+        entree = cache.get(cle)
+        if entree is not None and fraiche(entree, generation_courante):
+            if a_rafraichir(entree):
+                rafraichir_en_arriere_plan(cle, entree)
+            return servir(request, entree, 'HIT')
+
+        verrou = cache.add(cle_verrou(cle), 1, DUREE_VERROU)
+        if not verrou:
+            if entree is not None:
+                return servir(request, entree, 'STALE')
+            entree = attendre(cle, generation_courante)
+            if entree is not None:
+                return servir(request, entree, 'HIT')
+        try:
+            with lecture(None):
+                response = self.get_response(request)
+            if not reponse_cacheable(response):
+                return response
+            entree = construire_entree(response, generation_courante, description(request))
+            cache.set(cle, entree, duree_conservation())
+            retenir_chaude(cle, entree['description'])
+        finally:
+            if verrou:
+                cache.delete(cle_verrou(cle))
+        return servir(request, entree, 'MISS')
+
+    async def __acall__(self, request):
+        if not cacheable(request) or settings.CACHE_REPONSES_DUREE <= 0:
+            return await self.get_response(request)
+        cle = cle_reponse(request)
+        generation_courante = await sync_to_async(generation)()
+        entree = await cache.aget(cle)
+        if entree is not None and fraiche(entree, generation_courante):
+            if a_rafraichir(entree):
+                await sync_to_async(rafraichir_en_arriere_plan)(cle, entree)
+            return servir(request, entree, 'HIT')
+
+        verrou = await cache.aadd(cle_verrou(cle), 1, DUREE_VERROU)
+        if not verrou:
+            if entree is not None:
+                return servir(request, entree, 'STALE')
+            entree = await aattendre(cle, generation_courante)
+            if entree is not None:
+                return servir(request, entree, 'HIT')
+        try:
+            with lecture(None):
+                response = await self.get_response(request)
+            if not reponse_cacheable(response):
+                return response
+            # La compression est coûteuse en CPU : hors de la boucle d'événements
+            entree = await sync_to_async(construire_entree, thread_sensitive=False)(
+                response, generation_courante, description(request)
+            )
+            await cache.aset(cle, entree, duree_conservation())
+            await sync_to_async(retenir_chaude)(cle, entree['description'])
+        finally:
+            if verrou:
+                await cache.adelete(cle_verrou(cle))
+        return servir(request, entree, 'MISS')
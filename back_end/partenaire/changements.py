@@ -0,0 +1,124 @@
+"""
+Flux incrémental des changements du catalogue (/api/changes/).
+
+Le flux lit le journal ChangementCatalogue dans l'ordre du curseur (transaction, id) et
+ne retourne que les transactions terminées : une transaction plus ancienne encore en
+cours ne peut donc pas être sautée. Les objets créés ou modifiés sont retournés dans
+leur état courant, sous une forme plate (clés étrangères et M2M en identifiants) ;
+les suppressions sont des pierres tombales sans données.
+
+Un client miroir commence par lire le curseur courant (/api/changes/ sans `since`),
+télécharge le catalogue, puis suit le flux avec ?since=<curseur>.
+"""
+from django.db import connections, router
+from django.db.models import Q
+from rest_framework import serializers
+
+from produit.models import Produit
+from .models import Partenaire, Famille, SousFamille, ProduitFournisseur, Catalogue, ChangementCatalogue
+from .signals import SUPPRESSION
+
+
+MODELES = {
+    modele._meta.model_name: modele
+    for modele in (Partenaire, Famille, SousFamille, ProduitFournisseur, Catalogue, Produit)
+}
+
+CURSEUR_INITIAL = '0.0'
+
+
+class CurseurInvalide(ValueError):
+    pass
+
+
+class CurseurExpire(Exception):
+    """Le curseur précède la période de rétention : une resynchronisation complète est nécessaire"""
+
+
+def lire_curseur(valeur):
+    """'<transaction>.<id>' -> (transaction, id)"""
+    try:
+        transaction, identifiant = (int(partie) for partie in valeur.split('.'))
+    except (AttributeError, ValueError):
+        raise CurseurInvalide(valeur)
+    return transaction, identifiant
+
+
+def ecrire_curseur(transaction, identifiant):
+    return f'{transaction}.{identifiant}'
+
+
+def transactions_terminees():
+    """
+    Plus petit identifiant de transaction encore en cours : tout ce qui précède est validé.
+    Mesuré sur la base qui sert la lecture du journal (une réplique voit les validations rejouées).
+    """
+    with connections[router.db_for_read(ChangementCatalogue)].cursor() as cursor:
+        cursor.execute('SELECT txid_snapshot_xmin(txid_current_snapshot())')
+        return cursor.fetchone()[0]
+
+
+def serializer_plat(modele):
+    """ModelSerializer de toutes les colonnes du modèle (clés étrangères et M2M en identifiants)"""
+    meta = type('Meta', (), {'model': modele, 'fields': '__all__'})
+    return type(f'{modele.__name__}PlatSerializer', (serializers.ModelSerializer,), {'Meta': meta})
+
+
+SERIALIZERS = {nom: serializer_plat(modele) for nom, modele in MODELES.items()}
+
+
+def lire_changements(since=None, limite=500, context=None):
+    """
+    Retourne (curseur, reste, changements) à partir du curseur `since`.
+    Sans `since`, retourne le curseur courant et aucun changement.
+    """
+    horizon = transactions_terminees()
+    visibles = ChangementCatalogue.objects.filter(transaction__lt=horizon).order_by('transaction', 'id')
+
+    if since is None:
+        dernier = visibles.order_by('-transaction', '-id').values_list('transaction', 'id').first()
+        return ecrire_curseur(*dernier) if dernier else CURSEUR_INITIAL, False, []
+
+    transaction, identifiant = lire_curseur(since)
+    if identifiant and not ChangementCatalogue.objects.filter(pk=identifiant, transaction=transaction).exists():
+        # La ligne du curseur a été purgée, et avec elle peut-être des changements suivants
+        raise CurseurExpire(since)
+
+    lignes = list(
+        visibles.filter(Q(transaction__gt=transaction) | Q(transaction=transaction, id__gt=identifiant))
+        [:limite + 1]
+    )
+    reste = len(lignes) > limite
+    lignes = lignes[:limite]
+    if not lignes:
+        return since, False, []
+
+    # Un seul chargement par modèle, dans l'état courant des objets
+    a_charger = {}
+    for ligne in lignes:
+        if ligne.operation != SUPPRESSION:
+            a_charger.setdefault(ligne.modele, set()).add(ligne.objet_id)
+    objets = {}
+    for nom, pks in a_charger.items():
+        queryset = MODELES[nom].objects.filter(pk__in=pks)
+        m2m = [champ.name for champ in MODELES[nom]._meta.many_to_many]
+        if m2m:
+            queryset = queryset.prefetch_related(*m2m)
+        for objet in queryset:
+            objets[nom, objet.pk] = SERIALIZERS[nom](objet, context=context).data
+
+    # Seule la dernière entrée de chaque objet dans la page est utile au client
+    dernieres = {(ligne.modele, ligne.objet_id): ligne for ligne in lignes}
+    changements = [
+        {
+            'cursor': ecrire_curseur(ligne.transaction, ligne.id),
+            'model': ligne.modele,
+            'id': ligne.objet_id,
+            'operation': ligne.operation,
+            'date': ligne.date.isoformat(),
+            'data': None if ligne.operation == SUPPRESSION else objets.get((ligne.modele, ligne.objet_id)),
+        }
+        for ligne in lignes
+        if dernieres[ligne.modele, ligne.objet_id] is ligne
+    ]
+    return ecrire_curseur(lignes[-1].transaction, lignes[-1].id), reste, changements
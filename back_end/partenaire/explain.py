@@ -0,0 +1,99 @@
+"""
+Lecture des plans d'exécution PostgreSQL (EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON)).
+
+Utilisé par les commandes benchmark_indexes et audit_queries.
+"""
+import json
+
+from django.db import connection
+
+
+# Tables du catalogue sur lesquelles un parcours séquentiel est signalé
+TABLES_CATALOGUE = (
+    'partenaire_partenaire', 'partenaire_famille', 'partenaire_famille_partenaires',
+    'partenaire_sousfamille', 'partenaire_produitfournisseur', 'partenaire_catalogue',
+    'produit_produit', 'produit_produit_partenaires',
+)
+
+# Un parcours séquentiel de moins de lignes est normal (petite table) et n'est pas signalé
+LIGNES_PARCOURS_MIN = 1000
+
+# Écart (en facteur) entre lignes estimées et lignes réelles au-delà duquel l'estimation est signalée
+ECART_ESTIMATION_MAX = 10
+
+
+def expliquer(sql, params=(), analyser=True):
+    """Plan JSON (racine "Plan" + "Execution Time"...) d'une requête SELECT"""
+    options = 'ANALYZE, BUFFERS, FORMAT JSON' if analyser else 'FORMAT JSON'
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN ({options}) {sql}', params)
+        resultat = cursor.fetchone()[0]
+    if isinstance(resultat, str):
+        resultat = json.loads(resultat)
+    return resultat[0]
+
+
+def expliquer_queryset(queryset, analyser=True):
+    sql, params = queryset.query.sql_with_params()
+    return expliquer(sql, params, analyser)
+
+
+def noeuds(plan):
+    """Parcourt tous les nœuds d'un plan (racine comprise)"""
+    pile = [plan.get('Plan', plan)]
+    while pile:
+        noeud = pile.pop()
+        yield noeud
+        pile.extend(reversed(noeud.get('Plans', [])))
+
+
+def decrire(noeud):
+    """'Index Only Scan using produit_actif_ordre_idx on produit_produit'"""
+    description = noeud['Node Type']
+    if 'Index Name' in noeud:
+        description += f" using {noeud['Index Name']}"
+    if 'Relation Name' in noeud:
+        description += f" on {noeud['Relation Name']}"
+    return description
+
+
+def parcours(plan):
+    """Nœuds d'accès aux tables (Seq Scan, Index Scan, Index Only Scan, Bitmap...)"""
+    return [decrire(noeud) for noeud in noeuds(plan) if 'Relation Name' in noeud]
+
+
+def ecart_estimation(noeud):
+    """Facteur entre lignes estimées et lignes réelles (par boucle), 1 si exact"""
+    estimees = max(noeud.get('Plan Rows', 0), 1)
+    reelles = max(noeud.get('Actual Rows', 0), 1)
+    return max(estimees / reelles, reelles / estimees)
+
+
+def problemes(plan):
+    """Liste des anomalies d'un plan analysé : parcours séquentiels, tris sur disque, estimations fausses"""
+    anomalies = []
+    for noeud in noeuds(plan):
+        if noeud['Node Type'] == 'Seq Scan' and noeud.get('Relation Name') in TABLES_CATALOGUE:
+            lues = (noeud.get('Actual Rows', 0) + noeud.get('Rows Removed by Filter', 0)) * noeud.get('Actual Loops', 1)
+            if lues >= LIGNES_PARCOURS_MIN:
+                anomalies.append(f"parcours séquentiel de {noeud['Relation Name']} ({lues} lignes lues)")
+        if noeud['Node Type'] in ('Sort', 'Incremental Sort') and noeud.get('Sort Space Type') == 'Disk':
+            anomalies.append(f"tri sur disque ({noeud.get('Sort Space Used', '?')} kB)")
+        # Les compteurs de tampons incluent ceux des nœuds enfants
+        temporaires = noeud.get('Temp Written Blocks', 0) - sum(
+            enfant.get('Temp Written Blocks', 0) for enfant in noeud.get('Plans', [])
+        )
+        if temporaires > 0 and noeud['Node Type'] not in ('Sort', 'Incremental Sort'):
+            anomalies.append(f"{decrire(noeud)} écrit {temporaires} blocs temporaires")
+        if 'Actual Rows' in noeud and ecart_estimation(noeud) >= ECART_ESTIMATION_MAX:
+            anomalies.append(
+                f"estimation x{ecart_estimation(noeud):.0f} sur {decrire(noeud)} "
+                f"({noeud['Plan Rows']} estimées, {noeud['Actual Rows']} réelles)"
+            )
+    return anomalies
+
+
+def tampons(plan):
+    """(blocs lus en cache, blocs lus sur disque) pour tout le plan"""
+    racine = plan.get('Plan', plan)
+    return racine.get('Shared Hit Blocks', 0), racine.get('Shared Read Blocks', 0)
@@ -0,0 +1,131 @@
+"""
+Facettes des listes de produits : nombre de résultats par famille, sous-famille,
+partenaire et statut, pour le filtre et la recherche courants.
+
+Toutes les facettes d'une liste sont comptées par une seule requête GROUP BY GROUPING
+SETS sur les identifiants retenus par le queryset filtré de la vue. Le résultat est mis
+en cache par signature de filtre (paramètres de la requête hors pagination et tri)
+jusqu'à la prochaine modification du catalogue (génération de cache.py). Comme les
+réponses de cache.py, les facettes mises en cache sont comptées sur `default`, et les
+clients qui viennent d'écrire ne lisent pas le cache.
+"""
+import hashlib
+from collections import namedtuple
+
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from config.replicas import lecture_collante
+from produit.models import Produit
+
+from .cache import generation
+from .langues import LANGUES
+from .models import Partenaire, Famille, SousFamille
+from .navigation import titres
+
+DUREE_CACHE = 3600
+
+# Paramètres sans effet sur l'ensemble des résultats
+PARAMETRES_IGNORES = ('page', 'page_size', 'ordering', 'format')
+
+# cle : expression SQL de la valeur groupée ; colonnes : libellés retournés avec elle
+# (titres multilingues ou nom) ; multilingue : colonnes = titres _fr/_en/_ar
+Facette = namedtuple('Facette', ['nom', 'cle', 'colonnes', 'multilingue'])
+
+
+def facette_titres(nom, alias):
+    return Facette(nom, f'{alias}.id', [f'{alias}.titre_{code}' for code in LANGUES], True)
+
+
+FACETTE_PARTENAIRE = Facette('partenaire', 'p.id', ['p.nom'], False)
+FACETTE_ACTIF = Facette('actif', 'base.actif', [], False)
+
+# Définition : (jointures depuis la table `base` de la liste, facettes)
+FACETTES_PRODUITS_FOURNISSEUR = (
+    f"""
+    JOIN {SousFamille._meta.db_table} s ON s.id = base.sous_famille_id
+    JOIN {Famille._meta.db_table} f ON f.id = s.famille_id
+    LEFT JOIN {Famille.partenaires.through._meta.db_table} fp ON fp.famille_id = f.id
+    LEFT JOIN {Partenaire._meta.db_table} p ON p.id = fp.partenaire_id
+    """,
+    (facette_titres('famille', 'f'), facette_titres('sous_famille', 's'), FACETTE_PARTENAIRE, FACETTE_ACTIF),
+)
+
+FACETTES_PRODUITS = (
+    f"""
+    LEFT JOIN {Produit.partenaires.through._meta.db_table} pp ON pp.produit_id = base.id
+    LEFT JOIN {Partenaire._meta.db_table} p ON p.id = pp.partenaire_id
+    """,
+    (FACETTE_PARTENAIRE, FACETTE_ACTIF),
+)
+
+
+def requete_facettes(table, jointures, facettes, sous_requete):
+    """Une ligne par valeur de chaque facette, plus une ligne de total (ensemble vide)"""
+    drapeaux = ', '.join(f'GROUPING({facette.cle})' for facette in facettes)
+    colonnes = ', '.join(colonne for facette in facettes for colonne in (facette.cle, *facette.colonnes))
+    ensembles = ', '.join(f"({', '.join((facette.cle, *facette.colonnes))})" for facette in facettes)
+    return f"""
+        SELECT {drapeaux}, {colonnes}, COUNT(DISTINCT base.id)
+        FROM {table} base
+        {jointures}
+        WHERE base.id IN ({sous_requete})
+        GROUP BY GROUPING SETS ({ensembles}, ())
+    """
+
+
+def compter(queryset, jointures, facettes, langue=None):
+    """{'total': n, <facette>: [{'id'|'valeur': ..., <libellés>, 'nombre': n}, ...]}"""
+    sous_requete, parametres = queryset.order_by().values('pk').query.sql_with_params()
+    requete = requete_facettes(queryset.model._meta.db_table, jointures, facettes, sous_requete)
+    with connections[queryset.db].cursor() as cursor:
+        cursor.execute(requete, parametres)
+        lignes = cursor.fetchall()
+
+    resultat = {'total': 0, **{facette.nom: [] for facette in facettes}}
+    for ligne in lignes:
+        drapeaux, valeurs, nombre = ligne[:len(facettes)], ligne[len(facettes):-1], ligne[-1]
+        if all(drapeaux):
+            resultat['total'] = nombre
+            continue
+        rang = drapeaux.index(0)
+        debut = sum(1 + len(facette.colonnes) for facette in facettes[:rang])
+        facette = facettes[rang]
+        cle, libelles = valeurs[debut], valeurs[debut + 1:debut + 1 + len(facette.colonnes)]
+        if cle is None:
+            # Produits sans partenaire
+            continue
+        if not facette.colonnes:
+            resultat[facette.nom].append({'valeur': cle, 'nombre': nombre})
+        elif facette.multilingue:
+            resultat[facette.nom].append({'id': cle, **titres(libelles, langue), 'nombre': nombre})
+        else:
+            resultat[facette.nom].append({'id': cle, 'nom': libelles[0], 'nombre': nombre})
+    for facette in facettes:
+        resultat[facette.nom].sort(key=lambda valeur: -valeur['nombre'])
+    return resultat
+
+
+def signature(request):
+    """Empreinte des paramètres qui déterminent l'ensemble des résultats"""
+    parametres = sorted(
+        (nom, valeur) for nom, valeurs in request.GET.lists() if nom not in PARAMETRES_IGNORES
+        for valeur in valeurs
+    )
+    return hashlib.sha1(repr(parametres).encode()).hexdigest()
+
+
+def facettes_en_cache(request, queryset, definition, langue=None):
+    """Facettes du queryset filtré de `request`, depuis le cache tant que le catalogue n'a pas changé"""
+    jointures, facettes = definition
+    if lecture_collante(request):
+        return compter(queryset, jointures, facettes, langue)
+    cle = f'facettes:{queryset.model._meta.label_lower}:{langue or "toutes"}:{signature(request)}'
+    generation_courante = generation()
+    entree = cache.get(cle)
+    if entree is not None and entree['generation'] == generation_courante:
+        return entree['facettes']
+    resultat = compter(queryset.using(DEFAULT_DB_ALIAS), jointures, facettes, langue)
+    cache.set(cle, {'generation': generation_courante, 'facettes': resultat}, DUREE_CACHE)
+    return resultat
+
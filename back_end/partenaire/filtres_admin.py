@@ -0,0 +1,70 @@
+"""
+Filtres de liste de l'admin sur une relation, chargés à la demande.
+
+Le RelatedFieldListFilter de Django lit toutes les lignes du modèle lié à chaque
+affichage d'une liste. FiltreAutocomplete ne lit que l'objet sélectionné : la liste
+déroulante (select2) cherche les choix au fil de la saisie, page par page, via la vue
+d'autocomplétion de l'admin, avec les search_fields de l'admin du modèle lié (index
+trigrammes, voir la migration partenaire/0011).
+
+Usage : list_filter = (('famille', FiltreAutocomplete),), et FiltresAutocompleteMixin
+sur le ModelAdmin pour le script.
+"""
+from django.contrib import admin
+from django.contrib.admin.utils import get_last_value_from_parameters, get_model_from_relation
+from django.core.exceptions import ValidationError
+from django.urls import reverse
+from django.utils.translation import gettext_lazy as _
+
+
+class FiltreAutocomplete(admin.FieldListFilter):
+    template = 'admin/filtre_autocomplete.html'
+
+    def __init__(self, field, request, params, model, model_admin, field_path):
+        self.modele_lie = get_model_from_relation(field)
+        self.lookup_kwarg = f'{field_path}__{field.target_field.name}__exact'
+        valeur = get_last_value_from_parameters(params, self.lookup_kwarg)
+        super().__init__(field, request, params, model, model_admin, field_path)
+        self.title = getattr(field, 'verbose_name', self.modele_lie._meta.verbose_name)
+        # Source de l'autocomplétion : le dernier champ du chemin, sur son propre modèle
+        self.app_label = field.model._meta.app_label
+        self.model_name = field.model._meta.model_name
+        self.champ_source = field.name
+        self.url = reverse(f'{model_admin.admin_site.name}:autocomplete')
+        self.selection = self.objet_selectionne(valeur)
+
+    def objet_selectionne(self, valeur):
+        if not valeur:
+            return None
+        try:
+            return self.modele_lie._default_manager.filter(pk=valeur).first()
+        except (ValueError, ValidationError):
+            # Valeur invalide : queryset() la signalera (IncorrectLookupParameters)
+            return None
+
+    def expected_parameters(self):
+        return [self.lookup_kwarg]
+
+    def get_facet_counts(self, pk_attname, filtered_qs):
+        # Pas de comptage par choix : les choix ne sont pas connus d'avance
+        return {}
+
+    def choices(self, changelist):
+        yield {
+            'selected': self.selection is None,
+            'query_string': changelist.get_query_string(remove=[self.lookup_kwarg]),
+            'display': _('All'),
+        }
+        if self.selection is not None:
+            yield {
+                'selected': True,
+                'query_string': changelist.get_query_string({self.lookup_kwarg: self.selection.pk}),
+                'display': str(self.selection),
+            }
+
+
+class FiltresAutocompleteMixin:
+    """Ajoute le script des FiltreAutocomplete (select2 est chargé par la liste de jazzmin)"""
+
+    class Media:
+        js = ('partenaire/js/filtre_autocomplete.js',)
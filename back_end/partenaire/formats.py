@@ -0,0 +1,112 @@
+"""
+Formats compacts des réponses de lecture, pour les clients d'intégration.
+
+Négociés par l'en-tête Accept (ou ?format=) sur tous les endpoints DRF de lecture :
+
+- `application/vnd.pharmaethique.colonnes+json` (?format=colonnes) : chaque liste
+  d'objets devient une table {"colonnes": [noms...], "lignes": [[valeurs...], ...]},
+  à tous les niveaux d'imbrication ; les clés ne sont plus répétées à chaque objet.
+- `application/msgpack` (?format=msgpack) : la même structure en MessagePack (module
+  `msgpack`, dépendance optionnelle).
+
+Les listes plates (catalogues, vitrine des produits fournisseur) sont produites
+directement depuis les tuples de `values_list`, sans passer par les serializers ni par
+un dict par objet (voir `Colonnes` et les vues). Les autres réponses sont converties
+depuis la sortie des serializers.
+"""
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import msgpack
+except ImportError:  # dépendance optionnelle : pas de MessagePack
+    msgpack = None
+
+
+MEDIA_COLONNES = 'application/vnd.pharmaethique.colonnes+json'
+MEDIA_MSGPACK = 'application/msgpack'
+MEDIAS_COMPACTS = (MEDIA_COLONNES, MEDIA_MSGPACK)
+FORMATS_COMPACTS = ('colonnes', 'msgpack')
+
+# Conversion des dates, décimaux, UUID... comme le JSONRenderer de DRF
+_encodeur = JSONEncoder()
+
+
+class Colonnes:
+    """
+    Table déjà en colonnes : noms une seule fois, puis une séquence de valeurs par ligne
+    (tuples de values_list), transmises telles quelles aux encodeurs. Les valeurs
+    imbriquées doivent déjà être compactes (voir `table`).
+    """
+    __slots__ = ('noms', 'lignes')
+
+    def __init__(self, noms, lignes):
+        self.noms = list(noms)
+        self.lignes = lignes
+
+    def compacter(self):
+        return {'colonnes': self.noms, 'lignes': self.lignes}
+
+
+def table(noms, lignes):
+    """Table compacte imbriquée dans une ligne de `Colonnes`"""
+    return {'colonnes': list(noms), 'lignes': lignes}
+
+
+def compacter(donnees):
+    """Convertit récursivement les listes d'objets (dicts de même forme) en tables"""
+    if isinstance(donnees, Colonnes):
+        return donnees.compacter()
+    if isinstance(donnees, dict):
+        return {cle: compacter(valeur) for cle, valeur in donnees.items()}
+    if isinstance(donnees, (list, tuple)):
+        if donnees and all(isinstance(element, dict) for element in donnees):
+            noms = list(donnees[0])
+            return {
+                'colonnes': noms,
+                'lignes': [[compacter(element.get(nom)) for nom in noms] for element in donnees],
+            }
+        return [compacter(element) for element in donnees]
+    return donnees
+
+
+def convertir(valeur):
+    """Types non natifs de MessagePack (dates, décimaux...), comme en JSON"""
+    return _encodeur.default(valeur)
+
+
+class ColonnesRenderer(JSONRenderer):
+    media_type = MEDIA_COLONNES
+    format = 'colonnes'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return super().render(compacter(data), accepted_media_type, renderer_context)
+
+
+class MessagePackRenderer(BaseRenderer):
+    media_type = MEDIA_MSGPACK
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return msgpack.packb(compacter(data), default=convertir, use_bin_type=True)
+
+
+def url_absolue(request):
+    """Fonction chemin -> URL absolue (None pour un chemin vide), comme les serializers"""
+    return lambda chemin: request.build_absolute_uri(chemin) if chemin else None
+
+
+def format_compact(request):
+    """Indique si la réponse négociée pour `request` est un format compact"""
+    renderer = getattr(request, 'accepted_renderer', None)
+    return renderer is not None and renderer.format in FORMATS_COMPACTS
+
+
+def demande_compacte(request):
+    """Accept réclame un format compact (avant toute négociation de DRF)"""
+    accept = request.headers.get('Accept', '')
+    return request.GET.get('format') in FORMATS_COMPACTS or any(media in accept for media in MEDIAS_COMPACTS)
@@ -0,0 +1,328 @@
+"""
+Graphe du catalogue en mémoire, propre à chaque worker.
+
+Le catalogue tient en mémoire : il est chargé en une fois (une requête par table, dans
+un même instantané) en enregistrements à __slots__, indexés par identifiant, chaque
+parent portant la liste ordonnée de ses enfants visibles (colonne `visible`, comme les
+querysets de requetes.py). Les vues asynchrones de lecture (async_views.py) répondent
+ensuite à partir du graphe, sans SQL.
+
+Le graphe porte la génération du catalogue (cache.py) au moment du chargement. Toute
+modification incrémente la génération dans le cache partagé (Redis) : chaque worker voit
+le changement à sa requête suivante et recharge son graphe. Pendant un rechargement, les
+autres requêtes du worker passent par les querysets habituels. Sans cache partagé, un
+worker ne voit pas les modifications faites par les autres : le graphe n'est donc activé
+par défaut qu'avec REDIS_URL (GRAPHE_CATALOGUE).
+"""
+import logging
+import threading
+
+from django.core.files.storage import default_storage
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from rest_framework import serializers
+
+from produit.models import Produit
+from .langues import LANGUES
+from .models import Partenaire, Famille, SousFamille, ProduitFournisseur, Catalogue
+from .navigation import titres
+
+
+logger = logging.getLogger(__name__)
+
+_date = serializers.DateTimeField()
+
+
+def date(valeur):
+    """Date au format des serializers DRF, calculée une fois au chargement"""
+    return _date.to_representation(valeur)
+
+
+class CatalogueNoeud:
+    __slots__ = ('id', 'nom', 'fichier_pdf', 'ordre', 'date_creation', 'date_modification')
+
+
+class ProduitFournisseurNoeud:
+    __slots__ = ('id', 'nom', 'image', 'ordre', 'date_creation', 'date_modification', 'catalogues')
+
+
+class SousFamilleNoeud:
+    __slots__ = ('id', 'famille', 'titres', 'actif', 'ordre', 'date_creation', 'date_modification', 'produits_fournisseur')
+
+
+class FamilleNoeud:
+    __slots__ = ('id', 'titres', 'actif', 'ordre', 'date_creation', 'date_modification', 'partenaire_id', 'sous_familles')
+
+
+class PartenaireNoeud:
+    __slots__ = ('id', 'nom', 'logo', 'url_site_web', 'actif', 'date_creation', 'date_modification', 'familles')
+
+
+class ProduitNoeud:
+    __slots__ = (
+        'id', 'titres', 'descriptions', 'image_couverture', 'actif', 'ordre',
+        'date_creation', 'date_modification', 'partenaires',
+    )
+
+
+def noeud(classe, **valeurs):
+    objet = classe()
+    for nom, valeur in valeurs.items():
+        setattr(objet, nom, valeur)
+    return objet
+
+
+class Graphe:
+    """
+    Catalogue chargé en mémoire. Les listes `partenaires` et `produits` suivent l'ordre
+    des endpoints (nom ; ordre, titre_fr) ; les enfants ne contiennent que les objets visibles.
+    """
+    __slots__ = ('generation', 'partenaires', 'partenaires_par_id', 'sous_familles_par_id', 'produits', 'produits_par_id')
+
+    def __init__(self, generation):
+        self.generation = generation
+        self.partenaires = []
+        self.partenaires_par_id = {}
+        self.sous_familles_par_id = {}
+        self.produits = []
+        self.produits_par_id = {}
+
+
+def colonnes_titres(prefixe='titre'):
+    return [f'{prefixe}_{code}' for code in LANGUES]
+
+
+def charger(generation):
+    """
+    Construit le graphe depuis `default` (pas une réplique, qui peut être en retard sur
+    la génération), dans une transaction REPEATABLE READ : un seul instantané pour toutes
+    les tables. L'ordre des enfants est celui retourné par PostgreSQL (même collation que
+    les querysets des vues).
+    """
+    graphe = Graphe(generation)
+    base = DEFAULT_DB_ALIAS
+    with transaction.atomic(using=base):
+        with connections[base].cursor() as cursor:
+            cursor.execute('SET TRANSACTION ISOLATION LEVEL REPEATABLE READ READ ONLY')
+
+        produits_fournisseur = {}
+        rattachements = []
+        for pk, parent, nom, image, ordre, creation, modification in ProduitFournisseur.objects.using(base).filter(visible=True).order_by('ordre', 'nom').values_list(
+            'id', 'sous_famille_id', 'nom', 'image', 'ordre', 'date_creation', 'date_modification'
+        ):
+            rattachements.append((parent, pk))
+            produits_fournisseur[pk] = noeud(
+                ProduitFournisseurNoeud, id=pk, nom=nom, image=image, ordre=ordre,
+                date_creation=date(creation), date_modification=date(modification), catalogues=[],
+            )
+        for pk, parent, nom, fichier, ordre, creation, modification in Catalogue.objects.using(base).filter(visible=True).order_by('ordre', 'nom').values_list(
+            'id', 'produit_fournisseur_id', 'nom', 'fichier_pdf', 'ordre', 'date_creation', 'date_modification'
+        ):
+            if parent in produits_fournisseur:
+                produits_fournisseur[parent].catalogues.append(noeud(
+                    CatalogueNoeud, id=pk, nom=nom, fichier_pdf=fichier, ordre=ordre,
+                    date_creation=date(creation), date_modification=date(modification),
+                ))
+
+        # Premier partenaire (par nom) de chaque famille, actif ou non, comme SousFamilleSerializer
+        premiers_partenaires = {}
+        partenaires_des_familles = {}
+        for famille_id, partenaire_id in Famille.partenaires.through.objects.using(base).order_by('partenaire__nom').values_list(
+            'famille_id', 'partenaire_id'
+        ):
+            premiers_partenaires.setdefault(famille_id, partenaire_id)
+            partenaires_des_familles.setdefault(famille_id, []).append(partenaire_id)
+
+        familles = {}
+        familles_visibles = set()
+        for pk, actif, visible, ordre, creation, modification, *valeurs in Famille.objects.using(base).order_by('ordre', 'titre_fr').values_list(
+            'id', 'actif', 'visible', 'ordre', 'date_creation', 'date_modification', *colonnes_titres()
+        ):
+            if visible:
+                familles_visibles.add(pk)
+            familles[pk] = noeud(
+                FamilleNoeud, id=pk, titres=tuple(valeurs), actif=actif, ordre=ordre,
+                date_creation=date(creation), date_modification=date(modification),
+                partenaire_id=premiers_partenaires.get(pk), sous_familles=[],
+            )
+
+        for pk, famille_id, actif, visible, ordre, creation, modification, *valeurs in SousFamille.objects.using(base).order_by('ordre', 'titre_fr').values_list(
+            'id', 'famille_id', 'actif', 'visible', 'ordre', 'date_creation', 'date_modification', *colonnes_titres()
+        ):
+            sous_famille = noeud(
+                SousFamilleNoeud, id=pk, famille=familles[famille_id], titres=tuple(valeurs), actif=actif, ordre=ordre,
+                date_creation=date(creation), date_modification=date(modification), produits_fournisseur=[],
+            )
+            graphe.sous_familles_par_id[pk] = sous_famille
+            if visible:
+                familles[famille_id].sous_familles.append(sous_famille)
+        for sous_famille_id, produit_fournisseur_id in rattachements:
+            graphe.sous_familles_par_id[sous_famille_id].produits_fournisseur.append(produits_fournisseur[produit_fournisseur_id])
+
+        for pk, nom, logo, url, actif, creation, modification in Partenaire.objects.using(base).order_by('nom').values_list(
+            'id', 'nom', 'logo', 'url_site_web', 'actif', 'date_creation', 'date_modification'
+        ):
+            partenaire = noeud(
+                PartenaireNoeud, id=pk, nom=nom, logo=logo, url_site_web=url, actif=actif,
+                date_creation=date(creation), date_modification=date(modification), familles=[],
+            )
+            graphe.partenaires.append(partenaire)
+            graphe.partenaires_par_id[pk] = partenaire
+        for famille in familles.values():
+            if famille.id in familles_visibles:
+                for partenaire_id in partenaires_des_familles.get(famille.id, ()):
+                    graphe.partenaires_par_id[partenaire_id].familles.append(famille)
+
+        for pk, image, actif, ordre, creation, modification, *valeurs in Produit.objects.using(base).order_by('ordre', 'titre_fr').values_list(
+            'id', 'image_couverture', 'actif', 'ordre', 'date_creation', 'date_modification',
+            *colonnes_titres(), *colonnes_titres('description')
+        ):
+            produit = noeud(
+                ProduitNoeud, id=pk, titres=tuple(valeurs[:len(LANGUES)]), descriptions=tuple(valeurs[len(LANGUES):]),
+                image_couverture=image, actif=actif, ordre=ordre,
+                date_creation=date(creation), date_modification=date(modification), partenaires=[],
+            )
+            graphe.produits.append(produit)
+            graphe.produits_par_id[pk] = produit
+        for produit_id, partenaire_id in Produit.partenaires.through.objects.using(base).filter(partenaire__visible=True).order_by('partenaire__nom').values_list(
+            'produit_id', 'partenaire_id'
+        ):
+            graphe.produits_par_id[produit_id].partenaires.append(graphe.partenaires_par_id[partenaire_id])
+    return graphe
+
+
+_graphe = None
+_verrou = threading.Lock()
+
+
+def graphe_charge(generation):
+    """Graphe du worker s'il correspond à `generation`, sinon None"""
+    graphe = _graphe
+    if graphe is not None and graphe.generation == generation:
+        return graphe
+    return None
+
+
+def recharger(generation):
+    """
+    Recharge le graphe pour `generation` et le retourne, ou retourne None si un autre
+    thread du worker est déjà en train de le faire.
+    """
+    global _graphe
+    if not _verrou.acquire(blocking=False):
+        return None
+    try:
+        graphe = graphe_charge(generation)
+        if graphe is None:
+            graphe = _graphe = charger(generation)
+            logger.info(
+                "Graphe du catalogue chargé : %d partenaires, %d sous-familles, %d produits",
+                len(graphe.partenaires), len(graphe.sous_familles_par_id), len(graphe.produits),
+            )
+        return graphe
+    except Exception:
+        logger.exception("Échec du chargement du graphe du catalogue")
+        return None
+    finally:
+        _verrou.release()
+
+
+# Rendu : mêmes champs, dans le même ordre, que les serializers de l'API
+
+def url_fichier(request, nom):
+    if not nom:
+        return None
+    url = default_storage.url(nom)
+    return request.build_absolute_uri(url) if request is not None else url
+
+
+def rendre_catalogue(catalogue, request):
+    url = url_fichier(request, catalogue.fichier_pdf)
+    return {
+        'id': catalogue.id,
+        'nom': catalogue.nom,
+        'fichier_pdf': url,
+        'fichier_pdf_url': url,
+        'actif': True,
+        'ordre': catalogue.ordre,
+        'date_creation': catalogue.date_creation,
+        'date_modification': catalogue.date_modification,
+    }
+
+
+def rendre_produit_fournisseur(produit_fournisseur, request):
+    url = url_fichier(request, produit_fournisseur.image)
+    return {
+        'id': produit_fournisseur.id,
+        'nom': produit_fournisseur.nom,
+        'image': url,
+        'image_url': url,
+        'catalogues': [rendre_catalogue(catalogue, request) for catalogue in produit_fournisseur.catalogues],
+        'actif': True,
+        'ordre': produit_fournisseur.ordre,
+        'date_creation': produit_fournisseur.date_creation,
+        'date_modification': produit_fournisseur.date_modification,
+    }
+
+
+def rendre_sous_famille(sous_famille, request, langue):
+    return {
+        'id': sous_famille.id,
+        'famille_id': sous_famille.famille.id,
+        'partenaire_id': sous_famille.famille.partenaire_id,
+        **titres(sous_famille.titres, langue),
+        'produits_fournisseur': [
+            rendre_produit_fournisseur(produit_fournisseur, request)
+            for produit_fournisseur in sous_famille.produits_fournisseur
+        ],
+        'actif': sous_famille.actif,
+        'ordre': sous_famille.ordre,
+        'date_creation': sous_famille.date_creation,
+        'date_modification': sous_famille.date_modification,
+    }
+
+
+def rendre_famille(famille, request, langue):
+    return {
+        'id': famille.id,
+        **titres(famille.titres, langue),
+        'sous_familles': [rendre_sous_famille(sous_famille, request, langue) for sous_famille in famille.sous_familles],
+        'actif': famille.actif,
+        'ordre': famille.ordre,
+        'date_creation': famille.date_creation,
+        'date_modification': famille.date_modification,
+    }
+
+
+def rendre_partenaire(partenaire, request, langue):
+    url = url_fichier(request, partenaire.logo)
+    return {
+        'id': partenaire.id,
+        'nom': partenaire.nom,
+        'logo': url,
+        'logo_url': url,
+        'url_site_web': partenaire.url_site_web,
+        'familles': [rendre_famille(famille, request, langue) for famille in partenaire.familles],
+        'actif': partenaire.actif,
+        'date_creation': partenaire.date_creation,
+        'date_modification': partenaire.date_modification,
+    }
+
+
+def rendre_produit(produit, request, langue):
+    url = url_fichier(request, produit.image_couverture)
+    descriptions = {
+        cle.replace('titre', 'description', 1): valeur
+        for cle, valeur in titres(produit.descriptions, langue).items()
+    }
+    return {
+        'id': produit.id,
+        **titres(produit.titres, langue),
+        'image_couverture': url,
+        'image_couverture_url': url,
+        **descriptions,
+        'partenaires': [rendre_partenaire(partenaire, request, langue) for partenaire in produit.partenaires],
+        'actif': produit.actif,
+        'ordre': produit.ordre,
+        'date_creation': produit.date_creation,
+        'date_modification': produit.date_modification,
+    }
@@ -0,0 +1,99 @@
+"""
+Projection des champs multilingues sur une seule langue.
+
+Avec ?lang=fr|en|ar (ou ?lang=auto pour négocier via l'en-tête Accept-Language), les
+endpoints de lecture retournent un seul champ `titre` (et `description` pour les produits)
+au lieu des colonnes _fr/_en/_ar. Une traduction vide retombe sur le français directement
+en SQL, et les colonnes multilingues ne sont pas chargées depuis la base.
+Sans ?lang, les réponses restent inchangées.
+"""
+from django.db.models import F, Value
+from django.db.models.functions import Coalesce, NullIf
+from django.utils.cache import patch_vary_headers
+from django.utils.translation.trans_real import parse_accept_lang_header
+from rest_framework import serializers
+from rest_framework.permissions import SAFE_METHODS
+
+
+LANGUES = ('fr', 'en', 'ar')
+LANGUE_PAR_DEFAUT = 'fr'
+
+
+def langue_demandee(request):
+    """Retourne la langue de projection demandée, ou None pour la réponse multilingue complète"""
+    valeur = request.GET.get('lang')
+    if valeur is None or request.method not in SAFE_METHODS:
+        return None
+    valeur = valeur.lower()
+    if valeur in LANGUES:
+        return valeur
+    # ?lang=auto (ou vide, ou inconnue) : négociation via Accept-Language
+    for code, _ in parse_accept_lang_header(request.headers.get('Accept-Language', '')):
+        code = code.split('-')[0]
+        if code in LANGUES:
+            return code
+    return LANGUE_PAR_DEFAUT
+
+
+def varier_selon_langue(request, response):
+    """Ajoute Vary: Accept-Language lorsque la langue a été négociée"""
+    if 'lang' in request.GET and request.GET['lang'].lower() not in LANGUES:
+        patch_vary_headers(response, ('Accept-Language',))
+    return response
+
+
+def expression_localisee(champ, langue):
+    """titre + en -> COALESCE(NULLIF(titre_en, ''), titre_fr)"""
+    colonne = F(f'{champ}_{langue}')
+    if langue == LANGUE_PAR_DEFAUT:
+        return colonne
+    return Coalesce(NullIf(colonne, Value('')), F(f'{champ}_{LANGUE_PAR_DEFAUT}'))
+
+
+def projeter(queryset, langue, champs=('titre',)):
+    """Annote les champs projetés et diffère le chargement des colonnes multilingues"""
+    if langue is None:
+        return queryset
+    colonnes = [f'{champ}_{code}' for champ in champs for code in LANGUES]
+    return queryset.annotate(
+        **{champ: expression_localisee(champ, langue) for champ in champs}
+    ).defer(*colonnes)
+
+
+class ProjectionLangueSerializerMixin:
+    """
+    Remplace les champs <champ>_fr/_en/_ar par un seul champ <champ> lorsque
+    le contexte du serializer (partagé avec les serializers imbriqués) porte une langue.
+    """
+    champs_localises = ('titre',)
+
+    def get_fields(self):
+        fields = super().get_fields()
+        if not self.context.get('langue'):
+            return fields
+        projetes = {}
+        for nom, field in fields.items():
+            base, _, code = nom.rpartition('_')
+            if base in self.champs_localises and code in LANGUES:
+                projetes.setdefault(base, serializers.CharField(read_only=True))
+            else:
+                projetes[nom] = field
+        return projetes
+
+
+class ProjectionLangueViewSetMixin:
+    """Transmet la langue de projection (?lang=) aux querysets et aux serializers"""
+
+    def get_langue(self):
+        if not hasattr(self, '_langue'):
+            self._langue = langue_demandee(self.request)
+        return self._langue
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['langue'] = self.get_langue()
+        return context
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        return varier_selon_langue(request, response)
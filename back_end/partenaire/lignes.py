@@ -0,0 +1,218 @@
+"""
+Maintenance du modèle de lecture LigneCatalogue.
+
+`actualiser(modele, pks, operation, familles)` est appelé par signals.notifier_modification,
+dans la transaction de chaque écriture et après le recalcul de la colonne `visible`
+(visibilite.py) : les lignes des produits fournisseur touchés sont supprimées puis
+recalculées, de sorte que la table reste cohérente avec le catalogue pour toute lecture
+qui voit l'écriture. La visibilité d'une ligne est celle, déjà calculée, du produit
+fournisseur et de son partenaire. `reconstruire()` recalcule toute la table
+(commande rebuild_catalog_lines).
+
+Les listes de /api/produits-fournisseur/vitrine/ sont lues par `lignes_visibles`, dont
+chaque combinaison de filtre et de tri correspond à un index partiel de LigneCatalogue.
+"""
+from functools import reduce
+from operator import or_
+
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models import Exists, OuterRef, Q
+from rest_framework import serializers
+
+from .formats import table
+from .langues import LANGUES
+from .models import Partenaire, Famille, SousFamille, ProduitFournisseur, Catalogue, LigneCatalogue
+
+
+TAILLE_LOT = 2000
+
+_date = serializers.DateTimeField()
+
+# Clés de tri, de la plus générale à la plus fine. Un filtre sur un ancêtre retire
+# les clés devenues constantes, pour suivre l'index correspondant.
+ORDRES = {
+    'ordre': (
+        'famille_ordre', 'famille_titre_fr', 'famille_id',
+        'sous_famille_ordre', 'sous_famille_titre_fr', 'sous_famille_id',
+        'ordre', 'nom', 'produit_fournisseur_id',
+    ),
+    'nom': ('nom', 'produit_fournisseur_id'),
+}
+
+
+def lignes_visibles(partenaire=None, famille=None, sous_famille=None, ordre='ordre'):
+    """
+    Lignes visibles filtrées par ancêtre, triées selon ORDRES[ordre]. Sans filtre par
+    partenaire, seule la ligne principale de chaque produit est retournée.
+    """
+    lignes = LigneCatalogue.objects.filter(visible=True)
+    if partenaire is not None:
+        lignes = lignes.filter(partenaire_id=partenaire)
+    else:
+        lignes = lignes.filter(principal=True)
+    colonnes = ORDRES[ordre]
+    if sous_famille is not None:
+        lignes = lignes.filter(sous_famille_id=sous_famille)
+        if ordre == 'ordre' and partenaire is None:
+            colonnes = colonnes[colonnes.index('ordre'):]
+    elif famille is not None:
+        lignes = lignes.filter(famille_id=famille)
+        if ordre == 'ordre' and partenaire is None:
+            colonnes = colonnes[colonnes.index('sous_famille_ordre'):]
+    return lignes.order_by(*colonnes)
+
+
+# Clés des catalogues enregistrés dans LigneCatalogue.catalogues (voir catalogues_par_produit)
+CLES_CATALOGUE = ('id', 'nom', 'fichier_pdf', 'fichier_pdf_url', 'actif', 'ordre', 'date_creation', 'date_modification')
+
+
+def colonnes_vitrine(langue=None):
+    """(champs lus par values_list, noms des colonnes de la vitrine en format compact)"""
+    def titres(champ):
+        return (champ,) if langue else tuple(f'{champ}_{code}' for code in LANGUES)
+
+    champs = (
+        'produit_fournisseur_id', 'nom', 'image', 'catalogues', 'ordre', 'partenaire_id', 'partenaire_nom',
+        'famille_id', *titres('famille_titre'), 'sous_famille_id', *titres('sous_famille_titre'),
+        'date_creation', 'date_modification',
+    )
+    return champs, ('id', 'nom', 'image', 'image_url', 'catalogues', *champs[4:])
+
+
+def lignes_compactes(lignes, url):
+    """Tuples de values_list(*colonnes_vitrine()[0]) -> lignes de la vitrine en format compact"""
+    resultat = []
+    for pk, nom, image, catalogues, *reste in lignes:
+        image = url(default_storage.url(image)) if image else None
+        catalogues = table(CLES_CATALOGUE, [
+            (c['id'], c['nom'], url(c['fichier_pdf']), url(c['fichier_pdf']), c['actif'], c['ordre'],
+             c['date_creation'], c['date_modification'])
+            for c in catalogues
+        ])
+        resultat.append((pk, nom, image, image, catalogues, *reste))
+    return resultat
+
+
+def catalogues_par_produit(produits_ids):
+    """{produit fournisseur: [catalogue visible sous la forme de CatalogueSerializer, URLs relatives]}"""
+    resultat = {}
+    for pk, parent, nom, fichier, ordre, creation, modification in Catalogue.objects.filter(
+        produit_fournisseur_id__in=produits_ids, visible=True
+    ).order_by('ordre', 'nom').values_list(
+        'id', 'produit_fournisseur_id', 'nom', 'fichier_pdf', 'ordre', 'date_creation', 'date_modification'
+    ):
+        url = default_storage.url(fichier) if fichier else None
+        resultat.setdefault(parent, []).append({
+            'id': pk,
+            'nom': nom,
+            'fichier_pdf': url,
+            'fichier_pdf_url': url,
+            'actif': True,
+            'ordre': ordre,
+            'date_creation': _date.to_representation(creation),
+            'date_modification': _date.to_representation(modification),
+        })
+    return resultat
+
+
+def construire(produits_ids):
+    """Lignes (non enregistrées) des produits fournisseur indiqués"""
+    produits = list(ProduitFournisseur.objects.filter(pk__in=produits_ids).values_list(
+        'id', 'nom', 'image', 'ordre', 'visible', 'date_creation', 'date_modification',
+        'sous_famille_id', 'sous_famille__ordre',
+        'sous_famille__titre_fr', 'sous_famille__titre_en', 'sous_famille__titre_ar',
+        'sous_famille__famille_id', 'sous_famille__famille__ordre',
+        'sous_famille__famille__titre_fr', 'sous_famille__famille__titre_en', 'sous_famille__famille__titre_ar',
+    ))
+    # Partenaires de chaque famille : les visibles d'abord, puis par nom (le premier porte la ligne principale)
+    partenaires = {}
+    for famille_id, partenaire_id, nom, visible in Famille.partenaires.through.objects.filter(
+        famille_id__in={produit[12] for produit in produits}
+    ).order_by('-partenaire__visible', 'partenaire__nom', 'partenaire_id').values_list(
+        'famille_id', 'partenaire_id', 'partenaire__nom', 'partenaire__visible'
+    ):
+        partenaires.setdefault(famille_id, []).append((partenaire_id, nom, visible))
+    catalogues = catalogues_par_produit([produit[0] for produit in produits])
+
+    lignes = []
+    for (pk, nom, image, ordre, visible, creation, modification,
+         sous_famille_id, sous_famille_ordre, sf_fr, sf_en, sf_ar,
+         famille_id, famille_ordre, f_fr, f_en, f_ar) in produits:
+        for rang, (partenaire_id, partenaire_nom, partenaire_visible) in enumerate(partenaires.get(famille_id) or [(None, '', True)]):
+            lignes.append(LigneCatalogue(
+                produit_fournisseur_id=pk, partenaire_id=partenaire_id, famille_id=famille_id, sous_famille_id=sous_famille_id,
+                nom=nom, image=image or '', partenaire_nom=partenaire_nom,
+                famille_titre_fr=f_fr, famille_titre_en=f_en, famille_titre_ar=f_ar,
+                sous_famille_titre_fr=sf_fr, sous_famille_titre_en=sf_en, sous_famille_titre_ar=sf_ar,
+                famille_ordre=famille_ordre, sous_famille_ordre=sous_famille_ordre, ordre=ordre,
+                date_creation=creation, date_modification=modification,
+                principal=rang == 0, visible=visible and partenaire_visible,
+                catalogues=catalogues.get(pk, []),
+            ))
+    return lignes
+
+
+def recalculer(produits_ids):
+    """Remplace les lignes des produits fournisseur indiqués"""
+    produits_ids = list(produits_ids)
+    for debut in range(0, len(produits_ids), TAILLE_LOT):
+        lot = produits_ids[debut:debut + TAILLE_LOT]
+        LigneCatalogue.objects.filter(produit_fournisseur_id__in=lot).delete()
+        LigneCatalogue.objects.bulk_create(construire(lot), batch_size=1000)
+
+
+def produits_touches(modele, pks, operation, familles=None):
+    """
+    Identifiants des produits fournisseur dont les lignes dépendent des objets modifiés.
+    `familles` : familles liées aux partenaires supprimés (voir signals.py).
+    """
+    from .signals import CREATION, SUPPRESSION
+
+    if modele is ProduitFournisseur:
+        return set(pks)
+    if modele is Catalogue:
+        touches = set(Catalogue.objects.filter(pk__in=pks).values_list('produit_fournisseur_id', flat=True))
+        if operation == SUPPRESSION:
+            contenant = reduce(or_, (Q(catalogues__contains=[{'id': pk}]) for pk in pks))
+            touches.update(LigneCatalogue.objects.filter(contenant).values_list('produit_fournisseur_id', flat=True))
+        return touches
+    if operation == CREATION:
+        # Un ancêtre qui vient d'être créé n'a pas encore de produits : ceux-ci, ou la
+        # relation avec les partenaires (m2m_changed), sont notifiés à leur tour
+        return set()
+    if modele is SousFamille:
+        return set(ProduitFournisseur.objects.filter(sous_famille_id__in=pks).values_list('pk', flat=True))
+    if modele is Famille:
+        return set(ProduitFournisseur.objects.filter(sous_famille__famille_id__in=pks).values_list('pk', flat=True))
+    if modele is Partenaire:
+        if operation != SUPPRESSION:
+            return set(ProduitFournisseur.objects.filter(
+                sous_famille__famille__partenaires__in=pks
+            ).values_list('pk', flat=True))
+        if familles is not None:
+            # Produits des familles liées avant la suppression (lignes principales à réattribuer)
+            return set(ProduitFournisseur.objects.filter(sous_famille__famille_id__in=familles).values_list('pk', flat=True))
+        # Familles inconnues : produits sans ligne principale (les lignes du partenaire
+        # ont été supprimées en cascade)
+        return set(ProduitFournisseur.objects.exclude(
+            Exists(LigneCatalogue.objects.filter(produit_fournisseur=OuterRef('pk'), principal=True))
+        ).values_list('pk', flat=True))
+    return set()
+
+
+def actualiser(modele, pks, operation, familles=None):
+    """Recalcule, dans la transaction courante, les lignes touchées par une écriture"""
+    touches = produits_touches(modele, pks, operation, familles)
+    if touches:
+        recalculer(touches)
+
+
+def reconstruire():
+    """Recalcule toute la table, dans une transaction ; retourne le nombre de lignes"""
+    with transaction.atomic():
+        LigneCatalogue.objects.all().delete()
+        produits_ids = list(ProduitFournisseur.objects.order_by('pk').values_list('pk', flat=True))
+        for debut in range(0, len(produits_ids), TAILLE_LOT):
+            LigneCatalogue.objects.bulk_create(construire(produits_ids[debut:debut + TAILLE_LOT]), batch_size=1000)
+        return LigneCatalogue.objects.count()
@@ -0,0 +1,184 @@
+"""
+Audit des requêtes SQL de l'API et des listes de l'admin.
+
+Usage :
+    python manage.py audit_queries
+    python manage.py audit_queries --seed-scale 20 --json audit.json --fail-on-issues
+
+La commande appelle chaque endpoint de lecture des ViewSets (list, retrieve et actions
+GET), les vues /api/navigation/ et /api/changes/, et la liste de chaque modèle dans
+l'admin. Toutes les requêtes SQL exécutées sont capturées ; chaque SELECT est rejoué
+avec EXPLAIN (ANALYZE, BUFFERS) pour signaler les parcours séquentiels, les tris sur
+disque et les estimations de lignes très fausses. Les requêtes répétées au sein d'un
+même appel (N+1) sont aussi signalées. Le rapport est regroupé par ViewSet/action.
+
+Tout s'exécute dans une transaction annulée à la fin : `--seed-scale` génère un
+catalogue synthétique (seed_catalog) qui n'est pas conservé.
+"""
+import json
+import re
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.contrib import admin
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DatabaseError, connection, transaction
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import reverse
+
+from partenaire.cache import invalider
+from partenaire.explain import expliquer, parcours, problemes
+from partenaire.urls import router as router_partenaire
+from produit.urls import router as router_produit
+
+
+# Au-delà, une même requête (aux paramètres près) répétée dans un appel est signalée (N+1)
+REPETITIONS_MAX = 3
+
+# Variantes de paramètres appelées en plus de chaque liste
+VARIANTES_LISTE = ('', '?actif=true', '?lang=en')
+
+
+class AnnulerAudit(Exception):
+    """Levée pour annuler la transaction de l'audit"""
+
+
+def gabarit(sql):
+    """Requête sans ses valeurs littérales, pour regrouper les répétitions"""
+    return re.sub(r'\b\d+\b', '?', sql)
+
+
+class Capture:
+    """execute_wrapper qui enregistre chaque requête exécutée (sql, params, durée)"""
+
+    def __init__(self):
+        self.requetes = []
+
+    def __call__(self, execute, sql, params, many, context):
+        debut = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            if not many:
+                self.requetes.append((sql, params, (time.perf_counter() - debut) * 1000))
+
+
+class Command(BaseCommand):
+    help = "Capture et analyse (EXPLAIN ANALYZE) les requêtes SQL des endpoints de l'API et de l'admin"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seed-scale', type=int, default=0, help="Génère d'abord un catalogue synthétique (annulé à la fin)")
+        parser.add_argument('--json', dest='fichier_json', help="Enregistre le rapport complet dans ce fichier")
+        parser.add_argument('--fail-on-issues', action='store_true', help="Code de sortie non nul si une anomalie est trouvée")
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError("audit_queries nécessite PostgreSQL (EXPLAIN ANALYZE).")
+        hote = next((h for h in settings.ALLOWED_HOSTS if h not in ('*', '') and not h.startswith('.')), 'localhost')
+
+        rapport = {}
+        try:
+            with transaction.atomic(), override_settings(CACHE_REPONSES_DUREE=0):
+                if options['seed_scale']:
+                    call_command('seed_catalog', scale=options['seed_scale'], seed=42, stdout=self.stdout)
+                invalider()  # caches de l'arbre de navigation
+
+                client = Client(HTTP_HOST=hote, HTTP_ACCEPT='application/json')
+                utilisateur = get_user_model().objects.create_superuser(
+                    username='audit-queries', email='audit@example.com', password=None
+                )
+                client.force_login(utilisateur)
+
+                for nom, url in self.cibles():
+                    rapport[nom] = self.auditer(client, url)
+                raise AnnulerAudit
+        except AnnulerAudit:
+            pass
+
+        total = self.afficher(rapport)
+        if options['fichier_json']:
+            with open(options['fichier_json'], 'w') as fichier:
+                json.dump(rapport, fichier, indent=2, default=str)
+            self.stdout.write(f"Rapport enregistré dans {options['fichier_json']}")
+        if total and options['fail_on_issues']:
+            raise CommandError(f"{total} anomalie(s) trouvée(s).")
+
+    def cibles(self):
+        """[(ViewSet.action, url)] pour l'API, puis les listes de l'admin"""
+        for router in (router_partenaire, router_produit):
+            for _, viewset, basename in router.registry:
+                modele = viewset.queryset.model
+                for variante in VARIANTES_LISTE:
+                    yield f"{viewset.__name__}.list{variante}", reverse(f'{basename}-list') + variante
+                pk = modele.objects.order_by('pk').values_list('pk', flat=True).first()
+                if pk is not None:
+                    yield f"{viewset.__name__}.retrieve", reverse(f'{basename}-detail', args=[pk])
+                for action in viewset.get_extra_actions():
+                    if 'get' in action.mapping and not action.detail:
+                        yield f"{viewset.__name__}.{action.__name__}", reverse(f'{basename}-{action.url_name}')
+        yield "NavigationView.get", reverse('navigation')
+        yield "ChangementsView.get", reverse('changements') + '?since=0.0&limit=100'
+
+        for modele, model_admin in admin.site._registry.items():
+            if modele._meta.app_label in ('partenaire', 'produit'):
+                yield (
+                    f"{type(model_admin).__name__}.changelist",
+                    reverse(f'admin:{modele._meta.app_label}_{modele._meta.model_name}_changelist'),
+                )
+
+    def auditer(self, client, url):
+        capture = Capture()
+        with connection.execute_wrapper(capture):
+            response = client.get(url)
+        requetes = [
+            (sql, params, duree) for sql, params, duree in capture.requetes
+            if sql.lstrip().upper().startswith('SELECT')
+        ]
+
+        resultat = {
+            'url': url,
+            'statut': response.status_code,
+            'requetes': len(requetes),
+            'duree_sql_ms': round(sum(duree for _, _, duree in requetes), 2),
+            'anomalies': [],
+            'plans': [],
+        }
+        identiques = Counter((sql, repr(params)) for sql, params, _ in requetes)
+        for (sql, _), nombre in identiques.items():
+            if nombre > 1:
+                resultat['anomalies'].append(f"requête identique exécutée {nombre} fois : {sql[:120]}")
+        similaires = Counter(gabarit(sql) for sql, _, _ in requetes)
+        for sql, nombre in similaires.items():
+            if nombre > REPETITIONS_MAX:
+                resultat['anomalies'].append(f"N+1 probable ({nombre} requêtes de même forme) : {sql[:120]}")
+
+        for sql, params in dict.fromkeys((sql, tuple(params or ())) for sql, params, _ in requetes):
+            try:
+                with transaction.atomic():
+                    plan = expliquer(sql, params)
+            except DatabaseError as erreur:
+                resultat['anomalies'].append(f"EXPLAIN impossible ({erreur}) : {sql[:120]}")
+                continue
+            for anomalie in problemes(plan):
+                resultat['anomalies'].append(f"{anomalie} : {sql[:120]}")
+            resultat['plans'].append({'sql': sql, 'parcours': parcours(plan), 'duree_ms': plan['Execution Time']})
+        return resultat
+
+    def afficher(self, rapport):
+        total = 0
+        for nom, resultat in rapport.items():
+            anomalies = resultat['anomalies']
+            total += len(anomalies)
+            style = self.style.WARNING if anomalies or resultat['statut'] >= 400 else self.style.SUCCESS
+            self.stdout.write(style(
+                f"{nom:50} HTTP {resultat['statut']}  {resultat['requetes']:3d} requête(s)  "
+                f"{resultat['duree_sql_ms']:8.2f} ms"
+            ))
+            for anomalie in anomalies:
+                self.stdout.write(self.style.WARNING(f"    ! {anomalie}"))
+        self.stdout.write(f"\n{len(rapport)} appel(s) audité(s), {total} anomalie(s).")
+        return total
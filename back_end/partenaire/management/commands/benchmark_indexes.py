@@ -0,0 +1,92 @@
+"""
+Mesure les plans d'exécution des requêtes de lecture publiques (listes actives et Prefetch).
+
+Usage :
+    python manage.py seed_catalog --scale 50 --seed 42
+    python manage.py benchmark_indexes
+    python manage.py benchmark_indexes --repetitions 20 --json plans.json
+
+Pour chaque requête, la commande affiche les parcours de tables (Index Only Scan,
+Index Scan, Seq Scan...), l'index utilisé, le temps d'exécution médian et les tampons
+lus. Les requêtes sont celles de partenaire/requetes.py et produit/requetes.py, avec
+des identifiants parents tirés d'une page de résultats.
+"""
+import json
+import statistics
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from partenaire.explain import expliquer, parcours, problemes, tampons
+from partenaire.models import Partenaire, Famille, SousFamille, ProduitFournisseur, Catalogue
+from partenaire.navigation import requete_arbre
+from partenaire.requetes import catalogues_visibles, familles_visibles, produits_fournisseur_visibles, sous_familles_visibles
+from produit.models import Produit
+
+
+# Nombre d'objets parents utilisés pour les Prefetch (une page de l'API)
+TAILLE_PAGE = 20
+
+
+def echantillon(modele):
+    return list(modele.objects.filter(visible=True).order_by('?').values_list('pk', flat=True)[:TAILLE_PAGE])
+
+
+def requetes():
+    """[(nom, sql, params)] des requêtes de lecture publiques"""
+    def sql(queryset):
+        return queryset.query.sql_with_params()
+
+    return [
+        ('partenaires actifs', *sql(Partenaire.objects.filter(visible=True).order_by('nom')[:TAILLE_PAGE])),
+        ('produits actifs', *sql(Produit.objects.filter(actif=True).order_by('ordre', 'titre_fr')[:TAILLE_PAGE])),
+        ('familles visibles (liste)', *sql(Famille.objects.filter(visible=True).order_by('ordre', 'titre_fr')[:TAILLE_PAGE])),
+        ('familles visibles (Prefetch)', *sql(familles_visibles().filter(partenaires__in=echantillon(Partenaire)))),
+        ('sous-familles visibles (Prefetch)', *sql(sous_familles_visibles().filter(famille__in=echantillon(Famille)))),
+        ('produits fournisseur visibles (Prefetch)', *sql(produits_fournisseur_visibles().filter(sous_famille__in=echantillon(SousFamille)))),
+        ('catalogues visibles (Prefetch)', *sql(catalogues_visibles().filter(produit_fournisseur__in=echantillon(ProduitFournisseur)))),
+        ('arbre de navigation', requete_arbre(), ()),
+    ]
+
+
+class Command(BaseCommand):
+    help = "Affiche les plans d'exécution des requêtes de lecture publiques (EXPLAIN ANALYZE)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repetitions', type=int, default=5, help="Exécutions par requête (temps médian)")
+        parser.add_argument('--no-analyze-tables', action='store_true', help="Ne pas lancer ANALYZE sur les tables avant la mesure")
+        parser.add_argument('--json', dest='fichier_json', help="Enregistre les plans complets dans ce fichier")
+
+    def handle(self, *args, **options):
+        if not options['no_analyze_tables']:
+            # Statistiques à jour, sinon le planificateur ignore des index fraîchement créés
+            with connection.cursor() as cursor:
+                for modele in (Partenaire, Famille, SousFamille, ProduitFournisseur, Catalogue, Produit):
+                    cursor.execute(f'ANALYZE {modele._meta.db_table}')
+
+        volumes = ', '.join(
+            f"{modele._meta.verbose_name_plural.lower()} : {modele.objects.count()}"
+            for modele in (Partenaire, Famille, SousFamille, ProduitFournisseur, Catalogue, Produit)
+        )
+        self.stdout.write(f"Volumes — {volumes}\n")
+
+        rapport = []
+        for nom, sql, params in requetes():
+            plans = [expliquer(sql, params) for _ in range(max(options['repetitions'], 1))]
+            plan = plans[-1]
+            duree = statistics.median(p['Execution Time'] for p in plans)
+            lus_cache, lus_disque = tampons(plan)
+            anomalies = problemes(plan)
+
+            style = self.style.WARNING if anomalies else self.style.SUCCESS
+            self.stdout.write(style(f"{nom:42} {duree:8.2f} ms   tampons {lus_cache} en cache / {lus_disque} lus"))
+            for acces in parcours(plan):
+                self.stdout.write(f"    {acces}")
+            for anomalie in anomalies:
+                self.stdout.write(self.style.WARNING(f"    ! {anomalie}"))
+            rapport.append({'requete': nom, 'sql': sql, 'duree_ms': duree, 'parcours': parcours(plan), 'anomalies': anomalies, 'plan': plan})
+
+        if options['fichier_json']:
+            with open(options['fichier_json'], 'w') as fichier:
+                json.dump(rapport, fichier, indent=2, default=str)
+            self.stdout.write(f"\nPlans enregistrés dans {options['fichier_json']}")
@@ -0,0 +1,148 @@
+"""
+Prépare le conteneur au démarrage, dans un seul processus Python.
+
+Remplace la séquence de l'entrypoint (attente de la base, migrate, collectstatic,
+réinitialisation du superutilisateur) en sautant les étapes qui n'ont rien à faire.
+Remplit aussi le modèle de lecture LigneCatalogue s'il est vide (première migration).
+
+Usage :
+    python manage.py bootstrap
+"""
+import hashlib
+import os
+import time
+
+from decouple import config
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.staticfiles.finders import get_finders
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.db.utils import OperationalError
+
+
+# Fichier, dans STATIC_ROOT, qui mémorise l'empreinte des fichiers statiques collectés
+FICHIER_EMPREINTE_STATIQUES = '.bootstrap-static.sha256'
+MANIFESTE_STATIQUES = 'staticfiles.json'
+
+# Motifs ignorés par collectstatic par défaut
+MOTIFS_IGNORES = ['CVS', '.*', '*~']
+
+
+class Command(BaseCommand):
+    help = "Attend la base, applique les migrations en attente, collecte les statiques si besoin et assure le superutilisateur"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--timeout', type=float, default=60, help="Délai maximal d'attente de la base en secondes")
+        parser.add_argument('--force-collectstatic', action='store_true', help="Collecte les statiques même si rien n'a changé")
+
+    def handle(self, *args, **options):
+        debut = time.perf_counter()
+        self.attendre_base(options['timeout'])
+        self.migrer()
+        self.remplir_lignes()
+        self.collecter_statiques(options['force_collectstatic'])
+        self.assurer_superutilisateur()
+        self.stdout.write(f"✅ Conteneur prêt en {time.perf_counter() - debut:.2f} s")
+
+    def attendre_base(self, timeout):
+        """Attend que PostgreSQL accepte les connexions, avec un délai exponentiel"""
+        self.stdout.write("⏳ Attente de la base de données...")
+        limite = time.monotonic() + timeout
+        delai = 0.1
+        while True:
+            try:
+                connection.ensure_connection()
+                break
+            except OperationalError as exc:
+                if time.monotonic() + delai > limite:
+                    raise CommandError(f"Base de données indisponible après {timeout:.0f} s : {exc}")
+                time.sleep(delai)
+                delai = min(delai * 2, 2.0)
+        self.stdout.write("✅ Base de données prête!")
+
+    def migrer(self):
+        """Applique les migrations uniquement s'il y en a en attente"""
+        executor = MigrationExecutor(connection)
+        plan = executor.migration_plan(executor.loader.graph.leaf_nodes())
+        if not plan:
+            self.stdout.write("✅ Aucune migration en attente")
+            return
+        self.stdout.write(f"🔄 Application de {len(plan)} migration(s)...")
+        call_command('migrate', interactive=False, verbosity=1)
+
+    def remplir_lignes(self):
+        """Construit LigneCatalogue si la table est vide alors que le catalogue ne l'est pas"""
+        from partenaire.models import LigneCatalogue, ProduitFournisseur
+
+        if LigneCatalogue.objects.exists() or not ProduitFournisseur.objects.exists():
+            return
+        self.stdout.write("🔄 Construction des lignes du catalogue...")
+        call_command('rebuild_catalog_lines', verbosity=1)
+
+    def empreinte_statiques(self):
+        """Empreinte des fichiers sources trouvés par les finders (chemin, taille, date)"""
+        entrees = []
+        for finder in get_finders():
+            for chemin, storage in finder.list(MOTIFS_IGNORES):
+                prefixe = getattr(storage, 'prefix', None) or ''
+                stat = os.stat(storage.path(chemin))
+                entrees.append(f'{prefixe}/{chemin}\0{stat.st_size}\0{stat.st_mtime_ns}')
+        empreinte = hashlib.sha256(settings.STATICFILES_STORAGE.encode())
+        for entree in sorted(entrees):
+            empreinte.update(entree.encode())
+            empreinte.update(b'\n')
+        return empreinte.hexdigest()
+
+    def collecter_statiques(self, forcer=False):
+        """Lance collectstatic seulement si les fichiers sources ont changé"""
+        fichier_empreinte = os.path.join(settings.STATIC_ROOT, FICHIER_EMPREINTE_STATIQUES)
+        manifeste = os.path.join(settings.STATIC_ROOT, MANIFESTE_STATIQUES)
+        try:
+            empreinte = self.empreinte_statiques()
+            if not forcer and os.path.exists(manifeste) and os.path.exists(fichier_empreinte):
+                with open(fichier_empreinte, encoding='utf-8') as fichier:
+                    if fichier.read().strip() == empreinte:
+                        self.stdout.write("✅ Fichiers statiques à jour")
+                        return
+            self.stdout.write("📦 Collecte des fichiers statiques...")
+            call_command('collectstatic', interactive=False, verbosity=0)
+            with open(fichier_empreinte, 'w', encoding='utf-8') as fichier:
+                fichier.write(empreinte)
+        except Exception as exc:
+            # Comme `collectstatic || true` : le serveur peut démarrer sans statiques à jour
+            self.stderr.write(f"⚠️  Erreur lors de la collecte des fichiers statiques: {exc}")
+
+    def assurer_superutilisateur(self):
+        """Crée ou réinitialise le superutilisateur d'administration"""
+        username = config('ADMIN_USERNAME', default='pharmaethique')
+        email = config('ADMIN_EMAIL', default='admin@pharmaethique.com')
+        password = config('ADMIN_PASSWORD', default='pharmaethique2026/')
+
+        User = get_user_model()
+        try:
+            user = User.objects.filter(username=username).first()
+            if user is None:
+                User.objects.create_superuser(username=username, email=email, password=password)
+                self.stdout.write(f"✅ Superutilisateur '{username}' créé avec succès!")
+                return
+
+            champs = []
+            attendus = {'email': email, 'is_staff': True, 'is_superuser': True, 'is_active': True}
+            for champ, valeur in attendus.items():
+                if getattr(user, champ) != valeur:
+                    setattr(user, champ, valeur)
+                    champs.append(champ)
+            if not user.check_password(password):
+                user.set_password(password)
+                champs.append('password')
+            if champs:
+                user.save(update_fields=champs)
+                self.stdout.write(f"✅ Superutilisateur '{username}' réinitialisé ({', '.join(champs)})")
+            else:
+                self.stdout.write(f"✅ Superutilisateur '{username}' à jour")
+        except Exception as exc:
+            self.stderr.write(f"⚠️  Erreur lors de la création/réinitialisation du superutilisateur: {exc}")
+            self.stderr.write("   Le container continuera à démarrer, mais vous devrez créer le superuser manuellement.")
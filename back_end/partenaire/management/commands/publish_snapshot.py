@@ -0,0 +1,30 @@
+"""
+Publie l'API publique en fichiers JSON statiques (voir partenaire/snapshot.py).
+
+Usage :
+    python manage.py publish_snapshot
+    python manage.py publish_snapshot --keep 10
+
+La publication est aussi déclenchée automatiquement après chaque modification du
+catalogue (SNAPSHOT_PUBLICATION_AUTO) ; cette commande rend tous les fichiers et ne
+réécrit que ceux dont le contenu a changé.
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from partenaire.snapshot import publier, racine
+
+
+class Command(BaseCommand):
+    help = "Publie les endpoints publics de lecture en fichiers JSON statiques versionnés"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--keep', type=int, default=None, help="Nombre de versions conservées (SNAPSHOT_VERSIONS_CONSERVEES par défaut)")
+
+    def handle(self, *args, **options):
+        if options['keep'] is not None and options['keep'] < 1:
+            raise CommandError("--keep doit être supérieur ou égal à 1.")
+        version, ecrits, lies = publier(conserver=options['keep'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Snapshot {version} publié dans {racine() / 'current'} : "
+            f"{ecrits} fichier(s) écrit(s), {lies} repris de la version précédente."
+        ))
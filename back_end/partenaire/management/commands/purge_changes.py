@@ -0,0 +1,47 @@
+"""
+Purge le journal des changements du catalogue au-delà de la période de rétention.
+
+Usage :
+    python manage.py purge_changes
+    python manage.py purge_changes --days 7
+
+À lancer régulièrement (cron). La purge supprime un préfixe du journal dans l'ordre du
+curseur (transaction, id) : un curseur dont la ligne existe encore reste donc valide.
+La ligne la plus récente du journal est toujours conservée, même au-delà de la
+rétention : c'est le curseur des clients à jour, qui n'ont rien manqué.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Q
+from django.utils import timezone
+
+from partenaire.models import ChangementCatalogue
+
+
+class Command(BaseCommand):
+    help = "Supprime les changements du catalogue plus anciens que la période de rétention"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=settings.CHANGEMENTS_RETENTION_JOURS, help="Rétention en jours")
+
+    def handle(self, *args, **options):
+        if options['days'] < 1:
+            raise CommandError("--days doit être supérieur ou égal à 1.")
+        limite = timezone.now() - timedelta(days=options['days'])
+        borne = (
+            ChangementCatalogue.objects.filter(date__lt=limite)
+            .order_by('-transaction', '-id').values_list('transaction', 'id').first()
+        )
+        if borne is None:
+            self.stdout.write("Aucun changement à purger.")
+            return
+        transaction, identifiant = borne
+        dernier = ChangementCatalogue.objects.order_by('-transaction', '-id').values_list('transaction', 'id').first()
+        # Catalogue inchangé depuis la rétention : la borne est la dernière ligne, gardée
+        jusqua = {'id__lt' if borne == dernier else 'id__lte': identifiant}
+        supprimes, _ = ChangementCatalogue.objects.filter(
+            Q(transaction__lt=transaction) | Q(transaction=transaction, **jusqua)
+        ).delete()
+        self.stdout.write(self.style.SUCCESS(f"{supprimes} changement(s) purgé(s)."))
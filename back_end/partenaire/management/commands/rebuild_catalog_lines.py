@@ -0,0 +1,30 @@
+"""
+Reconstruit le modèle de lecture LigneCatalogue à partir du catalogue, après avoir
+recalculé la colonne `visible` de toute la hiérarchie.
+
+Usage :
+    python manage.py rebuild_catalog_lines
+
+Les deux sont maintenus à chaque écriture (voir partenaire/visibilite.py et lignes.py) ;
+les reconstruire après une restauration de la base ou une écriture SQL directe. La
+reconstruction des lignes se fait dans une transaction : les lectures voient l'ancienne
+table jusqu'à la fin.
+"""
+import time
+
+from django.core.management.base import BaseCommand
+
+from partenaire.lignes import reconstruire
+from partenaire.visibilite import recalculer_tout
+
+
+class Command(BaseCommand):
+    help = "Recalcule toutes les lignes du modèle de lecture du catalogue"
+
+    def handle(self, *args, **options):
+        debut = time.perf_counter()
+        recalculer_tout()
+        lignes = reconstruire()
+        self.stdout.write(self.style.SUCCESS(
+            f"{lignes} ligne(s) du catalogue reconstruite(s) en {time.perf_counter() - debut:.2f} s."
+        ))
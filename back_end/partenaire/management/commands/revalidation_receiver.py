@@ -0,0 +1,67 @@
+"""
+Récepteur local des notifications de revalidation, à la place du frontend Next.js.
+
+Usage :
+    python manage.py revalidation_receiver --port 3001
+    REVALIDATION_URL=http://127.0.0.1:3001/api/revalidate python manage.py runserver 8001
+
+Chaque notification reçue est vérifiée (signature, horodatage) puis affichée.
+`--fail 2` répond 503 aux deux premières notifications pour observer les nouvelles tentatives.
+"""
+import json
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from partenaire.revalidation import ENTETE_HORODATAGE, ENTETE_SIGNATURE, verifier_signature
+
+
+class Command(BaseCommand):
+    help = "Lance un récepteur local qui vérifie et affiche les notifications de revalidation"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--port', type=int, default=3001)
+        parser.add_argument('--secret', default=None, help="Secret de signature (REVALIDATION_SECRET par défaut)")
+        parser.add_argument('--fail', type=int, default=0, help="Nombre de notifications à refuser avec 503")
+
+    def handle(self, *args, **options):
+        commande = self
+        secret = options['secret'] if options['secret'] is not None else settings.REVALIDATION_SECRET
+        echecs = {'restants': options['fail']}
+
+        class Recepteur(BaseHTTPRequestHandler):
+            def do_POST(self):
+                corps = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+                if echecs['restants'] > 0:
+                    echecs['restants'] -= 1
+                    commande.stdout.write(commande.style.WARNING("503 simulé"))
+                    return self.repondre(503, {'error': 'échec simulé'})
+                if not verifier_signature(secret, self.headers.get(ENTETE_HORODATAGE), corps, self.headers.get(ENTETE_SIGNATURE)):
+                    commande.stdout.write(commande.style.ERROR("Signature invalide"))
+                    return self.repondre(401, {'error': 'signature invalide'})
+                notification = json.loads(corps)
+                commande.stdout.write(commande.style.SUCCESS(f"Notification {notification['id']}"))
+                commande.stdout.write(f"  tags  : {', '.join(notification['tags'])}")
+                commande.stdout.write(f"  paths : {', '.join(notification['paths'])}")
+                self.repondre(200, {'revalidated': True})
+
+            def repondre(self, statut, donnees):
+                contenu = json.dumps(donnees).encode()
+                self.send_response(statut)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(contenu)))
+                self.end_headers()
+                self.wfile.write(contenu)
+
+            def log_message(self, format, *args):
+                pass
+
+        serveur = ThreadingHTTPServer(('127.0.0.1', options['port']), Recepteur)
+        self.stdout.write(f"Récepteur de revalidation sur http://127.0.0.1:{options['port']}/ (Ctrl+C pour arrêter)")
+        try:
+            serveur.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            serveur.server_close()
@@ -0,0 +1,281 @@
+"""
+Génère un catalogue synthétique réaliste pour reproduire la charge de production en local.
+
+Usage :
+    python manage.py seed_catalog --scale 1
+    python manage.py seed_catalog --scale 10 --seed 42 --clear
+"""
+import io
+import random
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from PIL import Image, ImageDraw
+
+from partenaire.models import Partenaire, Famille, SousFamille, ProduitFournisseur, Catalogue
+from partenaire.signals import CREATION, notifier_modification
+from produit.models import Produit
+
+
+# Volumes générés pour un facteur d'échelle de 1
+PARTENAIRES_PAR_ECHELLE = 8
+FAMILLES_PAR_ECHELLE = 24
+PRODUITS_PAR_ECHELLE = 30
+SOUS_FAMILLES_PAR_FAMILLE = (2, 6)
+PRODUITS_PAR_SOUS_FAMILLE = (2, 10)
+CATALOGUES_PAR_PRODUIT = (0, 3)
+
+# Fichiers de démonstration partagés entre les lignes générées
+NOMBRE_IMAGES = 12
+NOMBRE_PDF = 8
+DOSSIER_SEED = 'seed'
+
+# Proportion d'éléments actifs, comme en production
+TAUX_ACTIF = 0.9
+
+NOMS_PARTENAIRES = [
+    'Euroimmun', 'Hemex', 'Horiba', 'Optibio', 'Soring', 'Biorad', 'Sysmex',
+    'Stago', 'Diasys', 'Mindray', 'Snibe', 'Werfen', 'Randox', 'Spinreact',
+]
+
+# (français, anglais, arabe)
+DOMAINES = [
+    ('Hématologie', 'Hematology', 'أمراض الدم'),
+    ('Biochimie', 'Biochemistry', 'الكيمياء الحيوية'),
+    ('Immunologie', 'Immunology', 'علم المناعة'),
+    ('Microbiologie', 'Microbiology', 'علم الأحياء الدقيقة'),
+    ('Hémostase', 'Hemostasis', 'تخثر الدم'),
+    ('Sérologie', 'Serology', 'علم الأمصال'),
+    ('Biologie moléculaire', 'Molecular biology', 'البيولوجيا الجزيئية'),
+    ('Gazométrie', 'Blood gas analysis', 'تحليل غازات الدم'),
+    ('Analyse urinaire', 'Urinalysis', 'تحليل البول'),
+    ('Consommables de laboratoire', 'Laboratory consumables', 'مستهلكات المختبر'),
+]
+
+TYPES_SOUS_FAMILLE = [
+    ('Automates', 'Analyzers', 'أجهزة التحليل الآلي'),
+    ('Réactifs', 'Reagents', 'الكواشف'),
+    ('Contrôles de qualité', 'Quality controls', 'ضوابط الجودة'),
+    ('Calibrateurs', 'Calibrators', 'المعايرات'),
+    ('Accessoires', 'Accessories', 'الملحقات'),
+    ('Tests rapides', 'Rapid tests', 'الاختبارات السريعة'),
+]
+
+MODELES_PRODUIT = ['Analyseur', 'Kit', 'Coffret', 'Contrôle', 'Calibrateur', 'Module', 'Cartouche']
+
+DESCRIPTION_FR = (
+    "Solution de diagnostic in vitro destinée aux laboratoires d'analyses médicales. "
+    "Haute cadence, traçabilité complète et maintenance simplifiée."
+)
+DESCRIPTION_EN = (
+    "In vitro diagnostic solution for clinical laboratories. "
+    "High throughput, full traceability and simplified maintenance."
+)
+DESCRIPTION_AR = "حل للتشخيص المخبري موجه لمخابر التحاليل الطبية، بإنتاجية عالية وتتبع كامل وصيانة مبسطة."
+
+
+def _pdf_minimal(titre):
+    """Construit un PDF valide d'une page, sans dépendance externe"""
+    contenu = b"BT /F1 24 Tf 72 720 Td (" + titre.encode('ascii', 'replace') + b") Tj ET"
+    objets = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Contents 4 0 R "
+        b"/Resources << /Font << /F1 5 0 R >> >> >>",
+        b"<< /Length %d >>\nstream\n" % len(contenu) + contenu + b"\nendstream",
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    sortie = bytearray(b"%PDF-1.4\n")
+    positions = []
+    for numero, objet in enumerate(objets, start=1):
+        positions.append(len(sortie))
+        sortie += b"%d 0 obj\n" % numero + objet + b"\nendobj\n"
+    debut_xref = len(sortie)
+    sortie += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objets) + 1)
+    for position in positions:
+        sortie += b"%010d 00000 n \n" % position
+    sortie += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objets) + 1, debut_xref)
+    return bytes(sortie)
+
+
+def _image_placeholder(index, taille=(240, 240)):
+    """Construit une image PNG unie numérotée"""
+    teinte = (index * 47) % 255
+    image = Image.new('RGB', taille, (teinte, 120, 255 - teinte))
+    ImageDraw.Draw(image).text((taille[0] // 2 - 10, taille[1] // 2 - 6), f'#{index}', fill=(255, 255, 255))
+    tampon = io.BytesIO()
+    image.save(tampon, format='PNG')
+    return tampon.getvalue()
+
+
+def _enregistrer(chemin, contenu):
+    """Enregistre un fichier dans le stockage média s'il n'existe pas déjà"""
+    if not default_storage.exists(chemin):
+        default_storage.save(chemin, ContentFile(contenu))
+    return chemin
+
+
+class Command(BaseCommand):
+    help = "Génère un catalogue synthétique (partenaires, familles, produits, catalogues PDF) à une échelle donnée"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scale', type=int, default=1, help="Facteur d'échelle (1 ≈ 8 partenaires, 24 familles)")
+        parser.add_argument('--seed', type=int, default=None, help="Graine aléatoire pour un catalogue reproductible")
+        parser.add_argument('--clear', action='store_true', help="Supprime le catalogue existant avant la génération")
+        parser.add_argument('--force', action='store_true', help="Autorise --clear lorsque DEBUG=False")
+
+    def handle(self, *args, **options):
+        echelle = options['scale']
+        if echelle < 1:
+            raise CommandError("--scale doit être supérieur ou égal à 1.")
+        if options['clear'] and not settings.DEBUG and not options['force']:
+            raise CommandError("--clear est refusé lorsque DEBUG=False (utilisez --force si vous êtes sûr).")
+
+        self.alea = random.Random(options['seed'])
+
+        logos = [
+            _enregistrer(f'partenaires/logos/{DOSSIER_SEED}/logo-{i:02d}.png', _image_placeholder(i, (120, 120)))
+            for i in range(NOMBRE_IMAGES)
+        ]
+        images = [
+            _enregistrer(f'produits_fournisseur/images/{DOSSIER_SEED}/produit-{i:02d}.png', _image_placeholder(i))
+            for i in range(NOMBRE_IMAGES)
+        ]
+        couvertures = [
+            _enregistrer(f'produits/couvertures/{DOSSIER_SEED}/couverture-{i:02d}.png', _image_placeholder(i, (480, 320)))
+            for i in range(NOMBRE_IMAGES)
+        ]
+        pdfs = [
+            _enregistrer(f'catalogues/pdf/{DOSSIER_SEED}/catalogue-{i:02d}.pdf', _pdf_minimal(f'Catalogue {i}'))
+            for i in range(NOMBRE_PDF)
+        ]
+
+        with transaction.atomic():
+            if options['clear']:
+                Produit.objects.all().delete()
+                Partenaire.objects.all().delete()
+                Famille.objects.all().delete()
+
+            partenaires = self._creer_partenaires(PARTENAIRES_PAR_ECHELLE * echelle, logos)
+            familles = self._creer_familles(FAMILLES_PAR_ECHELLE * echelle, partenaires)
+            sous_familles = self._creer_sous_familles(familles)
+            produits_fournisseur = self._creer_produits_fournisseur(sous_familles, images)
+            catalogues = self._creer_catalogues(produits_fournisseur, pdfs)
+            produits = self._creer_produits(PRODUITS_PAR_ECHELLE * echelle, partenaires, couvertures)
+
+            # bulk_create n'envoie pas de signaux
+            for objets in (partenaires, familles, sous_familles, produits_fournisseur, catalogues, produits):
+                if objets:
+                    notifier_modification(type(objets[0]), [objet.pk for objet in objets], CREATION)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Catalogue généré (échelle {echelle}) : {len(partenaires)} partenaires, {len(familles)} familles, "
+            f"{len(sous_familles)} sous-familles, {len(produits_fournisseur)} produits fournisseur, "
+            f"{len(catalogues)} catalogues, {len(produits)} produits."
+        ))
+
+    def _actif(self):
+        return self.alea.random() < TAUX_ACTIF
+
+    def _titres(self, triplet, suffixe=''):
+        """Retourne les titres fr/en/ar, avec parfois des traductions manquantes"""
+        titre_fr, titre_en, titre_ar = triplet
+        return {
+            'titre_fr': f'{titre_fr}{suffixe}',
+            'titre_en': f'{titre_en}{suffixe}' if self.alea.random() < 0.85 else '',
+            'titre_ar': f'{titre_ar}{suffixe}' if self.alea.random() < 0.7 else '',
+        }
+
+    def _creer_partenaires(self, nombre, logos):
+        partenaires = []
+        for i in range(nombre):
+            nom = NOMS_PARTENAIRES[i % len(NOMS_PARTENAIRES)]
+            if i >= len(NOMS_PARTENAIRES):
+                nom = f'{nom} {i // len(NOMS_PARTENAIRES) + 1}'
+            partenaires.append(Partenaire(
+                nom=nom,
+                logo=self.alea.choice(logos),
+                url_site_web=f'https://www.{nom.lower().replace(" ", "-")}.example.com',
+                actif=self._actif(),
+            ))
+        return Partenaire.objects.bulk_create(partenaires)
+
+    def _creer_familles(self, nombre, partenaires):
+        familles = Famille.objects.bulk_create([
+            Famille(
+                actif=self._actif(),
+                ordre=self.alea.randint(0, 20),
+                **self._titres(self.alea.choice(DOMAINES), f' {i + 1}' if i >= len(DOMAINES) else ''),
+            )
+            for i in range(nombre)
+        ])
+        # La plupart des familles n'appartiennent qu'à un partenaire, quelques-unes sont partagées
+        liens = []
+        for famille in familles:
+            for partenaire in self.alea.sample(partenaires, k=min(len(partenaires), self.alea.choice((1, 1, 1, 2)))):
+                liens.append(Famille.partenaires.through(famille_id=famille.id, partenaire_id=partenaire.id))
+        Famille.partenaires.through.objects.bulk_create(liens)
+        return familles
+
+    def _creer_sous_familles(self, familles):
+        sous_familles = []
+        for famille in familles:
+            for j in range(self.alea.randint(*SOUS_FAMILLES_PAR_FAMILLE)):
+                sous_familles.append(SousFamille(
+                    famille=famille,
+                    actif=self._actif(),
+                    ordre=j,
+                    **self._titres(TYPES_SOUS_FAMILLE[j % len(TYPES_SOUS_FAMILLE)]),
+                ))
+        return SousFamille.objects.bulk_create(sous_familles, batch_size=1000)
+
+    def _creer_produits_fournisseur(self, sous_familles, images):
+        produits = []
+        for sous_famille in sous_familles:
+            for j in range(self.alea.randint(*PRODUITS_PAR_SOUS_FAMILLE)):
+                produits.append(ProduitFournisseur(
+                    sous_famille=sous_famille,
+                    nom=f'{self.alea.choice(MODELES_PRODUIT)} {sous_famille.titre_fr[:3].upper()}-{self.alea.randint(100, 9999)}',
+                    image=self.alea.choice(images) if self.alea.random() < 0.9 else None,
+                    actif=self._actif(),
+                    ordre=j,
+                ))
+        return ProduitFournisseur.objects.bulk_create(produits, batch_size=1000)
+
+    def _creer_catalogues(self, produits_fournisseur, pdfs):
+        catalogues = []
+        for produit in produits_fournisseur:
+            for j in range(self.alea.randint(*CATALOGUES_PAR_PRODUIT)):
+                catalogues.append(Catalogue(
+                    produit_fournisseur=produit,
+                    nom=f'Fiche technique {produit.nom}' if self.alea.random() < 0.8 else None,
+                    fichier_pdf=self.alea.choice(pdfs),
+                    actif=self._actif(),
+                    ordre=j,
+                ))
+        return Catalogue.objects.bulk_create(catalogues, batch_size=1000)
+
+    def _creer_produits(self, nombre, partenaires, couvertures):
+        produits = Produit.objects.bulk_create([
+            Produit(
+                titre_fr=f'{self.alea.choice(MODELES_PRODUIT)} {self.alea.choice(DOMAINES)[0]} {i + 1}',
+                titre_en=f'{self.alea.choice(DOMAINES)[1]} product {i + 1}' if self.alea.random() < 0.85 else '',
+                titre_ar=f'{self.alea.choice(DOMAINES)[2]} {i + 1}' if self.alea.random() < 0.7 else '',
+                description_fr=DESCRIPTION_FR,
+                description_en=DESCRIPTION_EN if self.alea.random() < 0.85 else '',
+                description_ar=DESCRIPTION_AR if self.alea.random() < 0.7 else '',
+                image_couverture=self.alea.choice(couvertures),
+                actif=self._actif(),
+                ordre=self.alea.randint(0, 50),
+            )
+            for i in range(nombre)
+        ], batch_size=1000)
+        liens = []
+        for produit in produits:
+            for partenaire in self.alea.sample(partenaires, k=min(len(partenaires), self.alea.randint(1, 3))):
+                liens.append(Produit.partenaires.through(produit_id=produit.id, partenaire_id=partenaire.id))
+        Produit.partenaires.through.objects.bulk_create(liens, batch_size=1000)
+        return produits
@@ -0,0 +1,30 @@
+# Generated by Django 5.0.1 on 2026-10-19 09:00
+
+import partenaire.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('partenaire', '0005_catalogue'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChangementCatalogue',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('transaction', models.BigIntegerField(db_default=partenaire.models.TransactionCourante(), verbose_name='Transaction')),
+                ('modele', models.CharField(max_length=50, verbose_name='Modèle')),
+                ('objet_id', models.BigIntegerField(verbose_name="Identifiant de l'objet")),
+                ('operation', models.CharField(choices=[('creation', 'Création'), ('modification', 'Modification'), ('suppression', 'Suppression')], max_length=20, verbose_name='Opération')),
+                ('date', models.DateTimeField(auto_now_add=True, verbose_name='Date')),
+            ],
+            options={
+                'verbose_name': 'Changement du catalogue',
+                'verbose_name_plural': 'Changements du catalogue',
+                'indexes': [models.Index(fields=['transaction', 'id'], name='changement_curseur_idx'), models.Index(fields=['date'], name='changement_date_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.0.1 on 2026-10-19 10:00
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY ne peut pas s'exécuter dans une transaction
+    atomic = False
+
+    dependencies = [
+        ('partenaire', '0006_changementcatalogue'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='partenaire',
+            index=models.Index(condition=models.Q(('actif', True)), fields=['nom'], include=('id',), name='partenaire_actif_nom_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='famille',
+            index=models.Index(condition=models.Q(('actif', True)), fields=['ordre', 'titre_fr'], include=('id',), name='famille_actif_ordre_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='sousfamille',
+            index=models.Index(condition=models.Q(('actif', True)), fields=['famille', 'ordre', 'titre_fr'], include=('id',), name='sousfamille_actif_ordre_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='produitfournisseur',
+            index=models.Index(condition=models.Q(('actif', True)), fields=['sous_famille', 'ordre', 'nom'], include=('id',), name='produitfourn_actif_ordre_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='catalogue',
+            index=models.Index(condition=models.Q(('actif', True)), fields=['produit_fournisseur', 'ordre', 'nom'], include=('id',), name='catalogue_actif_ordre_idx'),
+        ),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 5.0.1 on 2026-10-19 11:00
+
+import django.contrib.postgres.indexes
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('partenaire', '0007_index_partiels_actifs'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LigneCatalogue',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nom', models.CharField(max_length=200)),
+                ('image', models.CharField(blank=True, max_length=255)),
+                ('partenaire_nom', models.CharField(blank=True, max_length=200)),
+                ('famille_titre_fr', models.CharField(max_length=200)),
+                ('famille_titre_en', models.CharField(blank=True, max_length=200)),
+                ('famille_titre_ar', models.CharField(blank=True, max_length=200)),
+                ('sous_famille_titre_fr', models.CharField(max_length=200)),
+                ('sous_famille_titre_en', models.CharField(blank=True, max_length=200)),
+                ('sous_famille_titre_ar', models.CharField(blank=True, max_length=200)),
+                ('famille_ordre', models.IntegerField()),
+                ('sous_famille_ordre', models.IntegerField()),
+                ('ordre', models.IntegerField()),
+                ('date_creation', models.DateTimeField()),
+                ('date_modification', models.DateTimeField()),
+                ('principal', models.BooleanField()),
+                ('visible', models.BooleanField()),
+                ('catalogues', models.JSONField(default=list)),
+                ('famille', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='partenaire.famille', verbose_name='Famille')),
+                ('partenaire', models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='partenaire.partenaire', verbose_name='Partenaire')),
+                ('produit_fournisseur', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='lignes', to='partenaire.produitfournisseur', verbose_name='Produit Fournisseur')),
+                ('sous_famille', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='partenaire.sousfamille', verbose_name='Sous-famille')),
+            ],
+            options={
+                'verbose_name': 'Ligne du catalogue',
+                'verbose_name_plural': 'Lignes du catalogue',
+                'indexes': [
+                    models.Index(condition=models.Q(('principal', True), ('visible', True)), fields=['famille_ordre', 'famille_titre_fr', 'famille', 'sous_famille_ordre', 'sous_famille_titre_fr', 'sous_famille', 'ordre', 'nom', 'produit_fournisseur'], name='lignecat_ordre_idx'),
+                    models.Index(condition=models.Q(('visible', True)), fields=['partenaire', 'famille_ordre', 'famille_titre_fr', 'famille', 'sous_famille_ordre', 'sous_famille_titre_fr', 'sous_famille', 'ordre', 'nom', 'produit_fournisseur'], name='lignecat_partenaire_ordre_idx'),
+                    models.Index(condition=models.Q(('principal', True), ('visible', True)), fields=['famille', 'sous_famille_ordre', 'sous_famille_titre_fr', 'sous_famille', 'ordre', 'nom', 'produit_fournisseur'], name='lignecat_famille_ordre_idx'),
+                    models.Index(condition=models.Q(('principal', True), ('visible', True)), fields=['sous_famille', 'ordre', 'nom', 'produit_fournisseur'], name='lignecat_sousfamille_ordre_idx'),
+                    models.Index(condition=models.Q(('principal', True), ('visible', True)), fields=['nom', 'produit_fournisseur'], name='lignecat_nom_idx'),
+                    models.Index(condition=models.Q(('visible', True)), fields=['partenaire', 'nom', 'produit_fournisseur'], name='lignecat_partenaire_nom_idx'),
+                    models.Index(condition=models.Q(('principal', True), ('visible', True)), fields=['famille', 'nom', 'produit_fournisseur'], name='lignecat_famille_nom_idx'),
+                    models.Index(condition=models.Q(('principal', True), ('visible', True)), fields=['sous_famille', 'nom', 'produit_fournisseur'], name='lignecat_sousfamille_nom_idx'),
+                    django.contrib.postgres.indexes.GinIndex(fields=['catalogues'], name='lignecat_catalogues_idx', opclasses=['jsonb_path_ops']),
+                ],
+                'constraints': [models.UniqueConstraint(fields=('produit_fournisseur', 'partenaire'), name='lignecatalogue_unique', nulls_distinct=False)],
+            },
+        ),
+    ]
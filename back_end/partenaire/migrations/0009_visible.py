@@ -0,0 +1,59 @@
+# Generated by Django 5.0.1 on 2026-10-19 12:00
+
+from django.db import migrations, models
+
+
+# Calcul initial, du partenaire au catalogue (ensuite maintenu par partenaire/visibilite.py)
+CALCUL_VISIBILITE = """
+    UPDATE partenaire_partenaire SET visible = actif;
+    UPDATE partenaire_famille f SET visible = f.actif AND (
+        NOT EXISTS (SELECT 1 FROM partenaire_famille_partenaires fp WHERE fp.famille_id = f.id)
+        OR EXISTS (
+            SELECT 1 FROM partenaire_famille_partenaires fp
+            JOIN partenaire_partenaire p ON p.id = fp.partenaire_id
+            WHERE fp.famille_id = f.id AND p.actif
+        )
+    );
+    UPDATE partenaire_sousfamille e SET visible = e.actif AND parent.visible
+    FROM partenaire_famille parent WHERE parent.id = e.famille_id;
+    UPDATE partenaire_produitfournisseur e SET visible = e.actif AND parent.visible
+    FROM partenaire_sousfamille parent WHERE parent.id = e.sous_famille_id;
+    UPDATE partenaire_catalogue e SET visible = e.actif AND parent.visible
+    FROM partenaire_produitfournisseur parent WHERE parent.id = e.produit_fournisseur_id;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('partenaire', '0008_lignecatalogue'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='partenaire',
+            name='visible',
+            field=models.BooleanField(default=False, editable=False, help_text='Calculé : le partenaire est actif', verbose_name='Visible'),
+        ),
+        migrations.AddField(
+            model_name='famille',
+            name='visible',
+            field=models.BooleanField(default=False, editable=False, help_text="Calculé : la famille est active et n'a aucun partenaire, ou au moins un partenaire actif", verbose_name='Visible'),
+        ),
+        migrations.AddField(
+            model_name='sousfamille',
+            name='visible',
+            field=models.BooleanField(default=False, editable=False, help_text='Calculé : la sous-famille et sa famille sont visibles', verbose_name='Visible'),
+        ),
+        migrations.AddField(
+            model_name='produitfournisseur',
+            name='visible',
+            field=models.BooleanField(default=False, editable=False, help_text='Calculé : le produit et sa sous-famille sont visibles', verbose_name='Visible'),
+        ),
+        migrations.AddField(
+            model_name='catalogue',
+            name='visible',
+            field=models.BooleanField(default=False, editable=False, help_text='Calculé : le catalogue et son produit fournisseur sont visibles', verbose_name='Visible'),
+        ),
+        migrations.RunSQL(CALCUL_VISIBILITE, migrations.RunSQL.noop),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 5.0.1 on 2026-10-19 12:01
+
+from django.contrib.postgres.operations import AddIndexConcurrently, RemoveIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # Index partiels WHERE visible, qui remplacent les index WHERE actif de 0007.
+    # CREATE/DROP INDEX CONCURRENTLY ne peuvent pas s'exécuter dans une transaction
+    atomic = False
+
+    dependencies = [
+        ('partenaire', '0009_visible'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='partenaire',
+            index=models.Index(condition=models.Q(('visible', True)), fields=['nom'], include=('id',), name='partenaire_visible_nom_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='famille',
+            index=models.Index(condition=models.Q(('visible', True)), fields=['ordre', 'titre_fr'], include=('id',), name='famille_visible_ordre_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='sousfamille',
+            index=models.Index(condition=models.Q(('visible', True)), fields=['famille', 'ordre', 'titre_fr'], include=('id',), name='sousfamille_visible_ordre_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='produitfournisseur',
+            index=models.Index(condition=models.Q(('visible', True)), fields=['sous_famille', 'ordre', 'nom'], include=('id',), name='produitfourn_visible_ordre_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='catalogue',
+            index=models.Index(condition=models.Q(('visible', True)), fields=['produit_fournisseur', 'ordre', 'nom'], include=('id',), name='catalogue_visible_ordre_idx'),
+        ),
+        RemoveIndexConcurrently(
+            model_name='partenaire',
+            name='partenaire_actif_nom_idx',
+        ),
+        RemoveIndexConcurrently(
+            model_name='famille',
+            name='famille_actif_ordre_idx',
+        ),
+        RemoveIndexConcurrently(
+            model_name='sousfamille',
+            name='sousfamille_actif_ordre_idx',
+        ),
+        RemoveIndexConcurrently(
+            model_name='produitfournisseur',
+            name='produitfourn_actif_ordre_idx',
+        ),
+        RemoveIndexConcurrently(
+            model_name='catalogue',
+            name='catalogue_actif_ordre_idx',
+        ),
+    ]
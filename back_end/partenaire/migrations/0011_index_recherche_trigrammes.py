@@ -0,0 +1,57 @@
+# Generated by Django 5.0.1 on 2026-10-19 14:20
+
+import django.contrib.postgres.indexes
+import django.db.models.functions.comparison
+import django.db.models.functions.text
+from django.contrib.postgres.operations import AddIndexConcurrently, TrigramExtension
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY ne peut pas s'exécuter dans une transaction
+    atomic = False
+
+    dependencies = [
+        ('partenaire', '0010_index_partiels_visibles'),
+    ]
+
+    operations = [
+        # pg_trgm : extension « trusted », créable par le propriétaire de la base
+        TrigramExtension(),
+        AddIndexConcurrently(
+            model_name='partenaire',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper(django.db.models.functions.comparison.Cast('nom', models.TextField())), name='gin_trgm_ops'), name='partenaire_nom_trgm_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='partenaire',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper(django.db.models.functions.comparison.Cast('url_site_web', models.TextField())), name='gin_trgm_ops'), name='partenaire_url_trgm_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='famille',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper(django.db.models.functions.comparison.Cast('titre_fr', models.TextField())), name='gin_trgm_ops'), name='famille_titre_fr_trgm_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='famille',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper(django.db.models.functions.comparison.Cast('titre_en', models.TextField())), name='gin_trgm_ops'), name='famille_titre_en_trgm_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='famille',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper(django.db.models.functions.comparison.Cast('titre_ar', models.TextField())), name='gin_trgm_ops'), name='famille_titre_ar_trgm_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='sousfamille',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper(django.db.models.functions.comparison.Cast('titre_fr', models.TextField())), name='gin_trgm_ops'), name='sousfamille_titre_fr_trgm_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='sousfamille',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper(django.db.models.functions.comparison.Cast('titre_en', models.TextField())), name='gin_trgm_ops'), name='sousfamille_titre_en_trgm_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='sousfamille',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper(django.db.models.functions.comparison.Cast('titre_ar', models.TextField())), name='gin_trgm_ops'), name='sousfamille_titre_ar_trgm_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='produitfournisseur',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper(django.db.models.functions.comparison.Cast('nom', models.TextField())), name='gin_trgm_ops'), name='produitfourn_nom_trgm_idx'),
+        ),
+    ]
@@ -1,9 +1,19 @@
+from django.contrib.postgres.indexes import GinIndex, OpClass
 from django.db import models
+from django.db.models.functions import Cast, Upper
 from django.core.validators import URLValidator
 from django.urls import reverse
 from django.core.exceptions import ValidationError
 
 
+def index_recherche(champ, nom):
+    """
+    Index trigrammes des recherches de l'admin (search_fields, autocomplétion) :
+    Django traduit `icontains` en UPPER(champ::text) LIKE UPPER('%terme%')
+    """
+    return GinIndex(OpClass(Upper(Cast(champ, models.TextField())), name='gin_trgm_ops'), name=nom)
+
+
 def validate_pdf_file(value):
     """Valide que le fichier est bien un PDF"""
     if not value.name.lower().endswith('.pdf'):
@@ -43,6 +53,13 @@ class Partenaire(models.Model):
         verbose_name="Actif",
         help_text="Désignez si ce partenaire est actif ou non"
     )
+    # Maintenu par visibilite.py à chaque écriture du catalogue
+    visible = models.BooleanField(
+        default=False,
+        editable=False,
+        verbose_name="Visible",
+        help_text="Calculé : le partenaire est actif"
+    )
 
     class Meta:
         verbose_name = "Partenaire"
@@ -51,6 +68,10 @@ class Partenaire(models.Model):
         indexes = [
             models.Index(fields=['nom']),
             models.Index(fields=['actif']),
+            # Lectures publiques : WHERE visible (l'objet et tous ses ancêtres actifs) ORDER BY nom
+            models.Index(fields=['nom'], include=['id'], condition=models.Q(visible=True), name='partenaire_visible_nom_idx'),
+            index_recherche('nom', 'partenaire_nom_trgm_idx'),
+            index_recherche('url_site_web', 'partenaire_url_trgm_idx'),
         ]
 
     def __str__(self):
@@ -111,6 +132,13 @@ class Famille(models.Model):
         verbose_name="Actif",
         help_text="Désignez si cette famille est active ou non"
     )
+    # Maintenu par visibilite.py à chaque écriture du catalogue
+    visible = models.BooleanField(
+        default=False,
+        editable=False,
+        verbose_name="Visible",
+        help_text="Calculé : la famille est active et n'a aucun partenaire, ou au moins un partenaire actif"
+    )
     
     # Ordre d'affichage
     ordre = models.IntegerField(
@@ -126,6 +154,11 @@ class Famille(models.Model):
         indexes = [
             models.Index(fields=['ordre', 'actif']),
             models.Index(fields=['titre_fr']),
+            # Lectures publiques : WHERE visible ORDER BY ordre, titre_fr
+            models.Index(fields=['ordre', 'titre_fr'], include=['id'], condition=models.Q(visible=True), name='famille_visible_ordre_idx'),
+            index_recherche('titre_fr', 'famille_titre_fr_trgm_idx'),
+            index_recherche('titre_en', 'famille_titre_en_trgm_idx'),
+            index_recherche('titre_ar', 'famille_titre_ar_trgm_idx'),
         ]
 
     def __str__(self):
@@ -181,6 +214,13 @@ class SousFamille(models.Model):
         verbose_name="Actif",
         help_text="Désignez si cette sous-famille est active ou non"
     )
+    # Maintenu par visibilite.py à chaque écriture du catalogue
+    visible = models.BooleanField(
+        default=False,
+        editable=False,
+        verbose_name="Visible",
+        help_text="Calculé : la sous-famille et sa famille sont visibles"
+    )
     
     # Ordre d'affichage
     ordre = models.IntegerField(
@@ -196,6 +236,11 @@ class SousFamille(models.Model):
         indexes = [
             models.Index(fields=['famille', 'ordre', 'actif']),
             models.Index(fields=['titre_fr']),
+            # Prefetch des sous-familles visibles : WHERE famille_id IN (...) AND visible ORDER BY ordre, titre_fr
+            models.Index(fields=['famille', 'ordre', 'titre_fr'], include=['id'], condition=models.Q(visible=True), name='sousfamille_visible_ordre_idx'),
+            index_recherche('titre_fr', 'sousfamille_titre_fr_trgm_idx'),
+            index_recherche('titre_en', 'sousfamille_titre_en_trgm_idx'),
+            index_recherche('titre_ar', 'sousfamille_titre_ar_trgm_idx'),
         ]
 
     def __str__(self):
@@ -244,6 +289,13 @@ class ProduitFournisseur(models.Model):
         verbose_name="Actif",
         help_text="Désignez si ce produit est actif ou non"
     )
+    # Maintenu par visibilite.py à chaque écriture du catalogue
+    visible = models.BooleanField(
+        default=False,
+        editable=False,
+        verbose_name="Visible",
+        help_text="Calculé : le produit et sa sous-famille sont visibles"
+    )
     
     # Ordre d'affichage
     ordre = models.IntegerField(
@@ -259,6 +311,10 @@ class ProduitFournisseur(models.Model):
         indexes = [
             models.Index(fields=['sous_famille', 'ordre', 'actif']),
             models.Index(fields=['nom']),
+            # Prefetch des produits visibles : WHERE sous_famille_id IN (...) AND visible ORDER BY ordre, nom
+            # (id inclus : comptage par sous-famille en parcours d'index seul)
+            models.Index(fields=['sous_famille', 'ordre', 'nom'], include=['id'], condition=models.Q(visible=True), name='produitfourn_visible_ordre_idx'),
+            index_recherche('nom', 'produitfourn_nom_trgm_idx'),
         ]
 
     def __str__(self):
@@ -308,6 +364,13 @@ class Catalogue(models.Model):
         verbose_name="Actif",
         help_text="Désignez si ce catalogue est actif ou non"
     )
+    # Maintenu par visibilite.py à chaque écriture du catalogue
+    visible = models.BooleanField(
+        default=False,
+        editable=False,
+        verbose_name="Visible",
+        help_text="Calculé : le catalogue et son produit fournisseur sont visibles"
+    )
     
     # Ordre d'affichage
     ordre = models.IntegerField(
@@ -323,7 +386,157 @@ class Catalogue(models.Model):
         indexes = [
             models.Index(fields=['produit_fournisseur', 'ordre', 'actif']),
             models.Index(fields=['nom']),
+            # Prefetch des catalogues visibles : WHERE produit_fournisseur_id IN (...) AND visible ORDER BY ordre, nom
+            models.Index(fields=['produit_fournisseur', 'ordre', 'nom'], include=['id'], condition=models.Q(visible=True), name='catalogue_visible_ordre_idx'),
         ]
 
     def __str__(self):
         return self.nom if self.nom else f"Catalogue {self.id}"
+
+
+class TransactionCourante(models.Func):
+    """Identifiant de la transaction PostgreSQL courante"""
+    template = 'txid_current()'
+    output_field = models.BigIntegerField()
+
+
+class ChangementCatalogue(models.Model):
+    """
+    Journal des créations, modifications et suppressions du catalogue (six modèles),
+    lu par le flux /api/changes/. Les lignes sont écrites dans la transaction de la
+    modification (voir signals.py) et purgées après CHANGEMENTS_RETENTION_JOURS.
+    """
+    OPERATIONS = [
+        ('creation', 'Création'),
+        ('modification', 'Modification'),
+        ('suppression', 'Suppression'),
+    ]
+
+    # Le curseur du flux est (transaction, id) : l'ordre des identifiants de transaction,
+    # contrairement à celui des id, garantit qu'aucune ligne validée plus tard n'est sautée
+    transaction = models.BigIntegerField(
+        db_default=TransactionCourante(),
+        verbose_name="Transaction"
+    )
+    modele = models.CharField(
+        max_length=50,
+        verbose_name="Modèle"
+    )
+    objet_id = models.BigIntegerField(
+        verbose_name="Identifiant de l'objet"
+    )
+    operation = models.CharField(
+        max_length=20,
+        choices=OPERATIONS,
+        verbose_name="Opération"
+    )
+    date = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name="Date"
+    )
+
+    class Meta:
+        verbose_name = "Changement du catalogue"
+        verbose_name_plural = "Changements du catalogue"
+        indexes = [
+            models.Index(fields=['transaction', 'id'], name='changement_curseur_idx'),
+            models.Index(fields=['date'], name='changement_date_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.operation} {self.modele} {self.objet_id}"
+
+
+class LigneCatalogue(models.Model):
+    """
+    Modèle de lecture dénormalisé : une ligne par produit fournisseur et par partenaire
+    de sa famille (une seule ligne, sans partenaire, si la famille n'en a aucun), avec
+    les identifiants et titres des ancêtres, les clés de tri et les catalogues actifs.
+    Maintenu dans la transaction de chaque écriture du catalogue (voir lignes.py),
+    reconstruit par `manage.py rebuild_catalog_lines`.
+    """
+    produit_fournisseur = models.ForeignKey(
+        ProduitFournisseur,
+        on_delete=models.CASCADE,
+        related_name='lignes',
+        verbose_name="Produit Fournisseur"
+    )
+    partenaire = models.ForeignKey(
+        Partenaire,
+        on_delete=models.CASCADE,
+        related_name='+',
+        null=True,
+        verbose_name="Partenaire"
+    )
+    famille = models.ForeignKey(
+        Famille,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name="Famille"
+    )
+    sous_famille = models.ForeignKey(
+        SousFamille,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name="Sous-famille"
+    )
+
+    # Colonnes recopiées du produit fournisseur et de ses ancêtres
+    nom = models.CharField(max_length=200)
+    image = models.CharField(max_length=255, blank=True)
+    partenaire_nom = models.CharField(max_length=200, blank=True)
+    famille_titre_fr = models.CharField(max_length=200)
+    famille_titre_en = models.CharField(max_length=200, blank=True)
+    famille_titre_ar = models.CharField(max_length=200, blank=True)
+    sous_famille_titre_fr = models.CharField(max_length=200)
+    sous_famille_titre_en = models.CharField(max_length=200, blank=True)
+    sous_famille_titre_ar = models.CharField(max_length=200, blank=True)
+    famille_ordre = models.IntegerField()
+    sous_famille_ordre = models.IntegerField()
+    ordre = models.IntegerField()
+    date_creation = models.DateTimeField()
+    date_modification = models.DateTimeField()
+
+    # Ligne représentant le produit hors filtre par partenaire (une par produit)
+    principal = models.BooleanField()
+    # Produit, sous-famille, famille et partenaire (s'il y en a un) tous actifs
+    visible = models.BooleanField()
+    # Catalogues actifs, dans l'ordre d'affichage, sous la forme de CatalogueSerializer
+    catalogues = models.JSONField(default=list)
+
+    class Meta:
+        verbose_name = "Ligne du catalogue"
+        verbose_name_plural = "Lignes du catalogue"
+        constraints = [
+            models.UniqueConstraint(
+                fields=['produit_fournisseur', 'partenaire'], nulls_distinct=False, name='lignecatalogue_unique'
+            ),
+        ]
+        # Une liste filtrée et triée = un seul parcours d'index (voir lignes.ORDRES)
+        indexes = [
+            models.Index(
+                fields=['famille_ordre', 'famille_titre_fr', 'famille', 'sous_famille_ordre', 'sous_famille_titre_fr', 'sous_famille', 'ordre', 'nom', 'produit_fournisseur'],
+                condition=models.Q(visible=True, principal=True), name='lignecat_ordre_idx',
+            ),
+            models.Index(
+                fields=['partenaire', 'famille_ordre', 'famille_titre_fr', 'famille', 'sous_famille_ordre', 'sous_famille_titre_fr', 'sous_famille', 'ordre', 'nom', 'produit_fournisseur'],
+                condition=models.Q(visible=True), name='lignecat_partenaire_ordre_idx',
+            ),
+            models.Index(
+                fields=['famille', 'sous_famille_ordre', 'sous_famille_titre_fr', 'sous_famille', 'ordre', 'nom', 'produit_fournisseur'],
+                condition=models.Q(visible=True, principal=True), name='lignecat_famille_ordre_idx',
+            ),
+            models.Index(
+                fields=['sous_famille', 'ordre', 'nom', 'produit_fournisseur'],
+                condition=models.Q(visible=True, principal=True), name='lignecat_sousfamille_ordre_idx',
+            ),
+            models.Index(fields=['nom', 'produit_fournisseur'], condition=models.Q(visible=True, principal=True), name='lignecat_nom_idx'),
+            models.Index(fields=['partenaire', 'nom', 'produit_fournisseur'], condition=models.Q(visible=True), name='lignecat_partenaire_nom_idx'),
+            models.Index(fields=['famille', 'nom', 'produit_fournisseur'], condition=models.Q(visible=True, principal=True), name='lignecat_famille_nom_idx'),
+            models.Index(fields=['sous_famille', 'nom', 'produit_fournisseur'], condition=models.Q(visible=True, principal=True), name='lignecat_sousfamille_nom_idx'),
+            # Lignes à recalculer après la suppression d'un catalogue (catalogues @> [{"id": ...}])
+            GinIndex(fields=['catalogues'], opclasses=['jsonb_path_ops'], name='lignecat_catalogues_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.nom} ({self.partenaire_nom or '-'})"
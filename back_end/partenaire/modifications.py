@@ -0,0 +1,95 @@
+"""
+Regroupement des modifications du catalogue pour les traitements différés.
+
+Les abonnés à `catalogue_modifie` qui publient vers l'extérieur (snapshots statiques,
+notifications de revalidation du frontend) regroupent les modifications pendant un court
+délai, puis les traitent en une fois dans un thread, hors du cycle requête/réponse.
+"""
+import logging
+import threading
+
+from django.db import connections
+
+from produit.models import Produit
+from .models import Famille, SousFamille, ProduitFournisseur, Catalogue, Partenaire
+from .signals import SUPPRESSION
+
+
+logger = logging.getLogger(__name__)
+
+
+class Modifications:
+    """Objets modifiés depuis le dernier traitement, regroupés par modèle"""
+
+    def __init__(self):
+        self.pks = {}
+        self.complet = False
+
+    def ajouter(self, modele, pks, operation):
+        # Une fois la ligne supprimée, les objets qui l'incluaient ne sont plus
+        # retrouvables (relations supprimées en cascade) : tout est à reprendre
+        if operation == SUPPRESSION and modele is not Produit:
+            self.complet = True
+        self.pks.setdefault(modele, set()).update(pks)
+
+    def de(self, modele):
+        return self.pks.get(modele, set())
+
+    def __bool__(self):
+        return self.complet or bool(self.pks)
+
+
+def objets_touches(modifications):
+    """Retourne (ids de partenaires, ids de sous-familles) dont le détail inclut un objet modifié"""
+    partenaires = set(modifications.de(Partenaire))
+    familles = set(modifications.de(Famille))
+    sous_familles = set(modifications.de(SousFamille))
+    sous_familles.update(
+        ProduitFournisseur.objects.filter(pk__in=modifications.de(ProduitFournisseur))
+        .values_list('sous_famille_id', flat=True)
+    )
+    sous_familles.update(
+        Catalogue.objects.filter(pk__in=modifications.de(Catalogue))
+        .values_list('produit_fournisseur__sous_famille_id', flat=True)
+    )
+    # Le détail d'une sous-famille inclut famille_id et partenaire_id
+    sous_familles.update(SousFamille.objects.filter(famille__in=familles).values_list('pk', flat=True))
+    familles.update(SousFamille.objects.filter(pk__in=sous_familles).values_list('famille_id', flat=True))
+    partenaires.update(
+        Famille.partenaires.through.objects.filter(famille_id__in=familles)
+        .values_list('partenaire_id', flat=True)
+    )
+    return partenaires, sous_familles
+
+
+class Regroupeur:
+    """
+    Accumule les modifications reçues et appelle `traitement(modifications)` dans un
+    thread, `delai` secondes après la première modification du lot.
+    """
+
+    def __init__(self, nom, delai, traitement):
+        self.nom = nom
+        self.delai = delai
+        self.traitement = traitement
+        self.attente = Modifications()
+        self.minuteur = None
+        self.verrou = threading.Lock()
+
+    def ajouter(self, modele, pks, operation):
+        with self.verrou:
+            self.attente.ajouter(modele, pks, operation)
+            if self.minuteur is None:
+                self.minuteur = threading.Timer(self.delai, self.traiter)
+                self.minuteur.name = self.nom
+                self.minuteur.start()
+
+    def traiter(self):
+        with self.verrou:
+            modifications, self.attente, self.minuteur = self.attente, Modifications(), None
+        try:
+            self.traitement(modifications)
+        except Exception:
+            logger.exception("Échec du traitement différé %s", self.nom)
+        finally:
+            connections.close_all()
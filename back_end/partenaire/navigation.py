@@ -0,0 +1,90 @@
+"""
+Arbre de navigation léger : partenaires -> familles -> sous-familles visibles (colonne
+`visible`, voir visibilite.py), avec seulement les identifiants, les titres et le nombre
+d'enfants visibles.
+
+L'arbre est calculé par une seule requête d'agrégation (le nombre de produits fournisseur
+visibles par sous-famille), puis mis en cache jusqu'à la prochaine modification du
+catalogue (génération de cache.py). Comme les réponses de cache.py, l'arbre mis en cache
+est calculé sur `default`, et les clients qui viennent d'écrire ne lisent pas le cache.
+"""
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections, router
+
+from config.replicas import lecture_collante
+
+from .cache import generation
+from .langues import LANGUE_PAR_DEFAUT, LANGUES
+from .models import Partenaire, Famille, SousFamille, ProduitFournisseur
+
+DUREE_CACHE = 3600
+
+
+def requete_arbre():
+    """Une ligne par (partenaire, famille, sous-famille) visibles, avec le nombre de produits visibles"""
+    titres = ', '.join(f'{alias}.titre_{code}' for alias in ('f', 's') for code in LANGUES)
+    return f"""
+        SELECT p.id, p.nom, f.id, s.id, COUNT(pf.id), {titres}
+        FROM {Partenaire._meta.db_table} p
+        LEFT JOIN (
+            {Famille.partenaires.through._meta.db_table} fp
+            JOIN {Famille._meta.db_table} f ON f.id = fp.famille_id AND f.visible
+        ) ON fp.partenaire_id = p.id
+        LEFT JOIN {SousFamille._meta.db_table} s ON s.famille_id = f.id AND s.visible
+        LEFT JOIN {ProduitFournisseur._meta.db_table} pf ON pf.sous_famille_id = s.id AND pf.visible
+        WHERE p.visible
+        GROUP BY p.id, f.id, s.id
+        ORDER BY p.nom, p.id, f.ordre, f.titre_fr, f.id, s.ordre, s.titre_fr, s.id
+    """
+
+
+def titres(valeurs, langue):
+    """titre_fr/_en/_ar, ou un seul `titre` (repli sur le français) si une langue est demandée"""
+    par_code = dict(zip(LANGUES, valeurs))
+    if langue is None:
+        return {f'titre_{code}': valeur for code, valeur in par_code.items()}
+    return {'titre': par_code[langue] or par_code[LANGUE_PAR_DEFAUT]}
+
+
+def construire_arbre(langue=None, base=None):
+    with connections[base or router.db_for_read(Partenaire)].cursor() as cursor:
+        cursor.execute(requete_arbre())
+        lignes = cursor.fetchall()
+
+    partenaires = {}
+    familles = {}
+    nombre = len(LANGUES)
+    for p_id, nom, f_id, s_id, nombre_produits, *valeurs in lignes:
+        partenaire = partenaires.get(p_id)
+        if partenaire is None:
+            partenaire = partenaires[p_id] = {'id': p_id, 'nom': nom, 'nombre_familles': 0, 'familles': []}
+        if f_id is None:
+            continue
+        famille = familles.get((p_id, f_id))
+        if famille is None:
+            famille = familles[p_id, f_id] = {
+                'id': f_id, **titres(valeurs[:nombre], langue), 'nombre_sous_familles': 0, 'sous_familles': [],
+            }
+            partenaire['familles'].append(famille)
+            partenaire['nombre_familles'] += 1
+        if s_id is None:
+            continue
+        famille['sous_familles'].append({
+            'id': s_id, **titres(valeurs[nombre:], langue), 'nombre_produits': nombre_produits,
+        })
+        famille['nombre_sous_familles'] += 1
+    return list(partenaires.values())
+
+
+def arbre_navigation(request, langue=None):
+    """Arbre de navigation, depuis le cache tant que le catalogue n'a pas changé"""
+    if lecture_collante(request):
+        return construire_arbre(langue)
+    cle = f'navigation:{langue or "toutes"}'
+    generation_courante = generation()
+    entree = cache.get(cle)
+    if entree is not None and entree['generation'] == generation_courante:
+        return entree['arbre']
+    arbre = construire_arbre(langue, DEFAULT_DB_ALIAS)
+    cache.set(cle, {'generation': generation_courante, 'arbre': arbre}, DUREE_CACHE)
+    return arbre
@@ -0,0 +1,104 @@
+"""
+Querysets de lecture partagés par les vues DRF et les vues asynchrones.
+
+Chaque niveau de la hiérarchie ne précharge que ses enfants visibles (actifs, ainsi que tous
+leurs ancêtres : colonne `visible`, voir visibilite.py), dans l'ordre d'affichage, afin que la
+sérialisation de l'arbre complet ne déclenche aucune requête supplémentaire.
+Le paramètre `langue` projette les titres sur une seule langue (voir langues.py).
+
+Un objet non visible n'a aucun descendant visible. Les listes qui ne demandent que des
+objets non visibles (/api/partenaires/inactifs/, ?actif=false, ?visible=false) préchargent
+donc, avec `filtre=ACTIFS`, un aperçu de l'arbre : les enfants actifs, tels qu'ils seraient
+publiés à la réactivation (voir filtre_enfants).
+"""
+from django.db.models import Count, Prefetch, Q
+from .langues import projeter
+from .models import Partenaire, Famille, SousFamille, ProduitFournisseur, Catalogue
+
+
+# Filtres des enfants préchargés
+VISIBLES = Q(visible=True)
+ACTIFS = Q(actif=True)
+
+
+def filtre_enfants(parametres):
+    """ACTIFS si les paramètres de la requête ne retiennent que des objets non visibles, sinon VISIBLES"""
+    for nom in ('actif', 'visible'):
+        valeur = parametres.get(nom)
+        if valeur is not None and valeur.lower() not in ('true', '1', 'yes'):
+            return ACTIFS
+    return VISIBLES
+
+
+def catalogues_visibles(filtre=VISIBLES):
+    """Catalogues visibles (ou retenus par `filtre`), dans l'ordre d'affichage"""
+    return Catalogue.objects.filter(filtre).order_by('ordre', 'nom')
+
+
+def produits_fournisseur_visibles(filtre=VISIBLES):
+    """Produits fournisseur visibles avec leurs catalogues visibles"""
+    return ProduitFournisseur.objects.filter(filtre).prefetch_related(
+        Prefetch('catalogues', queryset=catalogues_visibles(filtre))
+    ).order_by('ordre', 'nom')
+
+
+def sous_familles_visibles(langue=None, filtre=VISIBLES):
+    """Sous-familles visibles avec leurs produits fournisseur visibles"""
+    return projeter(SousFamille.objects.filter(filtre), langue).prefetch_related(
+        Prefetch('produits_fournisseur', queryset=produits_fournisseur_visibles(filtre))
+    ).order_by('ordre', 'titre_fr')
+
+
+def familles_visibles(langue=None, filtre=VISIBLES):
+    """Familles visibles avec leurs sous-familles visibles"""
+    return familles_avec_arbre(langue, filtre).filter(filtre).order_by('ordre', 'titre_fr')
+
+
+def partenaires_avec_arbre(langue=None, filtre=VISIBLES):
+    """Partenaires avec l'arbre complet de leurs familles visibles"""
+    return Partenaire.objects.prefetch_related(
+        Prefetch('familles', queryset=familles_visibles(langue, filtre))
+    )
+
+
+def familles_avec_arbre(langue=None, filtre=VISIBLES):
+    """Familles avec leurs partenaires et l'arbre de leurs sous-familles visibles"""
+    # Les partenaires sont préchargés pour SousFamilleSerializer.get_partenaire_id
+    return projeter(Famille.objects.all(), langue).prefetch_related(
+        'partenaires',
+        Prefetch('sous_familles', queryset=sous_familles_visibles(langue, filtre))
+    )
+
+
+def sous_familles_avec_produits(langue=None, filtre=VISIBLES):
+    """Sous-familles avec leur famille, ses partenaires et les produits fournisseur visibles"""
+    return projeter(SousFamille.objects.select_related('famille'), langue).prefetch_related(
+        'famille__partenaires',
+        Prefetch('produits_fournisseur', queryset=produits_fournisseur_visibles(filtre))
+    )
+
+
+def produits_fournisseur_avec_catalogues(filtre=VISIBLES):
+    """Produits fournisseur avec leurs catalogues visibles"""
+    return ProduitFournisseur.objects.prefetch_related(
+        Prefetch('catalogues', queryset=catalogues_visibles(filtre))
+    )
+
+
+def familles_du_partenaire(partenaire_id, langue=None):
+    """Familles visibles d'un partenaire, sans leur arbre, avec le nombre de sous-familles visibles"""
+    return projeter(Famille.objects.filter(partenaires=partenaire_id, visible=True), langue).annotate(
+        nombre_sous_familles=Count('sous_familles', filter=Q(sous_familles__visible=True))
+    ).order_by('ordre', 'titre_fr', 'id')
+
+
+def sous_familles_de_la_famille(famille_id, langue=None):
+    """Sous-familles visibles d'une famille, sans leurs produits, avec le nombre de produits visibles"""
+    return projeter(SousFamille.objects.filter(famille_id=famille_id, visible=True), langue).annotate(
+        nombre_produits=Count('produits_fournisseur', filter=Q(produits_fournisseur__visible=True))
+    ).order_by('ordre', 'titre_fr', 'id')
+
+
+def produits_fournisseur_de_la_sous_famille(sous_famille_id):
+    """Produits fournisseur visibles d'une sous-famille avec leurs catalogues visibles"""
+    return produits_fournisseur_visibles().filter(sous_famille_id=sous_famille_id).order_by('ordre', 'nom', 'id')
@@ -0,0 +1,138 @@
+"""
+Notifications de revalidation envoyées au frontend Next.js.
+
+Après une modification du catalogue, les étiquettes (tags) et les chemins de pages
+touchés sont envoyés par POST à REVALIDATION_URL (app/api/revalidate/route.ts), qui
+appelle revalidateTag / revalidatePath. Le frontend peut ainsi garder en cache
+indéfiniment les réponses des chemins couverts par une étiquette ci-dessous autre que
+`catalogue` (voir cacheJusquaRevalidation dans front_end/lib/revalidation.ts).
+
+Les modifications sont regroupées pendant REVALIDATION_DELAI secondes. Chaque envoi est
+signé (HMAC-SHA256 de "<horodatage>.<corps>" avec REVALIDATION_SECRET) et retenté avec
+un délai exponentiel en cas d'erreur réseau ou de réponse 429/5xx.
+
+Étiquettes (à garder en phase avec front_end/lib/revalidation.ts) :
+    catalogue            toutes les réponses du catalogue
+    partenaires          listes de partenaires
+    partenaire:<id>      détail d'un partenaire
+    sous-famille:<id>    détail d'une sous-famille
+    produits             listes de produits
+    produit:<id>         détail d'un produit
+"""
+import hashlib
+import hmac
+import json
+import logging
+import time
+import urllib.error
+import urllib.request
+import uuid
+
+from django.conf import settings
+from django.dispatch import receiver
+
+from produit.models import Produit
+from .modifications import Regroupeur, objets_touches
+from .signals import catalogue_modifie
+
+
+logger = logging.getLogger(__name__)
+
+ENTETE_SIGNATURE = 'X-Revalidation-Signature'
+ENTETE_HORODATAGE = 'X-Revalidation-Timestamp'
+
+# Au-delà, une seule étiquette `catalogue` remplace la liste détaillée
+ETIQUETTES_MAX = 100
+# Écart maximal accepté entre l'horodatage signé et la réception (secondes)
+TOLERANCE_HORODATAGE = 300
+
+
+def etiquettes_et_chemins(modifications):
+    """Étiquettes de cache et chemins de pages du frontend touchés par les modifications"""
+    if modifications.complet:
+        return ['catalogue'], ['/']
+    partenaires, sous_familles = objets_touches(modifications)
+    # Les produits incluent l'arbre complet de leurs partenaires
+    produits = set(modifications.de(Produit))
+    produits.update(
+        Produit.partenaires.through.objects.filter(partenaire_id__in=partenaires)
+        .values_list('produit_id', flat=True)
+    )
+    etiquettes = ['partenaires', 'produits']
+    etiquettes += [f'partenaire:{pk}' for pk in sorted(partenaires)]
+    etiquettes += [f'sous-famille:{pk}' for pk in sorted(sous_familles)]
+    etiquettes += [f'produit:{pk}' for pk in sorted(produits)]
+    if len(etiquettes) > ETIQUETTES_MAX:
+        return ['catalogue'], ['/']
+    chemins = ['/']
+    chemins += [f'/partenaires/{pk}' for pk in sorted(partenaires)]
+    chemins += [f'/sous-familles/{pk}' for pk in sorted(sous_familles)]
+    chemins += [f'/produits/{pk}' for pk in sorted(produits)]
+    return etiquettes, chemins
+
+
+def signer(secret, horodatage, corps):
+    """Signature "sha256=<hex>" de "<horodatage>.<corps>" """
+    message = str(horodatage).encode() + b'.' + corps
+    return 'sha256=' + hmac.new(secret.encode(), message, hashlib.sha256).hexdigest()
+
+
+def verifier_signature(secret, horodatage, corps, signature, maintenant=None):
+    """Vérifie la signature et la fraîcheur d'une notification reçue"""
+    try:
+        ecart = abs((maintenant or time.time()) - int(horodatage))
+    except (TypeError, ValueError):
+        return False
+    if ecart > TOLERANCE_HORODATAGE:
+        return False
+    return hmac.compare_digest(signer(secret, horodatage, corps), signature or '')
+
+
+def envoyer(etiquettes, chemins, url=None, secret=None, tentatives=None):
+    """
+    Envoie une notification signée. Retourne True si le récepteur l'a acceptée (2xx),
+    False après épuisement des tentatives ou sur un refus définitif (4xx).
+    """
+    url = url or settings.REVALIDATION_URL
+    secret = secret if secret is not None else settings.REVALIDATION_SECRET
+    tentatives = tentatives or settings.REVALIDATION_TENTATIVES
+    corps = json.dumps({'id': str(uuid.uuid4()), 'tags': etiquettes, 'paths': chemins}).encode()
+    for tentative in range(1, tentatives + 1):
+        # Horodatage et signature recalculés à chaque tentative
+        horodatage = int(time.time())
+        request = urllib.request.Request(url, data=corps, method='POST', headers={
+            'Content-Type': 'application/json',
+            ENTETE_HORODATAGE: str(horodatage),
+            ENTETE_SIGNATURE: signer(secret, horodatage, corps),
+        })
+        try:
+            with urllib.request.urlopen(request, timeout=10):
+                return True
+        except urllib.error.HTTPError as erreur:
+            if erreur.code != 429 and erreur.code < 500:
+                logger.error("Revalidation refusée par %s (HTTP %s)", url, erreur.code)
+                return False
+            motif = f"HTTP {erreur.code}"
+        except (urllib.error.URLError, OSError) as erreur:
+            motif = str(getattr(erreur, 'reason', erreur))
+        if tentative < tentatives:
+            delai = 2 ** (tentative - 1)
+            logger.warning("Revalidation : tentative %d/%d échouée (%s), nouvel essai dans %ds", tentative, tentatives, motif, delai)
+            time.sleep(delai)
+    logger.error("Revalidation abandonnée après %d tentatives : %s", tentatives, etiquettes)
+    return False
+
+
+def _notifier(modifications):
+    etiquettes, chemins = etiquettes_et_chemins(modifications)
+    envoyer(etiquettes, chemins)
+
+
+_regroupeur = Regroupeur('revalidation', settings.REVALIDATION_DELAI, _notifier)
+
+
+@receiver(catalogue_modifie, dispatch_uid='revalidation.frontend')
+def planifier_notification(sender, pks, operation, **kwargs):
+    """Regroupe les modifications et notifie le frontend (si REVALIDATION_URL est défini)"""
+    if settings.REVALIDATION_URL:
+        _regroupeur.ajouter(sender, pks, operation)
@@ -1,5 +1,7 @@
+from django.core.files.storage import default_storage
 from rest_framework import serializers
-from .models import Partenaire, Famille, SousFamille, ProduitFournisseur, Catalogue
+from .langues import ProjectionLangueSerializerMixin
+from .models import Partenaire, Famille, SousFamille, ProduitFournisseur, Catalogue, LigneCatalogue
 
 
 class CatalogueSerializer(serializers.ModelSerializer):
@@ -60,7 +62,7 @@ class ProduitFournisseurSerializer(serializers.ModelSerializer):
         return None
 
 
-class SousFamilleSerializer(serializers.ModelSerializer):
+class SousFamilleSerializer(ProjectionLangueSerializerMixin, serializers.ModelSerializer):
     """Serializer pour le modèle SousFamille avec ses produits fournisseur"""
     produits_fournisseur = ProduitFournisseurSerializer(many=True, read_only=True)
     famille_id = serializers.IntegerField(source='famille.id', read_only=True)
@@ -85,12 +87,12 @@ class SousFamilleSerializer(serializers.ModelSerializer):
     
     def get_partenaire_id(self, obj):
         """Retourne l'ID du premier partenaire associé à la famille de cette sous-famille"""
-        if obj.famille and obj.famille.partenaires.exists():
-            return obj.famille.partenaires.first().id
-        return None
+        # .all() réutilise les partenaires préchargés (triés par nom, comme .first())
+        partenaires = list(obj.famille.partenaires.all()) if obj.famille else []
+        return partenaires[0].id if partenaires else None
 
 
-class FamilleSerializer(serializers.ModelSerializer):
+class FamilleSerializer(ProjectionLangueSerializerMixin, serializers.ModelSerializer):
     """Serializer pour le modèle Famille avec ses sous-familles"""
     sous_familles = SousFamilleSerializer(many=True, read_only=True)
     
@@ -110,6 +112,48 @@ class FamilleSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'date_creation', 'date_modification']
 
 
+class FamilleResumeSerializer(ProjectionLangueSerializerMixin, serializers.ModelSerializer):
+    """Famille sans son arbre, pour /api/partenaires/{id}/familles/"""
+    nombre_sous_familles = serializers.IntegerField(read_only=True)
+
+    class Meta:
+        model = Famille
+        fields = [
+            'id',
+            'titre_fr',
+            'titre_en',
+            'titre_ar',
+            'nombre_sous_familles',
+            'actif',
+            'ordre',
+            'date_creation',
+            'date_modification',
+        ]
+        read_only_fields = fields
+
+
+class SousFamilleResumeSerializer(ProjectionLangueSerializerMixin, serializers.ModelSerializer):
+    """Sous-famille sans ses produits, pour /api/familles/{id}/sous-familles/"""
+    famille_id = serializers.IntegerField(read_only=True)
+    nombre_produits = serializers.IntegerField(read_only=True)
+
+    class Meta:
+        model = SousFamille
+        fields = [
+            'id',
+            'famille_id',
+            'titre_fr',
+            'titre_en',
+            'titre_ar',
+            'nombre_produits',
+            'actif',
+            'ordre',
+            'date_creation',
+            'date_modification',
+        ]
+        read_only_fields = fields
+
+
 class PartenaireSerializer(serializers.ModelSerializer):
     """Serializer pour le modèle Partenaire avec URL complète du logo et familles"""
     logo_url = serializers.SerializerMethodField()
@@ -179,3 +223,57 @@ class PartenaireCreateUpdateSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError("L'URL doit commencer par http:// ou https://")
         return value
 
+
+class LigneCatalogueSerializer(ProjectionLangueSerializerMixin, serializers.ModelSerializer):
+    """
+    Serializer plat d'une ligne du modèle de lecture : le produit fournisseur, ses
+    catalogues actifs et ses ancêtres, sans aucune requête supplémentaire
+    """
+    champs_localises = ('famille_titre', 'sous_famille_titre')
+    id = serializers.IntegerField(source='produit_fournisseur_id', read_only=True)
+    image = serializers.SerializerMethodField()
+    image_url = serializers.SerializerMethodField()
+    catalogues = serializers.SerializerMethodField()
+
+    class Meta:
+        model = LigneCatalogue
+        fields = [
+            'id',
+            'nom',
+            'image',
+            'image_url',
+            'catalogues',
+            'ordre',
+            'partenaire_id',
+            'partenaire_nom',
+            'famille_id',
+            'famille_titre_fr',
+            'famille_titre_en',
+            'famille_titre_ar',
+            'sous_famille_id',
+            'sous_famille_titre_fr',
+            'sous_famille_titre_en',
+            'sous_famille_titre_ar',
+            'date_creation',
+            'date_modification',
+        ]
+        read_only_fields = fields
+
+    def url_absolue(self, url):
+        request = self.context.get('request')
+        return request.build_absolute_uri(url) if request and url else url
+
+    def get_image(self, obj):
+        """Retourne l'URL complète de l'image"""
+        return self.url_absolue(default_storage.url(obj.image)) if obj.image else None
+
+    def get_image_url(self, obj):
+        return self.get_image(obj)
+
+    def get_catalogues(self, obj):
+        """Catalogues actifs enregistrés dans la ligne, avec les URL complètes des PDF"""
+        catalogues = []
+        for catalogue in obj.catalogues:
+            url = self.url_absolue(catalogue['fichier_pdf'])
+            catalogues.append({**catalogue, 'fichier_pdf': url, 'fichier_pdf_url': url})
+        return catalogues
@@ -0,0 +1,113 @@
+"""
+Notification des modifications du catalogue.
+
+Toute écriture sur un modèle du catalogue (save, delete, relations M2M, actions en masse
+de l'admin) aboutit à `notifier_modification`, qui recalcule la colonne `visible` de la
+hiérarchie, met à jour le modèle de lecture LigneCatalogue et l'inscrit au journal des
+changements (dans la même transaction), puis envoie le signal `catalogue_modifie` une
+fois la transaction validée. Les caches et les consommateurs de modifications
+s'abonnent à ce seul signal plutôt qu'aux signaux de chaque modèle.
+
+Les QuerySet.update() et bulk_create() n'envoient pas de signaux : utiliser
+`modifier_en_masse`, ou appeler `notifier_modification` après coup.
+"""
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import Signal
+
+from .lignes import actualiser as actualiser_lignes
+from .models import ChangementCatalogue, Famille, Partenaire
+from .visibilite import propager as propager_visibilite
+
+
+# Envoyé après commit avec sender=<modèle>, pks=[...], operation='creation'|'modification'|'suppression'
+catalogue_modifie = Signal()
+
+CREATION = 'creation'
+MODIFICATION = 'modification'
+SUPPRESSION = 'suppression'
+
+
+def notifier_modification(modele, pks, operation=MODIFICATION, familles=None):
+    """
+    Met à jour la visibilité et le modèle de lecture, journalise les objets indiqués (dans
+    la transaction courante), puis envoie catalogue_modifie après la validation de la transaction.
+
+    `familles` : pour la suppression de partenaires, les familles qui leur étaient liées
+    (les liens ont disparu avec eux) ; None si elles ne sont pas connues.
+    """
+    pks = list(pks)
+    if not pks:
+        return
+    propager_visibilite(modele, pks, operation, familles)
+    actualiser_lignes(modele, pks, operation, familles)
+    ChangementCatalogue.objects.bulk_create([
+        ChangementCatalogue(modele=modele._meta.model_name, objet_id=pk, operation=operation)
+        for pk in pks
+    ], batch_size=1000)
+    transaction.on_commit(
+        lambda: catalogue_modifie.send(sender=modele, pks=pks, operation=operation)
+    )
+
+
+def modifier_en_masse(queryset, **valeurs):
+    """QuerySet.update() suivi de la notification des objets modifiés"""
+    with transaction.atomic():
+        pks = list(queryset.values_list('pk', flat=True))
+        nombre = queryset.model.objects.filter(pk__in=pks).update(**valeurs)
+        notifier_modification(queryset.model, pks)
+    return nombre
+
+
+def _apres_enregistrement(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return  # loaddata
+    notifier_modification(sender, [instance.pk], CREATION if created else MODIFICATION)
+
+
+def _avant_suppression(sender, instance, **kwargs):
+    # Les liens avec les familles sont supprimés avec le partenaire : retenus pour _apres_suppression
+    instance._familles_liees = objets_lies(Famille.partenaires.through, instance, Famille)
+
+
+def _apres_suppression(sender, instance, **kwargs):
+    notifier_modification(sender, [instance.pk], SUPPRESSION, getattr(instance, '_familles_liees', None))
+
+
+def objets_lies(through, instance, model):
+    """Identifiants des objets de `model` liés à `instance` dans la table de liaison `through`"""
+    source, cible = (
+        next(champ.attname for champ in through._meta.concrete_fields if champ.related_model is modele)
+        for modele in (type(instance), model)
+    )
+    return set(through.objects.filter(**{source: instance.pk}).values_list(cible, flat=True))
+
+
+def _apres_changement_relation(sender, instance, action, model, pk_set, **kwargs):
+    if action == 'pre_clear':
+        # clear() n'indique pas les objets déliés (pk_set vaut None) : retenus pour post_clear
+        instance._objets_delies = getattr(instance, '_objets_delies', {})
+        instance._objets_delies[sender] = objets_lies(sender, instance, model)
+        return
+    if action == 'post_clear':
+        pk_set = getattr(instance, '_objets_delies', {}).pop(sender, None)
+    elif action not in ('post_add', 'post_remove'):
+        return
+    notifier_modification(type(instance), [instance.pk])
+    if pk_set:
+        notifier_modification(model, pk_set)
+
+
+def connecter(*modeles):
+    """Branche les signaux des modèles (et de leurs relations M2M) sur notifier_modification"""
+    for modele in modeles:
+        uid = f'catalogue:{modele._meta.label}'
+        post_save.connect(_apres_enregistrement, sender=modele, dispatch_uid=uid)
+        post_delete.connect(_apres_suppression, sender=modele, dispatch_uid=uid)
+        if modele is Partenaire:
+            pre_delete.connect(_avant_suppression, sender=modele, dispatch_uid=uid)
+        for champ in modele._meta.local_many_to_many:
+            m2m_changed.connect(
+                _apres_changement_relation, sender=champ.remote_field.through,
+                dispatch_uid=f'{uid}.{champ.name}',
+            )
@@ -0,0 +1,223 @@
+"""
+Publication de l'API publique sous forme de fichiers JSON statiques.
+
+Chaque publication crée un répertoire de version complet sous SNAPSHOT_ROOT :
+
+    versions/<version>/api/partenaires/actifs/index.json   (page 1)
+    versions/<version>/api/partenaires/actifs/page-2.json
+    versions/<version>/api/partenaires/<id>/index.json
+    versions/<version>/api/sous-familles/<id>/index.json
+    versions/<version>/api/produits/actifs/index.json
+    versions/<version>/manifest.json
+    current -> versions/<version>
+
+Le lien `current` est remplacé atomiquement une fois la version écrite : nginx ou un CDN
+servent toujours une version complète. Les fichiers sont rendus par les ViewSets DRF,
+sans passer par les middlewares. Après une modification, seuls les fichiers touchés sont
+rendus de nouveau ; les fichiers inchangés sont des liens physiques vers la version
+précédente.
+"""
+import fcntl
+import hashlib
+import json
+import logging
+import os
+import shutil
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.dispatch import receiver
+from django.test import RequestFactory
+from django.urls import resolve
+
+from .models import Partenaire, SousFamille
+from .modifications import Regroupeur, objets_touches
+from .signals import catalogue_modifie
+
+
+logger = logging.getLogger(__name__)
+
+URLCONF = 'config.urls'
+
+# Listes paginées publiées (toujours rendues de nouveau : toute modification peut les toucher)
+LISTES = ('/api/partenaires/actifs/', '/api/produits/actifs/')
+
+# Délai de regroupement des modifications avant une publication automatique (secondes)
+DELAI_PUBLICATION = 2.0
+
+
+def fichier(chemin, page=1):
+    """/api/partenaires/actifs/ + page 2 -> api/partenaires/actifs/page-2.json"""
+    nom = 'index.json' if page == 1 else f'page-{page}.json'
+    return chemin.strip('/') + '/' + nom
+
+
+class Rendu:
+    """Rend les endpoints publics comme le ferait une requête GET sur SNAPSHOT_URL_BASE"""
+
+    def __init__(self, url_base):
+        url = urlsplit(url_base)
+        self.fabrique = RequestFactory(HTTP_HOST=url.netloc, HTTP_ACCEPT='application/json')
+        self.securise = url.scheme == 'https'
+
+    def rendre(self, chemin, **parametres):
+        """Corps JSON de la réponse, ou None si l'objet n'existe pas"""
+        request = self.fabrique.get(chemin, parametres, secure=self.securise)
+        correspondance = resolve(chemin, urlconf=URLCONF)
+        response = correspondance.func(request, *correspondance.args, **correspondance.kwargs)
+        if response.status_code == 404:
+            return None
+        if response.status_code != 200:
+            raise RuntimeError(f"{chemin} a répondu {response.status_code}")
+        response.render()
+        return response.content
+
+    def rendre_liste(self, chemin):
+        """Toutes les pages d'une liste paginée : {fichier: contenu}"""
+        contenus = {}
+        page = 1
+        while True:
+            contenu = self.rendre(chemin, **({'page': page} if page > 1 else {}))
+            contenus[fichier(chemin, page)] = contenu
+            if not json.loads(contenu).get('next'):
+                return contenus
+            page += 1
+
+
+def racine():
+    return Path(settings.SNAPSHOT_ROOT)
+
+
+def version_courante():
+    """Répertoire de la version publiée, ou None"""
+    lien = racine() / 'current'
+    if not lien.is_symlink():
+        return None
+    return racine() / os.readlink(lien)
+
+
+def lire_manifeste(version):
+    if version is None or not (version / 'manifest.json').exists():
+        return {}
+    return json.loads((version / 'manifest.json').read_text())['fichiers']
+
+
+@contextmanager
+def verrou():
+    """Sérialise les publications entre processus (workers, commande manuelle)"""
+    racine().mkdir(parents=True, exist_ok=True)
+    with open(racine() / '.verrou', 'w') as descripteur:
+        fcntl.flock(descripteur, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(descripteur, fcntl.LOCK_UN)
+
+
+def lier_ou_copier(source, destination):
+    try:
+        os.link(source, destination)
+    except OSError:
+        shutil.copy2(source, destination)
+
+
+def publier(modifications=None, conserver=None):
+    """
+    Publie une nouvelle version. Sans `modifications` (ou sans version précédente),
+    tous les fichiers sont rendus. Retourne (version, fichiers écrits, fichiers liés).
+    """
+    conserver = conserver or settings.SNAPSHOT_VERSIONS_CONSERVEES
+    rendu = Rendu(settings.SNAPSHOT_URL_BASE)
+    with verrou():
+        precedente = version_courante()
+        manifeste_precedent = lire_manifeste(precedente)
+        complet = not manifeste_precedent or modifications is None or modifications.complet
+
+        contenus = {}
+        for chemin in LISTES:
+            contenus.update(rendu.rendre_liste(chemin))
+
+        if complet:
+            partenaires = Partenaire.objects.filter(actif=True).values_list('pk', flat=True)
+            sous_familles = SousFamille.objects.filter(actif=True).values_list('pk', flat=True)
+            conserves = set()
+        else:
+            ids_partenaires, ids_sous_familles = objets_touches(modifications)
+            partenaires = Partenaire.objects.filter(pk__in=ids_partenaires, actif=True).values_list('pk', flat=True)
+            sous_familles = SousFamille.objects.filter(pk__in=ids_sous_familles, actif=True).values_list('pk', flat=True)
+            # Les fichiers de détail non touchés sont repris de la version précédente
+            touches = {fichier(f'/api/partenaires/{pk}/') for pk in ids_partenaires}
+            touches |= {fichier(f'/api/sous-familles/{pk}/') for pk in ids_sous_familles}
+            listes = tuple(chemin.strip('/') + '/' for chemin in LISTES)
+            conserves = {
+                nom for nom in manifeste_precedent
+                if nom not in touches and not nom.startswith(listes)
+            }
+
+        for pk in partenaires:
+            contenus[fichier(f'/api/partenaires/{pk}/')] = rendu.rendre(f'/api/partenaires/{pk}/')
+        for pk in sous_familles:
+            contenus[fichier(f'/api/sous-familles/{pk}/')] = rendu.rendre(f'/api/sous-familles/{pk}/')
+
+        version = datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%S%fZ')
+        repertoire = racine() / 'versions' / version
+        try:
+            manifeste = {}
+            ecrits = lies = 0
+            for nom in sorted(conserves):
+                (repertoire / nom).parent.mkdir(parents=True, exist_ok=True)
+                lier_ou_copier(precedente / nom, repertoire / nom)
+                manifeste[nom] = manifeste_precedent[nom]
+                lies += 1
+            for nom, contenu in sorted(contenus.items()):
+                if contenu is None:
+                    continue  # supprimé entre-temps
+                empreinte = hashlib.sha256(contenu).hexdigest()
+                (repertoire / nom).parent.mkdir(parents=True, exist_ok=True)
+                if manifeste_precedent.get(nom) == empreinte:
+                    lier_ou_copier(precedente / nom, repertoire / nom)
+                    lies += 1
+                else:
+                    (repertoire / nom).write_bytes(contenu)
+                    ecrits += 1
+                manifeste[nom] = empreinte
+            (repertoire / 'manifest.json').write_text(json.dumps({
+                'version': version,
+                'url_base': settings.SNAPSHOT_URL_BASE,
+                'fichiers': manifeste,
+            }, indent=2, sort_keys=True))
+
+        except BaseException:
+            shutil.rmtree(repertoire, ignore_errors=True)
+            raise
+
+        # Bascule atomique : rename(2) d'un lien temporaire sur `current`
+        temporaire = racine() / f'.current-{version}'
+        os.symlink(Path('versions') / version, temporaire)
+        os.replace(temporaire, racine() / 'current')
+
+        anciennes = sorted((racine() / 'versions').iterdir())[:-conserver]
+        for ancienne in anciennes:
+            shutil.rmtree(ancienne, ignore_errors=True)
+
+    return version, ecrits, lies
+
+
+# Publication automatique après les modifications du catalogue (admin, API...)
+
+def _publier_modifications(modifications):
+    version, ecrits, lies = publier(modifications)
+    logger.info("Snapshot %s publié (%d fichiers écrits, %d repris)", version, ecrits, lies)
+
+
+_regroupeur = Regroupeur('snapshot', DELAI_PUBLICATION, _publier_modifications)
+
+
+@receiver(catalogue_modifie, dispatch_uid='snapshot.publication')
+def planifier_publication(sender, pks, operation, **kwargs):
+    """Regroupe les modifications et publie une version après DELAI_PUBLICATION"""
+    if settings.SNAPSHOT_PUBLICATION_AUTO:
+        _regroupeur.ajouter(sender, pks, operation)
@@ -0,0 +1,39 @@
+/*
+ * Filtres de liste chargés à la demande (voir partenaire/filtres_admin.py) : select2
+ * interroge la vue d'autocomplétion de l'admin au lieu d'embarquer tous les choix.
+ */
+window.addEventListener('load', function () {
+    'use strict';
+    const $ = window.jQuery;
+
+    $('.filtre-autocomplete').each(function () {
+        const $champ = $(this);
+        $champ.select2({
+            width: '100%',
+            allowClear: true,
+            placeholder: $champ.data('titre'),
+            ajax: {
+                url: $champ.data('url'),
+                dataType: 'json',
+                delay: 250,
+                data: function (params) {
+                    return {
+                        term: params.term || '',
+                        page: params.page || 1,
+                        app_label: $champ.data('app-label'),
+                        model_name: $champ.data('model-name'),
+                        field_name: $champ.data('field-name'),
+                    };
+                },
+            },
+        });
+        // Comme les autres filtres de jazzmin : le paramètre n'est envoyé que si une valeur est choisie
+        $champ.on('change', function () {
+            if ($champ.val()) {
+                $champ.attr('name', $champ.data('parametre'));
+            } else {
+                $champ.removeAttr('name');
+            }
+        }).trigger('change');
+    });
+});
@@ -0,0 +1,16 @@
+"""Jeux de données des tests du catalogue"""
+from partenaire.models import Partenaire, Famille, SousFamille, ProduitFournisseur, Catalogue
+
+
+def creer_partenaire(nom, actif=True):
+    return Partenaire.objects.create(nom=nom, url_site_web=f'https://{nom.lower()}.example', actif=actif)
+
+
+def creer_arbre(partenaires=(), titre='Famille'):
+    """Famille liée à `partenaires`, avec une sous-famille, un produit et un catalogue"""
+    famille = Famille.objects.create(titre_fr=titre)
+    famille.partenaires.add(*partenaires)
+    sous_famille = SousFamille.objects.create(famille=famille, titre_fr=f'{titre} / sous-famille')
+    produit = ProduitFournisseur.objects.create(sous_famille=sous_famille, nom=f'{titre} / produit')
+    catalogue = Catalogue.objects.create(produit_fournisseur=produit, nom='Catalogue', fichier_pdf='catalogues/pdf/a.pdf')
+    return famille, sous_famille, produit, catalogue
@@ -0,0 +1,102 @@
+import io
+import shutil
+import tempfile
+import zipfile
+
+from asgiref.sync import async_to_sync
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.test import TestCase, override_settings
+
+from partenaire.archives import catalogues_visibles, entrees, flux_zip, flux_zip_asynchrone
+from partenaire.models import Catalogue
+
+from .donnees import creer_arbre, creer_partenaire
+
+
+def archive(contenu):
+    return zipfile.ZipFile(io.BytesIO(contenu))
+
+
+@override_settings(LIMITATION_COUT_MAX=0)
+class ArchivesTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media)
+        reglages = override_settings(MEDIA_ROOT=self.media)
+        reglages.enable()
+        self.addCleanup(reglages.disable)
+
+        self.partenaire = creer_partenaire('A')
+        self.famille, self.sous_famille, self.produit, self.catalogue = creer_arbre([self.partenaire])
+        self.pdf = b'%PDF-1.4\n' + bytes(range(256)) * 600
+        self.enregistrer(self.catalogue, self.pdf)
+        self.url = f'/api/partenaires/{self.partenaire.pk}/catalogues-zip/'
+
+    def enregistrer(self, catalogue, contenu, nom='catalogue.pdf'):
+        catalogue.fichier_pdf = default_storage.save(f'catalogues/pdf/{nom}', ContentFile(contenu))
+        catalogue.save()
+
+    def telecharger(self, url=None, **entetes):
+        response = self.client.get(url or self.url, **entetes)
+        if response.status_code == 200:
+            self.assertTrue(response.streaming)
+            response.contenu = b''.join(response.streaming_content)
+        return response
+
+    def test_archive_valide_sans_compression(self):
+        response = self.telecharger()
+        self.assertEqual(response['Content-Type'], 'application/zip')
+        self.assertIn('catalogues-a.zip', response['Content-Disposition'])
+        zip_ = archive(response.contenu)
+        self.assertIsNone(zip_.testzip())
+        self.assertEqual(zip_.namelist(), ['Famille/Famille _ sous-famille/Famille _ produit/Catalogue.pdf'])
+        self.assertEqual({info.compress_type for info in zip_.infolist()}, {zipfile.ZIP_STORED})
+        self.assertEqual(zip_.read(zip_.namelist()[0]), self.pdf)
+
+    def test_catalogues_visibles_seulement(self):
+        _, _, _, inactif = creer_arbre([self.partenaire], titre='Autre')
+        self.enregistrer(inactif, b'%PDF-inactif', 'inactif.pdf')
+        inactif.actif = False
+        inactif.save()
+        self.assertEqual(len(archive(self.telecharger().contenu).namelist()), 1)
+
+        self.produit.actif = False
+        self.produit.save()
+        self.assertEqual(archive(self.telecharger().contenu).namelist(), [])
+
+    def test_fichier_absent_ignore(self):
+        second = Catalogue.objects.create(
+            produit_fournisseur=self.produit, nom='Second', fichier_pdf='catalogues/pdf/absent.pdf', ordre=1
+        )
+        self.assertTrue(Catalogue.objects.get(pk=second.pk).visible)
+        with self.assertLogs('partenaire.archives', 'WARNING'):
+            response = self.telecharger(f'/api/sous-familles/{self.sous_famille.pk}/catalogues-zip/')
+        self.assertEqual(len(archive(response.contenu).namelist()), 1)
+
+    def test_etag(self):
+        etag = self.telecharger()['ETag']
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.enregistrer(self.catalogue, b'%PDF-nouveau', 'nouveau.pdf')
+        response = self.telecharger(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_flux_asynchrone_identique(self):
+        entrees_archive = entrees(catalogues_visibles(produit_fournisseur=self.produit))
+
+        async def lire():
+            return [morceau async for morceau in flux_zip_asynchrone(entrees_archive)]
+
+        morceaux = async_to_sync(lire)()
+        self.assertGreater(len(morceaux), 1)
+        self.assertEqual(b''.join(morceaux), b''.join(flux_zip(entrees_archive)))
+
+    async def test_asgi_en_flux(self):
+        response = await self.async_client.get(self.url)
+        self.assertTrue(response.is_async)
+        contenu = b''.join([morceau async for morceau in response.streaming_content])
+        self.assertEqual(archive(contenu).read(archive(contenu).namelist()[0]), self.pdf)
@@ -0,0 +1,99 @@
+import gzip
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import RequestFactory, TestCase
+
+from config.replicas import COOKIE_COLLANT
+from partenaire.cache import (
+    cle_reponse, cle_verrou, emplacements_chauds, etag_correspond, generation, invalider, rechauffer,
+)
+
+from .donnees import creer_arbre, creer_partenaire
+
+
+CHEMIN = '/api/partenaires/actifs/'
+
+
+class CacheReponsesTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        creer_arbre([creer_partenaire('A')])
+        self.cle = cle_reponse(RequestFactory().get(CHEMIN))
+
+    def test_miss_puis_hit(self):
+        miss = self.client.get(CHEMIN)
+        hit = self.client.get(CHEMIN)
+        self.assertEqual((miss['X-Cache'], hit['X-Cache']), ('MISS', 'HIT'))
+        self.assertEqual(hit['ETag'], miss['ETag'])
+        self.assertEqual(hit.json(), miss.json())
+
+    def test_variante_gzip(self):
+        self.client.get(CHEMIN)
+        response = self.client.get(CHEMIN, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(response.content), self.client.get(CHEMIN).content)
+
+    def test_etag(self):
+        etag = self.client.get(CHEMIN)['ETag']
+        self.assertEqual(self.client.get(CHEMIN, HTTP_IF_NONE_MATCH=f'"autre", {etag}').status_code, 304)
+        self.assertEqual(self.client.get(CHEMIN, HTTP_IF_NONE_MATCH=etag[3:-2]).status_code, 200)
+
+    def test_etag_correspond(self):
+        def requete(valeur):
+            return RequestFactory().get(CHEMIN, HTTP_IF_NONE_MATCH=valeur)
+
+        self.assertTrue(etag_correspond(requete('"abc"'), 'W/"abc"'))
+        self.assertTrue(etag_correspond(requete('*'), 'W/"abc"'))
+        self.assertFalse(etag_correspond(requete('W/"ab"'), 'W/"abc"'))
+        self.assertFalse(etag_correspond(requete('W/"abcd"'), 'W/"abc"'))
+
+    def test_modification_perime_le_cache(self):
+        avant = generation()
+        self.client.get(CHEMIN)
+        invalider()
+        self.assertEqual(generation(), avant + 1)
+        self.assertEqual(self.client.get(CHEMIN)['X-Cache'], 'MISS')
+
+    def test_entree_perimee_servie_pendant_le_remplissage(self):
+        etag = self.client.get(CHEMIN)['ETag']
+        invalider()
+        cache.add(cle_verrou(self.cle), 1)
+        response = self.client.get(CHEMIN)
+        self.assertEqual((response['X-Cache'], response['ETag']), ('STALE', etag))
+
+    def test_attente_du_remplissage(self):
+        self.client.get(CHEMIN)
+        entree = cache.get(self.cle)
+        cache.delete(self.cle)
+        cache.add(cle_verrou(self.cle), 1)
+        # Une autre requête remplit l'entrée pendant l'attente
+        with mock.patch('partenaire.cache.time.sleep', side_effect=lambda _: cache.set(self.cle, entree)):
+            self.assertEqual(self.client.get(CHEMIN)['X-Cache'], 'HIT')
+
+    def test_attente_bornee(self):
+        cache.add(cle_verrou(self.cle), 1)
+        with mock.patch('partenaire.cache.ATTENTE_MAX_SYNCHRONE', 0.1):
+            self.assertEqual(self.client.get(CHEMIN)['X-Cache'], 'MISS')
+        # Le verrou de l'autre requête n'est pas libéré
+        self.assertTrue(cache.get(cle_verrou(self.cle)))
+
+    def test_verrou_libere_apres_remplissage(self):
+        self.client.get(CHEMIN)
+        self.assertIsNone(cache.get(cle_verrou(self.cle)))
+
+    def test_lecture_collante_sans_cache(self):
+        self.client.get(CHEMIN)
+        self.client.cookies[COOKIE_COLLANT] = '1'
+        self.assertNotIn('X-Cache', self.client.get(CHEMIN))
+
+    def test_entrees_chaudes_rechauffees(self):
+        self.client.get(CHEMIN)
+        self.client.get('/api/partenaires/')
+        chaudes = cache.get_many(emplacements_chauds()).values()
+        self.assertEqual([chaude['cle'] for chaude in chaudes], [self.cle])
+        invalider()
+        rechauffer()
+        self.assertEqual(cache.get(self.cle)['generation'], generation())
+        self.assertEqual(self.client.get(CHEMIN)['X-Cache'], 'HIT')
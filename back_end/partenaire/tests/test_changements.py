@@ -0,0 +1,105 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import transaction
+from django.test import TransactionTestCase, override_settings
+from django.utils import timezone
+
+from partenaire.changements import CURSEUR_INITIAL, lire_changements
+from partenaire.models import ChangementCatalogue, Famille
+
+from .donnees import creer_partenaire
+
+
+# Le flux ne lit que les transactions terminées : les écritures doivent être validées
+@override_settings(SNAPSHOT_PUBLICATION_AUTO=False, CACHE_REPONSES_DUREE=0, LIMITATION_COUT_MAX=0)
+class FluxChangementsTests(TransactionTestCase):
+
+    def lire(self, **parametres):
+        response = self.client.get('/api/changes/', parametres)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_curseur_courant(self):
+        self.assertEqual(self.lire(), {'cursor': CURSEUR_INITIAL, 'has_more': False, 'results': []})
+        creer_partenaire('A')
+        curseur = self.lire()['cursor']
+        self.assertNotEqual(curseur, CURSEUR_INITIAL)
+        self.assertEqual(self.lire(since=curseur), {'cursor': curseur, 'has_more': False, 'results': []})
+
+    def test_changements_depuis_le_curseur(self):
+        avant = creer_partenaire('A')
+        curseur = self.lire()['cursor']
+        partenaire = creer_partenaire('B')
+        partenaire.nom = 'B2'
+        partenaire.save()
+        supprime = avant.pk
+        avant.delete()
+
+        resultats = self.lire(since=curseur)['results']
+        self.assertEqual(
+            [(r['model'], r['id'], r['operation']) for r in resultats],
+            [('partenaire', partenaire.pk, 'modification'), ('partenaire', supprime, 'suppression')],
+        )
+        self.assertEqual(resultats[0]['data']['nom'], 'B2')
+        self.assertIsNone(resultats[1]['data'])
+
+    def test_relations_en_identifiants(self):
+        partenaire = creer_partenaire('A')
+        famille = Famille.objects.create(titre_fr='Famille')
+        curseur = self.lire()['cursor']
+        famille.partenaires.add(partenaire)
+        resultats = {r['model']: r for r in self.lire(since=curseur)['results']}
+        self.assertEqual(resultats['famille']['data']['partenaires'], [partenaire.pk])
+        self.assertEqual(resultats['partenaire']['id'], partenaire.pk)
+
+    def test_pagination(self):
+        for nom in 'ABC':
+            creer_partenaire(nom)
+        page = self.lire(since=CURSEUR_INITIAL, limit=2)
+        self.assertTrue(page['has_more'])
+        self.assertEqual([r['data']['nom'] for r in page['results']], ['A', 'B'])
+        self.assertEqual(page['cursor'], page['results'][-1]['cursor'])
+        suite = self.lire(since=page['cursor'], limit=2)
+        self.assertFalse(suite['has_more'])
+        self.assertEqual([r['data']['nom'] for r in suite['results']], ['C'])
+
+    def test_transaction_en_cours_non_lue(self):
+        curseur = self.lire()['cursor']
+        with transaction.atomic():
+            creer_partenaire('A')
+            self.assertEqual(lire_changements(curseur)[2], [])
+        self.assertEqual(len(lire_changements(curseur)[2]), 1)
+
+    def test_curseur_expire(self):
+        creer_partenaire('A')
+        curseur = self.lire()['cursor']
+        creer_partenaire('B')
+        ChangementCatalogue.objects.filter(pk=int(curseur.split('.')[1])).delete()
+        response = self.client.get('/api/changes/', {'since': curseur})
+        self.assertEqual(response.status_code, 410)
+
+    def test_parametres_invalides(self):
+        self.assertEqual(self.client.get('/api/changes/', {'since': 'abc'}).status_code, 400)
+        self.assertEqual(self.client.get('/api/changes/', {'since': '1.2.3'}).status_code, 400)
+        self.assertEqual(self.client.get('/api/changes/', {'limit': 'beaucoup'}).status_code, 400)
+
+    def purger(self):
+        ChangementCatalogue.objects.update(date=timezone.now() - timedelta(days=60))
+        call_command('purge_changes', days=30, stdout=StringIO())
+
+    def test_purge_conserve_le_curseur_des_clients_a_jour(self):
+        creer_partenaire('A')
+        creer_partenaire('B')
+        curseur = self.lire()['cursor']
+        self.purger()
+        self.assertEqual(ChangementCatalogue.objects.count(), 1)
+        self.assertEqual(self.lire(since=curseur)['results'], [])
+
+    def test_purge_expire_les_curseurs_en_retard(self):
+        creer_partenaire('A')
+        curseur = self.lire()['cursor']
+        creer_partenaire('B')
+        self.purger()
+        self.assertEqual(self.client.get('/api/changes/', {'since': curseur}).status_code, 410)
@@ -0,0 +1,90 @@
+from unittest import mock
+
+from asgiref.sync import async_to_sync
+from django.core.cache import cache
+from django.test import TransactionTestCase, override_settings
+
+from partenaire import graphe
+from partenaire.cache import generation
+from partenaire.models import Famille, SousFamille, ProduitFournisseur, Catalogue
+
+from .donnees import creer_arbre, creer_partenaire
+
+
+@override_settings(GRAPHE_CATALOGUE=True, CACHE_REPONSES_DUREE=0, LIMITATION_COUT_MAX=0)
+class GrapheTests(TransactionTestCase):
+    """
+    Les réponses rendues depuis le graphe sont identiques à celles des ViewSets.
+    TransactionTestCase : le graphe est chargé dans sa propre transaction REPEATABLE READ,
+    depuis le thread de rechargement des vues.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.alpha = creer_partenaire('Alpha')
+        self.alpha.logo = 'partenaires/logos/alpha.png'
+        self.alpha.save()
+        self.beta = creer_partenaire('Beta', actif=False)
+        creer_partenaire('Gamma')
+
+        famille, self.sous_famille, produit, catalogue = creer_arbre([self.beta, self.alpha])
+        famille.titre_en = 'Family'
+        famille.save()
+        self.sous_famille.titre_en = 'Sub-family'
+        self.sous_famille.save()
+        produit.image = 'produits/image.png'
+        produit.save()
+        Catalogue.objects.create(produit_fournisseur=produit, nom='Inactif', fichier_pdf='catalogues/pdf/b.pdf', actif=False)
+        ProduitFournisseur.objects.create(sous_famille=self.sous_famille, nom='Inactif', actif=False)
+        self.sous_famille_inactive = SousFamille.objects.create(famille=famille, titre_fr='Inactive', actif=False)
+        ProduitFournisseur.objects.create(sous_famille=self.sous_famille_inactive, nom='Produit')
+        inactive = Famille.objects.create(titre_fr='Inactive', actif=False)
+        inactive.partenaires.add(self.alpha)
+
+        patch = mock.patch.object(graphe, '_graphe', None)
+        patch.start()
+        self.addCleanup(patch.stop)
+
+    def comparer(self, chemin):
+        attendu = self.client.get(chemin)
+        self.assertEqual(attendu.status_code, 200)
+        with override_settings(ROOT_URLCONF='config.urls_async'), \
+                mock.patch('partenaire.async_views.partenaires_avec_arbre', side_effect=AssertionError), \
+                mock.patch('partenaire.async_views.sous_familles_avec_produits', side_effect=AssertionError):
+            response = async_to_sync(self.async_client.get)(chemin)
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNotNone(graphe.graphe_charge(generation()))
+        self.assertEqual(response.json(), attendu.json())
+        return response.json()
+
+    def test_partenaires_actifs(self):
+        data = self.comparer('/api/partenaires/actifs/')
+        self.assertEqual([p['nom'] for p in data['results']], ['Alpha', 'Gamma'])
+        alpha = data['results'][0]
+        self.assertEqual(alpha['logo'], 'http://testserver/media/partenaires/logos/alpha.png')
+        self.assertEqual([f['titre_fr'] for f in alpha['familles']], ['Famille'])
+        self.assertEqual(len(alpha['familles'][0]['sous_familles']), 1)
+
+    def test_partenaires_actifs_langue(self):
+        data = self.comparer('/api/partenaires/actifs/?lang=en')
+        famille = data['results'][0]['familles'][0]
+        self.assertEqual(famille['titre'], 'Family')
+        self.assertEqual(famille['sous_familles'][0]['titre'], 'Sub-family')
+
+    def test_sous_famille(self):
+        data = self.comparer(f'/api/sous-familles/{self.sous_famille.pk}/')
+        self.assertEqual(data['partenaire_id'], self.alpha.pk)
+        self.assertEqual([p['nom'] for p in data['produits_fournisseur']], ['Famille / produit'])
+        produit = data['produits_fournisseur'][0]
+        self.assertEqual(produit['image_url'], 'http://testserver/media/produits/image.png')
+        self.assertEqual([c['nom'] for c in produit['catalogues']], ['Catalogue'])
+
+    def test_sous_famille_langue(self):
+        data = self.comparer(f'/api/sous-familles/{self.sous_famille.pk}/?lang=en')
+        self.assertEqual(data['titre'], 'Sub-family')
+        data = self.comparer(f'/api/sous-familles/{self.sous_famille.pk}/?lang=ar')
+        self.assertEqual(data['titre'], 'Famille / sous-famille')
+
+    def test_sous_famille_inactive(self):
+        data = self.comparer(f'/api/sous-familles/{self.sous_famille_inactive.pk}/')
+        self.assertFalse(data['actif'])
@@ -0,0 +1,93 @@
+from django.test import TestCase
+
+from partenaire.lignes import lignes_visibles, reconstruire
+from partenaire.models import Catalogue, LigneCatalogue
+from partenaire.signals import modifier_en_masse
+
+from .donnees import creer_arbre, creer_partenaire
+
+
+def etat(produit):
+    """(partenaire_id, principal, visible) de chaque ligne du produit"""
+    return list(LigneCatalogue.objects.filter(produit_fournisseur=produit).order_by('partenaire_nom').values_list(
+        'partenaire_id', 'principal', 'visible'
+    ))
+
+
+class LigneCatalogueTests(TestCase):
+
+    def test_une_ligne_par_partenaire(self):
+        a, b = creer_partenaire('A'), creer_partenaire('B')
+        _, _, produit, catalogue = creer_arbre([b, a])
+        self.assertEqual(etat(produit), [(a.pk, True, True), (b.pk, False, True)])
+        ligne = LigneCatalogue.objects.get(produit_fournisseur=produit, principal=True)
+        self.assertEqual(ligne.partenaire_nom, 'A')
+        self.assertEqual([c['id'] for c in ligne.catalogues], [catalogue.pk])
+
+    def test_famille_sans_partenaire(self):
+        _, _, produit, _ = creer_arbre()
+        self.assertEqual(etat(produit), [(None, True, True)])
+
+    def test_renommage(self):
+        famille, sous_famille, produit, _ = creer_arbre([creer_partenaire('A')])
+        produit.nom = 'Nouveau nom'
+        produit.save()
+        famille.titre_fr = 'Nouveau titre'
+        famille.save()
+        ligne = LigneCatalogue.objects.get(produit_fournisseur=produit)
+        self.assertEqual((ligne.nom, ligne.famille_titre_fr), ('Nouveau nom', 'Nouveau titre'))
+
+    def test_partenaire_inactif(self):
+        a, b = creer_partenaire('A'), creer_partenaire('B')
+        _, _, produit, _ = creer_arbre([a, b])
+        a.actif = False
+        a.save()
+        # La ligne principale passe au premier partenaire visible
+        self.assertEqual(etat(produit), [(a.pk, False, False), (b.pk, True, True)])
+
+    def test_suppression_de_partenaire(self):
+        a, b = creer_partenaire('A'), creer_partenaire('B')
+        _, _, produit, _ = creer_arbre([a, b])
+        a.delete()
+        self.assertEqual(etat(produit), [(b.pk, True, True)])
+
+    def test_ajout_et_retrait_de_partenaire(self):
+        a = creer_partenaire('A')
+        famille, _, produit, _ = creer_arbre()
+        famille.partenaires.add(a)
+        self.assertEqual(etat(produit), [(a.pk, True, True)])
+        famille.partenaires.clear()
+        self.assertEqual(etat(produit), [(None, True, True)])
+
+    def test_sous_famille_inactive(self):
+        _, sous_famille, produit, _ = creer_arbre([creer_partenaire('A')])
+        modifier_en_masse(type(sous_famille).objects.filter(pk=sous_famille.pk), actif=False)
+        self.assertEqual([visible for *_, visible in etat(produit)], [False])
+
+    def test_catalogues(self):
+        _, _, produit, catalogue = creer_arbre()
+        autre = Catalogue.objects.create(produit_fournisseur=produit, nom='Autre', fichier_pdf='catalogues/pdf/b.pdf', ordre=1)
+        catalogue.actif = False
+        catalogue.save()
+        self.assertEqual([c['id'] for c in LigneCatalogue.objects.get(produit_fournisseur=produit).catalogues], [autre.pk])
+        autre.delete()
+        self.assertEqual(LigneCatalogue.objects.get(produit_fournisseur=produit).catalogues, [])
+
+    def test_lignes_visibles(self):
+        a, b = creer_partenaire('A'), creer_partenaire('B')
+        famille, _, produit, _ = creer_arbre([a, b])
+        _, _, autre, _ = creer_arbre(titre='Autre')
+        self.assertEqual(
+            sorted(lignes_visibles().values_list('produit_fournisseur_id', flat=True)), sorted([produit.pk, autre.pk])
+        )
+        self.assertEqual(list(lignes_visibles(partenaire=b.pk).values_list('produit_fournisseur_id', flat=True)), [produit.pk])
+        self.assertEqual(list(lignes_visibles(famille=famille.pk).values_list('produit_fournisseur_id', flat=True)), [produit.pk])
+
+    def test_reconstruire(self):
+        a, b = creer_partenaire('A'), creer_partenaire('B', actif=False)
+        creer_arbre([a, b])
+        creer_arbre(titre='Autre')
+        champs = [champ.attname for champ in LigneCatalogue._meta.concrete_fields if champ.attname != 'id']
+        avant = sorted(LigneCatalogue.objects.values_list(*champs), key=repr)
+        self.assertEqual(reconstruire(), 3)
+        self.assertEqual(sorted(LigneCatalogue.objects.values_list(*champs), key=repr), avant)
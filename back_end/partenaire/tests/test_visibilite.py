@@ -0,0 +1,97 @@
+from django.test import TestCase
+
+from partenaire.models import Partenaire, Famille
+from partenaire.signals import modifier_en_masse
+from partenaire.visibilite import recalculer_tout
+
+from .donnees import creer_arbre, creer_partenaire
+
+
+class VisibiliteTests(TestCase):
+
+    def visibles(self, *objets):
+        return [type(objet).objects.get(pk=objet.pk).visible for objet in objets]
+
+    def test_arbre_actif_visible(self):
+        partenaire = creer_partenaire('A')
+        arbre = creer_arbre([partenaire])
+        self.assertEqual(self.visibles(partenaire, *arbre), [True] * 5)
+
+    def test_famille_sans_partenaire_visible(self):
+        self.assertEqual(self.visibles(*creer_arbre()), [True] * 4)
+
+    def test_partenaire_inactif_masque_la_descendance(self):
+        partenaire = creer_partenaire('A')
+        arbre = creer_arbre([partenaire])
+        partenaire.actif = False
+        partenaire.save()
+        self.assertEqual(self.visibles(partenaire, *arbre), [False] * 5)
+
+        partenaire.actif = True
+        partenaire.save()
+        self.assertEqual(self.visibles(partenaire, *arbre), [True] * 5)
+
+    def test_famille_visible_avec_un_partenaire_actif(self):
+        actif = creer_partenaire('A')
+        inactif = creer_partenaire('B', actif=False)
+        famille, *_ = creer_arbre([actif, inactif])
+        self.assertEqual(self.visibles(actif, inactif, famille), [True, False, True])
+
+    def test_sous_famille_inactive(self):
+        famille, sous_famille, produit, catalogue = creer_arbre()
+        sous_famille.actif = False
+        sous_famille.save()
+        self.assertEqual(self.visibles(famille, sous_famille, produit, catalogue), [True, False, False, False])
+
+    def test_ajout_et_retrait_de_partenaire(self):
+        inactif = creer_partenaire('B', actif=False)
+        famille, sous_famille, produit, catalogue = creer_arbre()
+        famille.partenaires.add(inactif)
+        self.assertEqual(self.visibles(famille, sous_famille, produit, catalogue), [False] * 4)
+        famille.partenaires.remove(inactif)
+        self.assertEqual(self.visibles(famille, sous_famille, produit, catalogue), [True] * 4)
+
+    def test_clear_depuis_la_famille(self):
+        inactif = creer_partenaire('B', actif=False)
+        famille, sous_famille, produit, catalogue = creer_arbre([inactif])
+        self.assertEqual(self.visibles(famille, catalogue), [False, False])
+        famille.partenaires.clear()
+        self.assertEqual(self.visibles(famille, sous_famille, produit, catalogue), [True] * 4)
+
+    def test_clear_depuis_le_partenaire(self):
+        inactif = creer_partenaire('B', actif=False)
+        famille, _, _, catalogue = creer_arbre([inactif])
+        inactif.familles.clear()
+        self.assertEqual(self.visibles(famille, catalogue), [True, True])
+
+    def test_suppression_du_dernier_partenaire_actif(self):
+        actif = creer_partenaire('A')
+        inactif = creer_partenaire('B', actif=False)
+        famille, _, _, catalogue = creer_arbre([actif, inactif])
+        autre_famille, _, _, autre_catalogue = creer_arbre([inactif], titre='Autre')
+        actif.delete()
+        self.assertEqual(self.visibles(famille, catalogue), [False, False])
+        self.assertEqual(self.visibles(autre_famille, autre_catalogue), [False, False])
+
+    def test_suppression_du_seul_partenaire(self):
+        partenaire = creer_partenaire('A')
+        famille, _, _, catalogue = creer_arbre([partenaire])
+        partenaire.actif = False
+        partenaire.save()
+        partenaire.delete()
+        # Plus aucun partenaire : la famille redevient visible
+        self.assertEqual(self.visibles(famille, catalogue), [True, True])
+
+    def test_modification_en_masse(self):
+        famille, sous_famille, produit, catalogue = creer_arbre()
+        modifier_en_masse(Famille.objects.filter(pk=famille.pk), actif=False)
+        self.assertEqual(self.visibles(famille, sous_famille, produit, catalogue), [False] * 4)
+
+    def test_recalculer_tout(self):
+        partenaire = creer_partenaire('A')
+        arbre = creer_arbre([partenaire])
+        # Écriture sans signal
+        Partenaire.objects.filter(pk=partenaire.pk).update(actif=False)
+        self.assertEqual(self.visibles(*arbre), [True] * 4)
+        recalculer_tout()
+        self.assertEqual(self.visibles(partenaire, *arbre), [False] * 5)
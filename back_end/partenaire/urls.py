@@ -1,6 +1,6 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import PartenaireViewSet, FamilleViewSet, SousFamilleViewSet, ProduitFournisseurViewSet, CatalogueViewSet
+from .views import PartenaireViewSet, FamilleViewSet, SousFamilleViewSet, ProduitFournisseurViewSet, CatalogueViewSet, ChangementsView, NavigationView
 
 # Configuration du router REST Framework
 router = DefaultRouter()
@@ -11,6 +11,8 @@ router.register(r'produits-fournisseur', ProduitFournisseurViewSet, basename='pr
 router.register(r'catalogues', CatalogueViewSet, basename='catalogue')
 
 urlpatterns = [
+    path('changes/', ChangementsView.as_view(), name='changements'),
+    path('navigation/', NavigationView.as_view(), name='navigation'),
     path('', include(router.urls)),
 ]
 
@@ -23,4 +25,9 @@ urlpatterns = [
 # - DELETE /api/partenaires/{id}/         : Supprime un partenaire
 # - GET    /api/partenaires/actifs/       : Liste les partenaires actifs
 # - GET    /api/partenaires/inactifs/    : Liste les partenaires inactifs
-
+# - GET    /api/partenaires/{id}/familles/ : Familles actives du partenaire (paginées)
+# - GET    /api/familles/{id}/sous-familles/ : Sous-familles actives de la famille (paginées)
+# - GET    /api/sous-familles/{id}/produits-fournisseur/ : Produits fournisseur actifs (paginés)
+# - GET    /api/{partenaires|familles|sous-familles}/{id}/catalogues-zip/ : Archive ZIP des catalogues
+# - GET    /api/changes/?since=<curseur> : Flux des changements du catalogue (voir changements.py)
+# - GET    /api/navigation/               : Arbre de navigation léger (voir navigation.py)
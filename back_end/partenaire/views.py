@@ -1,9 +1,12 @@
-from rest_framework import viewsets, filters
+from rest_framework import viewsets, filters, status
 from rest_framework.decorators import action
+from rest_framework.generics import get_object_or_404
 from rest_framework.response import Response
 from rest_framework.permissions import AllowAny
+from rest_framework.renderers import JSONRenderer
+from rest_framework.views import APIView
+from django.core.files.storage import default_storage
 from django_filters.rest_framework import DjangoFilterBackend
-from django.db.models import Prefetch
 from .models import Partenaire, Famille, SousFamille, ProduitFournisseur, Catalogue
 from .serializers import (
     PartenaireSerializer, 
@@ -11,12 +14,45 @@ from .serializers import (
     FamilleSerializer,
     SousFamilleSerializer,
     ProduitFournisseurSerializer,
-    CatalogueSerializer
+    CatalogueSerializer,
+    LigneCatalogueSerializer,
+    FamilleResumeSerializer,
+    SousFamilleResumeSerializer,
 )
+from .archives import ZipRenderer, catalogues_visibles, reponse_archive
+from .changements import CurseurExpire, CurseurInvalide, lire_changements
+from .facettes import FACETTES_PRODUITS_FOURNISSEUR, facettes_en_cache
 from .filters import PartenaireFilter
+from .langues import ProjectionLangueViewSetMixin, langue_demandee, projeter, varier_selon_langue
+from .formats import Colonnes, format_compact, url_absolue
+from .lignes import ORDRES, colonnes_vitrine, lignes_compactes, lignes_visibles
+from .navigation import arbre_navigation
+from .requetes import (
+    ACTIFS,
+    filtre_enfants,
+    partenaires_avec_arbre,
+    familles_avec_arbre,
+    sous_familles_avec_produits,
+    produits_fournisseur_avec_catalogues,
+    familles_du_partenaire,
+    sous_familles_de_la_famille,
+    produits_fournisseur_de_la_sous_famille,
+)
+
+
+class SousCollectionMixin:
+    """Listes paginées des enfants visibles d'un objet, sans charger l'objet ni son arbre"""
+
+    def liste_enfants(self, modele_parent, pk, enfants, serializer_class):
+        get_object_or_404(modele_parent.objects.only('pk'), pk=pk)
+        context = self.get_serializer_context()
+        page = self.paginate_queryset(enfants)
+        if page is not None:
+            return self.get_paginated_response(serializer_class(page, many=True, context=context).data)
+        return Response(serializer_class(enfants, many=True, context=context).data)
 
 
-class PartenaireViewSet(viewsets.ModelViewSet):
+class PartenaireViewSet(SousCollectionMixin, ProjectionLangueViewSetMixin, viewsets.ModelViewSet):
     """
     ViewSet pour gérer les partenaires.
     
@@ -28,10 +64,13 @@ class PartenaireViewSet(viewsets.ModelViewSet):
     - partial_update: Met à jour partiellement un partenaire (PATCH)
     - destroy: Supprime un partenaire
     - actifs: Retourne uniquement les partenaires actifs
+    - familles: Familles visibles d'un partenaire, paginées, sans leur arbre
     
     Filtres disponibles:
     - ?actif=true/false : Filtrer par statut actif
+    - ?visible=true/false : Filtrer par visibilité (actif ainsi que tous ses ancêtres)
     - ?search=nom : Rechercher par nom
+    - ?lang=fr|en|ar|auto : Titres projetés sur une seule langue
     """
     queryset = Partenaire.objects.all()
     serializer_class = PartenaireSerializer
@@ -50,27 +89,7 @@ class PartenaireViewSet(viewsets.ModelViewSet):
     
     def get_queryset(self):
         """Retourne le queryset avec filtres optionnels et prefetch des familles"""
-        queryset = Partenaire.objects.prefetch_related(
-            Prefetch(
-                'familles',
-                queryset=Famille.objects.filter(actif=True).prefetch_related(
-                    Prefetch(
-                        'sous_familles',
-                        queryset=SousFamille.objects.filter(actif=True).prefetch_related(
-                            Prefetch(
-                                'produits_fournisseur',
-                                queryset=ProduitFournisseur.objects.filter(actif=True).prefetch_related(
-                                    Prefetch(
-                                        'catalogues',
-                                        queryset=Catalogue.objects.filter(actif=True).order_by('ordre', 'nom')
-                                    )
-                                ).order_by('ordre', 'nom')
-                            )
-                        ).order_by('ordre', 'titre_fr')
-                    )
-                ).order_by('ordre', 'titre_fr')
-            )
-        ).all()
+        queryset = partenaires_avec_arbre(self.get_langue(), filtre_enfants(self.request.query_params))
         
         # Filtre par statut actif si fourni
         actif = self.request.query_params.get('actif', None)
@@ -78,6 +97,11 @@ class PartenaireViewSet(viewsets.ModelViewSet):
             actif_bool = actif.lower() in ('true', '1', 'yes')
             queryset = queryset.filter(actif=actif_bool)
         
+        # Visible : actif ainsi que tous ses ancêtres (voir visibilite.py)
+        visible = self.request.query_params.get('visible', None)
+        if visible is not None:
+            queryset = queryset.filter(visible=visible.lower() in ('true', '1', 'yes'))
+        
         return queryset
     
     def perform_create(self, serializer):
@@ -98,32 +122,54 @@ class PartenaireViewSet(viewsets.ModelViewSet):
         Retourne uniquement les partenaires actifs.
         GET /api/partenaires/actifs/
         """
-        partenaires = Partenaire.objects.filter(actif=True).order_by('nom')
+        # Partenaire : visible = actif (index partiel WHERE visible)
+        partenaires = partenaires_avec_arbre(self.get_langue()).filter(visible=True).order_by('nom')
         page = self.paginate_queryset(partenaires)
         if page is not None:
             serializer = self.get_serializer(page, many=True)
             return self.get_paginated_response(serializer.data)
         
-        serializer = PartenaireSerializer(partenaires, many=True, context={'request': request})
+        serializer = PartenaireSerializer(partenaires, many=True, context=self.get_serializer_context())
         return Response(serializer.data)
     
     @action(detail=False, methods=['get'], url_path='inactifs')
     def inactifs(self, request):
         """
-        Retourne uniquement les partenaires inactifs.
+        Retourne uniquement les partenaires inactifs, avec l'aperçu de leur arbre
+        (enfants actifs, voir requetes.py).
         GET /api/partenaires/inactifs/
         """
-        partenaires = Partenaire.objects.filter(actif=False).order_by('nom')
+        partenaires = partenaires_avec_arbre(self.get_langue(), ACTIFS).filter(actif=False).order_by('nom')
         page = self.paginate_queryset(partenaires)
         if page is not None:
             serializer = self.get_serializer(page, many=True)
             return self.get_paginated_response(serializer.data)
         
-        serializer = PartenaireSerializer(partenaires, many=True, context={'request': request})
+        serializer = PartenaireSerializer(partenaires, many=True, context=self.get_serializer_context())
         return Response(serializer.data)
+    
+    @action(detail=True, methods=['get'], url_path='familles')
+    def familles(self, request, pk=None):
+        """
+        Familles visibles du partenaire, paginées, avec le nombre de sous-familles visibles.
+        GET /api/partenaires/{id}/familles/
+        """
+        return self.liste_enfants(
+            Partenaire, pk, familles_du_partenaire(pk, self.get_langue()), FamilleResumeSerializer
+        )
+    
+    @action(detail=True, methods=['get'], url_path='catalogues-zip', renderer_classes=[JSONRenderer, ZipRenderer])
+    def catalogues_zip(self, request, pk=None):
+        """
+        Archive ZIP (en flux, avec ETag) des PDF des catalogues visibles du partenaire.
+        GET /api/partenaires/{id}/catalogues-zip/
+        """
+        partenaire = get_object_or_404(Partenaire.objects.only('pk', 'nom'), pk=pk)
+        catalogues = catalogues_visibles(produit_fournisseur__sous_famille__famille__partenaires=partenaire.pk)
+        return reponse_archive(request, catalogues, partenaire.nom)
 
 
-class FamilleViewSet(viewsets.ModelViewSet):
+class FamilleViewSet(SousCollectionMixin, ProjectionLangueViewSetMixin, viewsets.ModelViewSet):
     """ViewSet pour gérer les familles"""
     queryset = Famille.objects.all()
     serializer_class = FamilleSerializer
@@ -135,32 +181,42 @@ class FamilleViewSet(viewsets.ModelViewSet):
     
     def get_queryset(self):
         """Retourne le queryset avec filtres optionnels et prefetch des sous-familles et produits"""
-        queryset = Famille.objects.prefetch_related(
-            Prefetch(
-                'sous_familles',
-                queryset=SousFamille.objects.filter(actif=True).prefetch_related(
-                    Prefetch(
-                        'produits_fournisseur',
-                        queryset=ProduitFournisseur.objects.filter(actif=True).prefetch_related(
-                            Prefetch(
-                                'catalogues',
-                                queryset=Catalogue.objects.filter(actif=True).order_by('ordre', 'nom')
-                            )
-                        ).order_by('ordre', 'nom')
-                    )
-                ).order_by('ordre', 'titre_fr')
-            )
-        ).all()
+        queryset = familles_avec_arbre(self.get_langue(), filtre_enfants(self.request.query_params))
         
         actif = self.request.query_params.get('actif', None)
         if actif is not None:
             actif_bool = actif.lower() in ('true', '1', 'yes')
             queryset = queryset.filter(actif=actif_bool)
         
+        # Visible : actif ainsi que tous ses ancêtres (voir visibilite.py)
+        visible = self.request.query_params.get('visible', None)
+        if visible is not None:
+            queryset = queryset.filter(visible=visible.lower() in ('true', '1', 'yes'))
+        
         return queryset
+    
+    @action(detail=True, methods=['get'], url_path='sous-familles')
+    def sous_familles(self, request, pk=None):
+        """
+        Sous-familles visibles de la famille, paginées, avec le nombre de produits visibles.
+        GET /api/familles/{id}/sous-familles/
+        """
+        return self.liste_enfants(
+            Famille, pk, sous_familles_de_la_famille(pk, self.get_langue()), SousFamilleResumeSerializer
+        )
+    
+    @action(detail=True, methods=['get'], url_path='catalogues-zip', renderer_classes=[JSONRenderer, ZipRenderer])
+    def catalogues_zip(self, request, pk=None):
+        """
+        Archive ZIP (en flux, avec ETag) des PDF des catalogues visibles de la famille.
+        GET /api/familles/{id}/catalogues-zip/
+        """
+        famille = get_object_or_404(Famille.objects.only('pk', 'titre_fr'), pk=pk)
+        catalogues = catalogues_visibles(produit_fournisseur__sous_famille__famille_id=famille.pk)
+        return reponse_archive(request, catalogues, famille.titre_fr)
 
 
-class SousFamilleViewSet(viewsets.ModelViewSet):
+class SousFamilleViewSet(SousCollectionMixin, ProjectionLangueViewSetMixin, viewsets.ModelViewSet):
     """ViewSet pour gérer les sous-familles"""
     queryset = SousFamille.objects.all()
     serializer_class = SousFamilleSerializer
@@ -172,18 +228,7 @@ class SousFamilleViewSet(viewsets.ModelViewSet):
     
     def get_queryset(self):
         """Retourne le queryset avec filtres optionnels et prefetch des produits"""
-        queryset = SousFamille.objects.select_related('famille').prefetch_related(
-            'famille__partenaires',
-            Prefetch(
-                'produits_fournisseur',
-                queryset=ProduitFournisseur.objects.filter(actif=True).prefetch_related(
-                    Prefetch(
-                        'catalogues',
-                        queryset=Catalogue.objects.filter(actif=True).order_by('ordre', 'nom')
-                    )
-                ).order_by('ordre', 'nom')
-            )
-        ).all()
+        queryset = sous_familles_avec_produits(self.get_langue(), filtre_enfants(self.request.query_params))
         
         # Filtrer par famille si fourni
         famille_id = self.request.query_params.get('famille', None)
@@ -195,7 +240,32 @@ class SousFamilleViewSet(viewsets.ModelViewSet):
             actif_bool = actif.lower() in ('true', '1', 'yes')
             queryset = queryset.filter(actif=actif_bool)
         
+        # Visible : actif ainsi que tous ses ancêtres (voir visibilite.py)
+        visible = self.request.query_params.get('visible', None)
+        if visible is not None:
+            queryset = queryset.filter(visible=visible.lower() in ('true', '1', 'yes'))
+        
         return queryset
+    
+    @action(detail=True, methods=['get'], url_path='produits-fournisseur')
+    def produits_fournisseur(self, request, pk=None):
+        """
+        Produits fournisseur visibles de la sous-famille, paginés, avec leurs catalogues visibles.
+        GET /api/sous-familles/{id}/produits-fournisseur/
+        """
+        return self.liste_enfants(
+            SousFamille, pk, produits_fournisseur_de_la_sous_famille(pk), ProduitFournisseurSerializer
+        )
+    
+    @action(detail=True, methods=['get'], url_path='catalogues-zip', renderer_classes=[JSONRenderer, ZipRenderer])
+    def catalogues_zip(self, request, pk=None):
+        """
+        Archive ZIP (en flux, avec ETag) des PDF des catalogues visibles de la sous-famille.
+        GET /api/sous-familles/{id}/catalogues-zip/
+        """
+        sous_famille = get_object_or_404(SousFamille.objects.only('pk', 'titre_fr'), pk=pk)
+        catalogues = catalogues_visibles(produit_fournisseur__sous_famille_id=sous_famille.pk)
+        return reponse_archive(request, catalogues, sous_famille.titre_fr)
 
 
 class ProduitFournisseurViewSet(viewsets.ModelViewSet):
@@ -210,25 +280,77 @@ class ProduitFournisseurViewSet(viewsets.ModelViewSet):
     
     def get_queryset(self):
         """Retourne le queryset avec filtres optionnels et prefetch des catalogues"""
-        queryset = ProduitFournisseur.objects.prefetch_related(
-            Prefetch(
-                'catalogues',
-                queryset=Catalogue.objects.filter(actif=True).order_by('ordre', 'nom')
-            )
-        ).all()
+        queryset = produits_fournisseur_avec_catalogues(filtre_enfants(self.request.query_params))
         
         # Filtrer par sous-famille si fourni
         sous_famille_id = self.request.query_params.get('sous_famille', None)
         if sous_famille_id:
             queryset = queryset.filter(sous_famille_id=sous_famille_id)
         
+        # Filtrer par famille ou par partenaire si fourni (valeurs des facettes)
+        famille_id = self.request.query_params.get('famille', None)
+        if famille_id:
+            queryset = queryset.filter(sous_famille__famille_id=famille_id)
+        
+        partenaire_id = self.request.query_params.get('partenaire', None)
+        if partenaire_id:
+            queryset = queryset.filter(sous_famille__famille__partenaires=partenaire_id)
+        
         actif = self.request.query_params.get('actif', None)
         if actif is not None:
             actif_bool = actif.lower() in ('true', '1', 'yes')
             queryset = queryset.filter(actif=actif_bool)
         
+        # Visible : actif ainsi que tous ses ancêtres (voir visibilite.py)
+        visible = self.request.query_params.get('visible', None)
+        if visible is not None:
+            queryset = queryset.filter(visible=visible.lower() in ('true', '1', 'yes'))
+        
         return queryset
 
+    @action(detail=False, methods=['get'], url_path='facettes')
+    def facettes(self, request):
+        """
+        Nombre de produits fournisseur par famille, sous-famille, partenaire et statut,
+        pour les mêmes filtres et la même recherche que la liste.
+        GET /api/produits-fournisseur/facettes/?search=&famille=&sous_famille=&partenaire=&actif=&lang=
+        """
+        queryset = self.filter_queryset(self.get_queryset())
+        facettes = facettes_en_cache(request, queryset, FACETTES_PRODUITS_FOURNISSEUR, langue_demandee(request))
+        return varier_selon_langue(request, Response(facettes))
+
+    @action(detail=False, methods=['get'], url_path='vitrine')
+    def vitrine(self, request):
+        """
+        Produits fournisseur visibles (toute la chaîne active), lus à plat dans LigneCatalogue.
+        GET /api/produits-fournisseur/vitrine/?partenaire=&famille=&sous_famille=&ordering=ordre|nom&lang=
+        """
+        filtres = {}
+        for parametre in ('partenaire', 'famille', 'sous_famille'):
+            valeur = request.query_params.get(parametre)
+            if valeur:
+                if not valeur.isdigit():
+                    return Response({'detail': f"Le paramètre {parametre} doit être un entier."}, status=status.HTTP_400_BAD_REQUEST)
+                filtres[parametre] = int(valeur)
+        ordre = request.query_params.get('ordering') or 'ordre'
+        if ordre not in ORDRES:
+            return Response({'detail': f"Tri inconnu : {', '.join(ORDRES)} attendu."}, status=status.HTTP_400_BAD_REQUEST)
+
+        langue = langue_demandee(request)
+        lignes = projeter(lignes_visibles(ordre=ordre, **filtres), langue, LigneCatalogueSerializer.champs_localises)
+        if format_compact(request):
+            # Colonnes et MessagePack : directement depuis les tuples de la base
+            champs, noms = colonnes_vitrine(langue)
+            lignes = lignes.values_list(*champs)
+            page = self.paginate_queryset(lignes)
+            donnees = Colonnes(noms, lignes_compactes(lignes if page is None else page, url_absolue(request)))
+        else:
+            context = {**self.get_serializer_context(), 'langue': langue}
+            page = self.paginate_queryset(lignes)
+            donnees = LigneCatalogueSerializer(lignes if page is None else page, many=True, context=context).data
+        response = self.get_paginated_response(donnees) if page is not None else Response(donnees)
+        return varier_selon_langue(request, response)
+
 
 class CatalogueViewSet(viewsets.ModelViewSet):
     """ViewSet pour gérer les catalogues"""
@@ -239,7 +361,26 @@ class CatalogueViewSet(viewsets.ModelViewSet):
     search_fields = ['nom']
     ordering_fields = ['ordre', 'nom', 'date_creation']
     ordering = ['ordre', 'nom']
-    
+    # Champs lus par values_list pour les formats compacts (voir formats.py)
+    champs_compacts = ('id', 'nom', 'fichier_pdf', 'actif', 'ordre', 'date_creation', 'date_modification')
+
+    def list(self, request, *args, **kwargs):
+        """Liste ; en colonnes ou en MessagePack, directement depuis les tuples de la base"""
+        if not format_compact(request):
+            return super().list(request, *args, **kwargs)
+        lignes = self.filter_queryset(self.get_queryset()).values_list(*self.champs_compacts)
+        page = self.paginate_queryset(lignes)
+        url = url_absolue(request)
+        donnees = Colonnes(
+            ('id', 'nom', 'fichier_pdf', 'fichier_pdf_url', 'actif', 'ordre', 'date_creation', 'date_modification'),
+            [
+                (pk, nom, url(default_storage.url(fichier)) if fichier else None,
+                 url(default_storage.url(fichier)) if fichier else None, actif, ordre, creation, modification)
+                for pk, nom, fichier, actif, ordre, creation, modification in (lignes if page is None else page)
+            ],
+        )
+        return self.get_paginated_response(donnees) if page is not None else Response(donnees)
+
     def get_queryset(self):
         """Retourne le queryset avec filtres optionnels"""
         queryset = Catalogue.objects.all()
@@ -254,4 +395,58 @@ class CatalogueViewSet(viewsets.ModelViewSet):
             actif_bool = actif.lower() in ('true', '1', 'yes')
             queryset = queryset.filter(actif=actif_bool)
         
+        # Visible : actif ainsi que tous ses ancêtres (voir visibilite.py)
+        visible = self.request.query_params.get('visible', None)
+        if visible is not None:
+            queryset = queryset.filter(visible=visible.lower() in ('true', '1', 'yes'))
+        
         return queryset
+
+
+class ChangementsView(APIView):
+    """
+    Flux incrémental des créations, modifications et suppressions du catalogue.
+
+    - GET /api/changes/ : curseur courant, sans changement
+    - GET /api/changes/?since=<curseur> : changements suivants, dans l'ordre des transactions
+    - ?limit=N : nombre maximal de changements par réponse (500 par défaut, 1000 au plus)
+
+    Réponse : {"cursor": ..., "has_more": bool, "results": [...]}. Un curseur antérieur
+    à la période de rétention retourne 410 : le client doit tout retélécharger.
+    """
+    permission_classes = [AllowAny]
+    limite_par_defaut = 500
+    limite_maximale = 1000
+
+    def get(self, request):
+        try:
+            limite = min(int(request.query_params.get('limit', self.limite_par_defaut)), self.limite_maximale)
+        except ValueError:
+            return Response({'detail': "Le paramètre limit doit être un entier."}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            curseur, reste, changements = lire_changements(
+                request.query_params.get('since'), max(limite, 1), {'request': request}
+            )
+        except CurseurInvalide:
+            return Response({'detail': "Curseur invalide."}, status=status.HTTP_400_BAD_REQUEST)
+        except CurseurExpire:
+            return Response(
+                {'detail': "Ce curseur a expiré, une synchronisation complète est nécessaire."},
+                status=status.HTTP_410_GONE
+            )
+        return Response({'cursor': curseur, 'has_more': reste, 'results': changements})
+
+
+class NavigationView(APIView):
+    """
+    Arbre de navigation léger des partenaires actifs (voir navigation.py) :
+    partenaire -> familles -> sous-familles, avec les titres et le nombre d'enfants actifs.
+
+    Filtres disponibles:
+    - ?lang=fr|en|ar|auto : Titres projetés sur une seule langue
+    """
+    permission_classes = [AllowAny]
+
+    def get(self, request):
+        response = Response(arbre_navigation(request, langue_demandee(request)))
+        return varier_selon_langue(request, response)
@@ -0,0 +1,134 @@
+"""
+Maintenance de la colonne `visible` de la hiérarchie du catalogue.
+
+Un objet est visible s'il est actif ainsi que tous ses ancêtres :
+
+- partenaire : actif ;
+- famille : active, et sans partenaire ou avec au moins un partenaire actif ;
+- sous-famille, produit fournisseur, catalogue : actif, et parent visible.
+
+`propager(modele, pks, operation)` est appelé par signals.notifier_modification pour
+toute écriture (y compris les actions en masse de l'admin, via modifier_en_masse). Les
+objets notifiés sont recalculés par un UPDATE ensembliste par niveau ; au niveau suivant,
+seuls les enfants des objets notifiés et de ceux dont `visible` a réellement changé
+(RETURNING) sont recalculés. Les enfants des objets notifiés le sont toujours : save()
+réécrit la valeur de `visible` lue avec l'instance, peut-être périmée, de sorte que
+l'UPDATE du niveau ne voit pas forcément le changement. `recalculer_tout()` recalcule
+toute la hiérarchie.
+"""
+from django.db import connections, router, transaction
+
+from .models import Partenaire, Famille, SousFamille, ProduitFournisseur, Catalogue
+
+
+LIENS = Famille.partenaires.through._meta.db_table
+
+# Visibilité d'une famille `f` d'après ses partenaires
+FAMILLE_VISIBLE = f"""(
+    f.actif AND (
+        NOT EXISTS (SELECT 1 FROM {LIENS} fp WHERE fp.famille_id = f.id)
+        OR EXISTS (
+            SELECT 1 FROM {LIENS} fp JOIN {Partenaire._meta.db_table} p ON p.id = fp.partenaire_id
+            WHERE fp.famille_id = f.id AND p.actif
+        )
+    )
+)"""
+
+# Toutes les lignes quand la liste d'identifiants vaut None
+TOUS = None
+
+
+def condition(colonne, identifiants):
+    return 'TRUE' if identifiants is TOUS else f'{colonne} = ANY(%s)'
+
+
+def executer(cursor, requete, parametres):
+    cursor.execute(requete, [valeur for valeur in parametres if valeur is not TOUS])
+    return [ligne[0] for ligne in cursor.fetchall()]
+
+
+def partenaires(cursor, identifiants):
+    return executer(cursor, f"""
+        UPDATE {Partenaire._meta.db_table} SET visible = actif
+        WHERE {condition('id', identifiants)} AND visible <> actif
+        RETURNING id
+    """, [identifiants])
+
+
+def familles(cursor, identifiants):
+    return executer(cursor, f"""
+        UPDATE {Famille._meta.db_table} f SET visible = {FAMILLE_VISIBLE}
+        WHERE {condition('f.id', identifiants)} AND f.visible <> {FAMILLE_VISIBLE}
+        RETURNING f.id
+    """, [identifiants])
+
+
+def enfants(cursor, modele, cle_parent, modele_parent, identifiants, parents):
+    """Recalcule `identifiants` et les enfants de `parents` : actif et parent visible"""
+    if identifiants is not TOUS and not identifiants and not parents:
+        return []
+    if identifiants is TOUS:
+        portee = 'TRUE'
+        parametres = []
+    else:
+        portee = f'(e.id = ANY(%s) OR e.{cle_parent} = ANY(%s))'
+        parametres = [list(identifiants), list(parents)]
+    return executer(cursor, f"""
+        UPDATE {modele._meta.db_table} e SET visible = e.actif AND parent.visible
+        FROM {modele_parent._meta.db_table} parent
+        WHERE parent.id = e.{cle_parent} AND {portee}
+          AND e.visible <> (e.actif AND parent.visible)
+        RETURNING e.id
+    """, parametres)
+
+
+def parents(identifiants, changees):
+    """Objets dont les enfants sont à recalculer : notifiés ou changés"""
+    return changees if identifiants is TOUS else {*identifiants, *changees}
+
+
+def cascade(cursor, familles_ids=(), sous_familles_ids=(), produits_ids=(), catalogues_ids=()):
+    """Recalcule chaque niveau puis les enfants des objets notifiés ou dont la visibilité a changé"""
+    changees = familles(cursor, familles_ids) if familles_ids is TOUS or familles_ids else []
+    changees = enfants(cursor, SousFamille, 'famille_id', Famille, sous_familles_ids, parents(familles_ids, changees))
+    changees = enfants(
+        cursor, ProduitFournisseur, 'sous_famille_id', SousFamille, produits_ids, parents(sous_familles_ids, changees)
+    )
+    enfants(cursor, Catalogue, 'produit_fournisseur_id', ProduitFournisseur, catalogues_ids, parents(produits_ids, changees))
+
+
+def propager(modele, pks, operation, familles=None):
+    """
+    Recalcule, dans la transaction courante, la visibilité des objets notifiés et de leurs
+    descendants. `familles` : familles liées aux partenaires supprimés (voir signals.py).
+    """
+    from .signals import SUPPRESSION
+
+    pks = list(pks)
+    connexion = connections[router.db_for_write(Famille)]
+    with transaction.atomic(using=connexion.alias), connexion.cursor() as cursor:
+        if modele is Partenaire:
+            partenaires(cursor, pks)
+            if operation == SUPPRESSION:
+                # Les liens du partenaire ont disparu avec lui : familles retenues avant la
+                # suppression, toutes à défaut
+                cascade(cursor, familles_ids=TOUS if familles is None else list(familles))
+            else:
+                cursor.execute(f'SELECT DISTINCT famille_id FROM {LIENS} WHERE partenaire_id = ANY(%s)', [pks])
+                cascade(cursor, familles_ids=[ligne[0] for ligne in cursor.fetchall()])
+        elif modele is Famille:
+            cascade(cursor, familles_ids=pks)
+        elif modele is SousFamille:
+            cascade(cursor, sous_familles_ids=pks)
+        elif modele is ProduitFournisseur:
+            cascade(cursor, produits_ids=pks)
+        elif modele is Catalogue:
+            cascade(cursor, catalogues_ids=pks)
+
+
+def recalculer_tout():
+    """Recalcule toute la hiérarchie, du partenaire au catalogue"""
+    connexion = connections[router.db_for_write(Famille)]
+    with transaction.atomic(using=connexion.alias), connexion.cursor() as cursor:
+        partenaires(cursor, TOUS)
+        cascade(cursor, TOUS, TOUS, TOUS, TOUS)
@@ -1,17 +1,19 @@
 from django.contrib import admin
 from django.utils.html import format_html
 from django.urls import reverse
+from partenaire.filtres_admin import FiltreAutocomplete, FiltresAutocompleteMixin
+from partenaire.signals import modifier_en_masse
 from .models import Produit
 
 
 @admin.register(Produit)
-class ProduitAdmin(admin.ModelAdmin):
+class ProduitAdmin(FiltresAutocompleteMixin, admin.ModelAdmin):
     list_display = ('image_preview', 'titre_fr', 'ordre', 'actif', 'nombre_partenaires', 'langues_disponibles', 'date_creation')
     list_display_links = ('image_preview', 'titre_fr')
-    list_filter = ('actif', 'date_creation', 'partenaires')
+    list_filter = ('actif', 'date_creation', ('partenaires', FiltreAutocomplete))
     search_fields = ('titre_fr', 'titre_en', 'titre_ar', 'description_fr', 'description_en', 'description_ar')
     readonly_fields = ('date_creation', 'date_modification', 'nombre_partenaires', 'image_preview', 'langues_disponibles')
-    filter_horizontal = ('partenaires',)  # Interface plus conviviale pour Many-to-Many
+    autocomplete_fields = ('partenaires',)  # Recherche à la demande au lieu de la liste de tous les partenaires
     list_per_page = 25
     list_editable = ('ordre', 'actif')
     
@@ -31,7 +33,7 @@ class ProduitAdmin(admin.ModelAdmin):
         }),
         ('Partenaires', {
             'fields': ('partenaires', 'nombre_partenaires'),
-            'description': 'Sélectionnez les partenaires associés à ce produit (maintenez Ctrl/Cmd pour sélection multiple)'
+            'description': 'Recherchez et sélectionnez les partenaires associés à ce produit'
         }),
         ('Paramètres d\'affichage', {
             'fields': ('actif', 'ordre'),
@@ -78,12 +80,12 @@ class ProduitAdmin(admin.ModelAdmin):
     
     @admin.action(description='Activer les produits sélectionnés')
     def activer_produits(self, request, queryset):
-        updated = queryset.update(actif=True)
+        updated = modifier_en_masse(queryset, actif=True)
         self.message_user(request, f'{updated} produit(s) activé(s) avec succès.')
     
     @admin.action(description='Désactiver les produits sélectionnés')
     def desactiver_produits(self, request, queryset):
-        updated = queryset.update(actif=False)
+        updated = modifier_en_masse(queryset, actif=False)
         self.message_user(request, f'{updated} produit(s) désactivé(s) avec succès.')
     
     @admin.action(description='Incrémenter l\'ordre des produits sélectionnés')
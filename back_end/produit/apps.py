@@ -4,3 +4,8 @@ from django.apps import AppConfig
 class ProduitConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'produit'
+
+    def ready(self):
+        from partenaire.signals import connecter
+        from .models import Produit
+        connecter(Produit)
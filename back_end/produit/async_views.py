@@ -0,0 +1,45 @@
+"""
+Vues asynchrones en lecture seule pour les produits (voir partenaire/async_views.py).
+"""
+from partenaire.async_views import (
+    detail_graphe, filtrer_actif, filtrer_actif_graphe, graphe_courant, liste_graphe, liste_paginee, reponse_json,
+    serialiser, vue_lecture,
+)
+from partenaire.graphe import rendre_produit
+from partenaire.langues import langue_demandee
+from .models import Produit
+from .requetes import produits_avec_partenaires
+from .serializers import ProduitSerializer
+
+
+@vue_lecture
+async def liste_produits(request):
+    """GET /api/produits/"""
+    graphe = await graphe_courant()
+    if graphe is not None:
+        return liste_graphe(request, filtrer_actif_graphe(request, graphe.produits), rendre_produit)
+    queryset = filtrer_actif(request, produits_avec_partenaires(langue_demandee(request))).order_by('ordre', 'titre_fr')
+    return await liste_paginee(request, queryset, ProduitSerializer)
+
+
+@vue_lecture
+async def produits_actifs(request):
+    """GET /api/produits/actifs/"""
+    graphe = await graphe_courant()
+    if graphe is not None:
+        return liste_graphe(request, [p for p in graphe.produits if p.actif], rendre_produit)
+    queryset = produits_avec_partenaires(langue_demandee(request)).filter(actif=True).order_by('ordre', 'titre_fr')
+    return await liste_paginee(request, queryset, ProduitSerializer)
+
+
+@vue_lecture
+async def detail_produit(request, pk):
+    """GET /api/produits/{id}/"""
+    graphe = await graphe_courant()
+    if graphe is not None:
+        return detail_graphe(request, graphe.produits_par_id.get(pk), rendre_produit)
+    try:
+        produit = await filtrer_actif(request, produits_avec_partenaires(langue_demandee(request))).aget(pk=pk)
+    except Produit.DoesNotExist:
+        return None
+    return reponse_json(await serialiser(request, ProduitSerializer, produit))
@@ -8,10 +8,11 @@ class ProduitFilter(django_filters.FilterSet):
     titre_fr = django_filters.CharFilter(lookup_expr='icontains', label='Titre français contient')
     actif = django_filters.BooleanFilter(label='Actif')
     ordre = django_filters.NumberFilter(label='Ordre')
+    partenaire = django_filters.NumberFilter(field_name='partenaires', label='Partenaire')
     date_creation = django_filters.DateFromToRangeFilter(label='Date de création')
     
     class Meta:
         model = Produit
-        fields = ['titre_fr', 'actif', 'ordre', 'date_creation']
+        fields = ['titre_fr', 'actif', 'ordre', 'partenaire', 'date_creation']
 
 
@@ -0,0 +1,20 @@
+# Generated by Django 5.0.1 on 2026-10-19 10:00
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY ne peut pas s'exécuter dans une transaction
+    atomic = False
+
+    dependencies = [
+        ('produit', '0002_produit_partenaires'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='produit',
+            index=models.Index(condition=models.Q(('actif', True)), fields=['ordre', 'titre_fr'], include=('id',), name='produit_actif_ordre_idx'),
+        ),
+    ]
@@ -87,6 +87,8 @@ class Produit(models.Model):
         indexes = [
             models.Index(fields=['ordre', 'actif']),
             models.Index(fields=['titre_fr']),
+            # Lectures publiques : WHERE actif ORDER BY ordre, titre_fr
+            models.Index(fields=['ordre', 'titre_fr'], include=['id'], condition=models.Q(actif=True), name='produit_actif_ordre_idx'),
         ]
 
     def __str__(self):
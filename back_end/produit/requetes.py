@@ -0,0 +1,14 @@
+"""
+Querysets de lecture partagés par les vues DRF et les vues asynchrones.
+"""
+from django.db.models import Prefetch
+from partenaire.langues import projeter
+from partenaire.requetes import partenaires_avec_arbre
+from .models import Produit
+
+
+def produits_avec_partenaires(langue=None):
+    """Produits avec leurs partenaires actifs (visibles) et l'arbre complet de ces partenaires"""
+    return projeter(Produit.objects.all(), langue, ('titre', 'description')).prefetch_related(
+        Prefetch('partenaires', queryset=partenaires_avec_arbre(langue).filter(visible=True))
+    )
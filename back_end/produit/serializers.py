@@ -1,11 +1,13 @@
 from rest_framework import serializers
 from .models import Produit
+from partenaire.langues import ProjectionLangueSerializerMixin
 from partenaire.serializers import PartenaireSerializer
 from partenaire.models import Partenaire
 
 
-class ProduitSerializer(serializers.ModelSerializer):
+class ProduitSerializer(ProjectionLangueSerializerMixin, serializers.ModelSerializer):
     """Serializer pour le modèle Produit avec URL complète de l'image"""
+    champs_localises = ('titre', 'description')
     image_couverture_url = serializers.SerializerMethodField()
     partenaires = PartenaireSerializer(many=True, read_only=True)
     partenaires_ids = serializers.PrimaryKeyRelatedField(
@@ -3,14 +3,15 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import AllowAny
 from django_filters.rest_framework import DjangoFilterBackend
-from django.db.models import Prefetch
+from partenaire.facettes import FACETTES_PRODUITS, facettes_en_cache
+from partenaire.langues import ProjectionLangueViewSetMixin
 from .models import Produit
 from .serializers import ProduitSerializer, ProduitCreateUpdateSerializer
 from .filters import ProduitFilter
-from partenaire.models import Partenaire
+from .requetes import produits_avec_partenaires
 
 
-class ProduitViewSet(viewsets.ModelViewSet):
+class ProduitViewSet(ProjectionLangueViewSetMixin, viewsets.ModelViewSet):
     """
     ViewSet pour gérer les produits et équipements.
     
@@ -22,11 +23,14 @@ class ProduitViewSet(viewsets.ModelViewSet):
     - partial_update: Met à jour partiellement un produit (PATCH)
     - destroy: Supprime un produit
     - actifs: Retourne uniquement les produits actifs
+    - facettes: Nombre de produits par partenaire et par statut pour les filtres courants
     
     Filtres disponibles:
     - ?actif=true/false : Filtrer par statut actif
+    - ?partenaire=<id> : Filtrer par partenaire
     - ?search=texte : Rechercher dans les titres et descriptions
     - ?ordering=ordre : Trier les résultats
+    - ?lang=fr|en|ar|auto : Titre et description projetés sur une seule langue
     """
     queryset = Produit.objects.all()
     serializer_class = ProduitSerializer
@@ -45,9 +49,7 @@ class ProduitViewSet(viewsets.ModelViewSet):
     
     def get_queryset(self):
         """Retourne le queryset avec filtres optionnels et prefetch des partenaires"""
-        queryset = Produit.objects.prefetch_related(
-            Prefetch('partenaires', queryset=Partenaire.objects.filter(actif=True))
-        ).all()
+        queryset = produits_avec_partenaires(self.get_langue())
         
         # Filtre par statut actif si fourni
         actif = self.request.query_params.get('actif', None)
@@ -75,13 +77,13 @@ class ProduitViewSet(viewsets.ModelViewSet):
         Retourne uniquement les produits actifs, triés par ordre.
         GET /api/produits/actifs/
         """
-        produits = Produit.objects.filter(actif=True).order_by('ordre', 'titre_fr')
+        produits = produits_avec_partenaires(self.get_langue()).filter(actif=True).order_by('ordre', 'titre_fr')
         page = self.paginate_queryset(produits)
         if page is not None:
             serializer = self.get_serializer(page, many=True)
             return self.get_paginated_response(serializer.data)
         
-        serializer = ProduitSerializer(produits, many=True, context={'request': request})
+        serializer = ProduitSerializer(produits, many=True, context=self.get_serializer_context())
         return Response(serializer.data)
     
     @action(detail=False, methods=['get'], url_path='inactifs')
@@ -90,11 +92,21 @@ class ProduitViewSet(viewsets.ModelViewSet):
         Retourne uniquement les produits inactifs.
         GET /api/produits/inactifs/
         """
-        produits = Produit.objects.filter(actif=False).order_by('ordre', 'titre_fr')
+        produits = produits_avec_partenaires(self.get_langue()).filter(actif=False).order_by('ordre', 'titre_fr')
         page = self.paginate_queryset(produits)
         if page is not None:
             serializer = self.get_serializer(page, many=True)
             return self.get_paginated_response(serializer.data)
         
-        serializer = ProduitSerializer(produits, many=True, context={'request': request})
+        serializer = ProduitSerializer(produits, many=True, context=self.get_serializer_context())
         return Response(serializer.data)
+    
+    @action(detail=False, methods=['get'], url_path='facettes')
+    def facettes(self, request):
+        """
+        Nombre de produits par partenaire et par statut, pour les mêmes filtres et la
+        même recherche que la liste.
+        GET /api/produits/facettes/?search=&partenaire=&actif=
+        """
+        queryset = self.filter_queryset(self.get_queryset())
+        return Response(facettes_en_cache(request, queryset, FACETTES_PRODUITS, self.get_langue()))
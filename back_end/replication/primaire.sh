@@ -0,0 +1,19 @@
+#!/bin/sh
+# Autorise la réplication en continu vers db_replica (docker-compose.replica.yml).
+# Exécuté à l'initialisation d'un volume vide, ou à la main sur une base existante :
+#   docker-compose exec db sh /docker-entrypoint-initdb.d/replication.sh
+set -e
+
+psql -v ON_ERROR_STOP=1 --username "$POSTGRES_USER" --dbname postgres <<'SQL'
+DO $$
+BEGIN
+    IF NOT EXISTS (SELECT FROM pg_roles WHERE rolname = 'replicator') THEN
+        CREATE ROLE replicator WITH REPLICATION LOGIN PASSWORD 'replicator';
+    END IF;
+END
+$$;
+SQL
+
+grep -q '^host replication replicator' "$PGDATA/pg_hba.conf" \
+    || echo 'host replication replicator all scram-sha-256' >> "$PGDATA/pg_hba.conf"
+psql --username "$POSTGRES_USER" --dbname postgres -c 'SELECT pg_reload_conf()' > /dev/null
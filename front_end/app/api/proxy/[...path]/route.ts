@@ -1,4 +1,5 @@
 import { NextRequest, NextResponse } from 'next/server'
+import { cacheJusquaRevalidation, tagsPourChemin } from '@/lib/revalidation'
 
 const BACKEND_URL = process.env.BACKEND_URL || 'http://105.96.71.28:9001'
 
@@ -22,7 +23,11 @@ export async function GET(
       headers: {
         'Content-Type': 'application/json',
       },
-      cache: 'no-store', // Désactiver le cache au niveau du proxy
+      // Mis en cache jusqu'à la notification de revalidation du backend (app/api/revalidate),
+      // si celle-ci couvre le chemin
+      ...(cacheJusquaRevalidation(path)
+        ? { next: { tags: tagsPourChemin(path), revalidate: false } }
+        : { cache: 'no-store' as const }),
     })
 
     console.log(`[Proxy] Response status: ${response.status}`)
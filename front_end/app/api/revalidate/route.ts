@@ -0,0 +1,46 @@
+import { createHmac, timingSafeEqual } from 'crypto'
+import { revalidatePath, revalidateTag } from 'next/cache'
+import { NextRequest, NextResponse } from 'next/server'
+import { TAG_CATALOGUE } from '@/lib/revalidation'
+
+const REVALIDATION_SECRET = process.env.REVALIDATION_SECRET || ''
+
+// Écart maximal accepté entre l'horodatage signé et la réception (secondes)
+const TOLERANCE_HORODATAGE = 300
+
+/**
+ * Vérifie la signature HMAC-SHA256 de "<horodatage>.<corps>" envoyée par le backend
+ */
+function signatureValide(corps: string, horodatage: string | null, signature: string | null): boolean {
+  if (!REVALIDATION_SECRET || !horodatage || !signature) return false
+  const ecart = Math.abs(Date.now() / 1000 - Number(horodatage))
+  if (!Number.isFinite(ecart) || ecart > TOLERANCE_HORODATAGE) return false
+  const attendue = 'sha256=' + createHmac('sha256', REVALIDATION_SECRET).update(`${horodatage}.${corps}`).digest('hex')
+  const a = Buffer.from(attendue)
+  const b = Buffer.from(signature)
+  return a.length === b.length && timingSafeEqual(a, b)
+}
+
+/**
+ * Notification de revalidation envoyée par le backend après une modification du catalogue
+ */
+export async function POST(request: NextRequest) {
+  const corps = await request.text()
+  if (!signatureValide(
+    corps,
+    request.headers.get('x-revalidation-timestamp'),
+    request.headers.get('x-revalidation-signature'),
+  )) {
+    return NextResponse.json({ error: 'Signature invalide' }, { status: 401 })
+  }
+
+  const { tags = [], paths = [] } = JSON.parse(corps) as { tags?: string[]; paths?: string[] }
+  tags.forEach((tag) => revalidateTag(tag))
+  if (tags.includes(TAG_CATALOGUE)) {
+    revalidatePath('/', 'layout')
+  } else {
+    paths.forEach((path) => revalidatePath(path))
+  }
+
+  return NextResponse.json({ revalidated: true, tags: tags.length, paths: paths.length })
+}
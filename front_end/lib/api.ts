@@ -2,6 +2,8 @@
  * Configuration et utilitaires pour l'API backend
  */
 
+import { tagsPourChemin } from './revalidation'
+
 const API_BASE_URL = process.env.NEXT_PUBLIC_API_URL || 'http://105.96.71.28:9001/api'
 
 /**
@@ -137,8 +139,8 @@ export async function getPartenairesActifs(): Promise<Partenaire[]> {
       headers: {
         'Content-Type': 'application/json',
       },
-      // Ajouter cache pour améliorer les performances
-      next: { revalidate: 60 }, // Revalider toutes les 60 secondes
+      // En cache jusqu'à la notification de revalidation du backend
+      next: { tags: tagsPourChemin('partenaires/actifs/') },
     })
 
     if (!response.ok) {
@@ -164,7 +166,7 @@ export async function getAllPartenaires(): Promise<Partenaire[]> {
       headers: {
         'Content-Type': 'application/json',
       },
-      next: { revalidate: 60 },
+      next: { tags: tagsPourChemin('partenaires/') },
     })
 
     if (!response.ok) {
@@ -212,7 +214,8 @@ export async function getProduitsActifs(): Promise<Produit[]> {
       headers: {
         'Content-Type': 'application/json',
       },
-      next: { revalidate: 60 }, // Revalider toutes les 60 secondes
+      // En cache jusqu'à la notification de revalidation du backend
+      next: { tags: tagsPourChemin('produits/actifs/') },
     })
 
     if (!response.ok) {
@@ -237,7 +240,7 @@ export async function getAllProduits(): Promise<Produit[]> {
       headers: {
         'Content-Type': 'application/json',
       },
-      next: { revalidate: 60 },
+      next: { tags: tagsPourChemin('produits/') },
     })
 
     if (!response.ok) {
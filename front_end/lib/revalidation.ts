@@ -0,0 +1,35 @@
+/**
+ * Étiquettes de cache des réponses du backend, invalidées par les notifications
+ * de revalidation (voir app/api/revalidate/route.ts et back_end/partenaire/revalidation.py)
+ */
+
+/** Étiquette portée par toutes les réponses du catalogue */
+export const TAG_CATALOGUE = 'catalogue'
+
+/**
+ * Étiquettes d'un chemin de l'API, relatif à /api/
+ * (ex. `partenaires/3/` -> ['catalogue', 'partenaire:3'])
+ */
+export function tagsPourChemin(chemin: string): string[] {
+  const [ressource, id] = chemin.split('/').filter(Boolean)
+  const tags = [TAG_CATALOGUE]
+  if (ressource === 'partenaires') {
+    tags.push(id && /^\d+$/.test(id) ? `partenaire:${id}` : 'partenaires')
+  } else if (ressource === 'sous-familles' && id && /^\d+$/.test(id)) {
+    tags.push(`sous-famille:${id}`)
+  } else if (ressource === 'produits') {
+    tags.push(id && /^\d+$/.test(id) ? `produit:${id}` : 'produits')
+  }
+  return tags
+}
+
+/**
+ * Le chemin porte une étiquette que le backend envoie à chaque modification qui le
+ * touche (`partenaires`, `produits`, ou celle d'un objet) : sa réponse peut rester en
+ * cache jusqu'à la notification. Les autres chemins (familles, sous-familles en liste,
+ * produits fournisseur, catalogues, navigation, flux `changes/`...) ne portent que
+ * `catalogue`, envoyée seulement pour les suppressions : ils ne sont pas mis en cache.
+ */
+export function cacheJusquaRevalidation(chemin: string): boolean {
+  return tagsPourChemin(chemin).length > 1
+}